@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from file_cipher import MODES, make_cipher, process_file
+from functions.aes import KEY_SIZES
+
+MANIFEST = "manifest.jsonl"
+PART_SUFFIX = ".part"
+BATCH_BYTES = 4 * 1024 * 1024  # мелкие файлы собираются в задачи примерно такого объёма
+IV_SIZES = {"ecb": 0, "cbc": 16, "cfb": 16, "ofb": 16, "gcm": 12}
+
+
+def walk(root, skip=()):
+    """Относительные пути и размеры всех файлов дерева"""
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            rel = os.path.relpath(path, root)
+            if rel not in skip and not name.endswith(PART_SUFFIX):
+                files.append((rel, os.path.getsize(path)))
+    return files
+
+
+def make_tasks(files, batch_bytes=BATCH_BYTES):
+    """Задачи для пула, от самых объёмных к мелким: большие файлы по одному, мелкие - пачками до batch_bytes.
+    Свободный процесс забирает следующую задачу из общей очереди, поэтому крупные файлы расходятся
+    по процессам первыми, а мелкие выравнивают нагрузку в конце"""
+    tasks = []
+    batch, batch_size = [], 0
+    for rel, size in sorted(files, key=lambda f: f[1], reverse=True):
+        if size >= batch_bytes:
+            tasks.append([rel])
+            continue
+        batch.append(rel)
+        batch_size += size
+        if batch_size >= batch_bytes:
+            tasks.append(batch)
+            batch, batch_size = [], 0
+    if batch:
+        tasks.append(batch)
+    return tasks
+
+
+def load_manifest(path):
+    """Записи манифеста по относительному пути; недописанная последняя строка пропускается"""
+    records = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record["path"]] = record
+    return records
+
+
+def _inside(root, rel):
+    """Путь из манифеста не выводит за пределы root: ни абсолютным путём, ни "..", ни через симлинки"""
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, rel))
+    return path != root and os.path.commonpath([root, path]) == root
+
+
+def _process_task(action, mode, src_root, dst_root, rels, key, aad, segment_size, ivs):
+    """Шифрует или расшифровывает файлы одной задачи; результат пишется во временный файл
+    и переименовывается, так что в dst_root не бывает оборванных файлов"""
+    records = []
+    for rel in rels:
+        src = os.path.join(src_root, rel)
+        dst = os.path.join(dst_root, rel)
+        try:
+            os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+            if action == "encrypt":
+                iv = os.urandom(IV_SIZES[mode])
+            else:
+                iv = bytes.fromhex(ivs[rel])
+            cipher = make_cipher(mode, action == "decrypt", key, iv, aad, segment_size)
+            size = process_file(src, dst + PART_SUFFIX, cipher)
+            os.replace(dst + PART_SUFFIX, dst)
+        except (OSError, ValueError) as exc:
+            # ошибка одного файла не прерывает задачу и весь запуск: файл попадает в манифест как сбойный
+            try:
+                os.remove(dst + PART_SUFFIX)
+            except FileNotFoundError:
+                pass
+            records.append({"path": rel, "error": str(exc)})
+            continue
+        record = {"path": rel, "size": size, "iv": iv.hex()}
+        if action == "encrypt" and mode == "gcm":
+            record["tag"] = cipher.tag.hex()
+        records.append(record)
+    return records
+
+
+def run(action, mode, src_root, dst_root, key, aad=b'', segment_size=1, workers=None,
+        batch_bytes=BATCH_BYTES, log=None):
+    """Обрабатывает дерево src_root в dst_root в пуле процессов.
+    В dst_root/manifest.jsonl по строке на готовый файл (путь, размер, IV, тег GCM); файлы, уже
+    записанные в манифест, при повторном запуске пропускаются. Для расшифрования IV берутся
+    из манифеста src_root. Возвращает (записи этого запуска, сводка)"""
+    os.makedirs(dst_root, exist_ok=True)
+    manifest_path = os.path.join(dst_root, MANIFEST)
+    done = load_manifest(manifest_path)
+
+    ivs = None
+    rejected = []
+    if action == "decrypt":
+        source = load_manifest(os.path.join(src_root, MANIFEST))
+        ivs = {}
+        for rel, r in source.items():
+            if "error" in r:
+                continue
+            # манифест приходит вместе с шифртекстом, ему нельзя доверять запись за пределы dst_root
+            if _inside(src_root, rel) and _inside(dst_root, rel):
+                ivs[rel] = r["iv"]
+            else:
+                rejected.append({"path": rel, "error": "путь выходит за пределы каталога"})
+        # пропавший файл не прерывает запуск: его задача вернёт запись об ошибке
+        files = [(rel, os.path.getsize(path) if os.path.exists(path) else 0)
+                 for rel, path in ((rel, os.path.join(src_root, rel)) for rel in ivs)]
+    else:
+        files = walk(src_root, skip={MANIFEST})
+    pending = [(rel, size) for rel, size in files
+               if rel not in done or "error" in done[rel] or not os.path.exists(os.path.join(dst_root, rel))]
+
+    records = []
+    start = time.perf_counter()
+    with open(manifest_path, "a", encoding="utf-8") as manifest, ProcessPoolExecutor(workers) as executor:
+        for record in rejected:
+            manifest.write(json.dumps(record) + "\n")
+            records.append(record)
+            if log:
+                log(record)
+        futures = [executor.submit(_process_task, action, mode, src_root, dst_root, rels, key, aad,
+                                   segment_size, None if ivs is None else {rel: ivs[rel] for rel in rels})
+                   for rels in make_tasks(pending, batch_bytes)]
+        for future in as_completed(futures):
+            for record in future.result():
+                manifest.write(json.dumps(record) + "\n")
+                records.append(record)
+                if log:
+                    log(record)
+            manifest.flush()
+    seconds = max(time.perf_counter() - start, 1e-9)
+
+    processed = sum(r["size"] for r in records if "error" not in r)
+    summary = {
+        "files": sum(1 for r in records if "error" not in r),
+        "failed": sum(1 for r in records if "error" in r),
+        "skipped": len(files) - len(pending),
+        "bytes": processed, "seconds": seconds, "mb_s": processed / seconds / 2 ** 20,
+    }
+    return records, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Шифрование дерева каталогов режимами ECB/CBC/CFB/OFB/GCM")
+    parser.add_argument("action", choices=("encrypt", "decrypt"))
+    parser.add_argument("mode", choices=MODES)
+    parser.add_argument("src", help="исходный каталог")
+    parser.add_argument("dst", help="каталог результата (там же манифест)")
+    parser.add_argument("--key", required=True)
+    parser.add_argument("--aad", default="", help="дополнительные данные для GCM")
+    parser.add_argument("--segment-size", type=int, default=1, help="размер сегмента CFB в байтах")
+    parser.add_argument("--workers", type=int, help="процессов в пуле (по умолчанию по числу ядер)")
+    parser.add_argument("--batch-bytes", type=int, default=BATCH_BYTES, help="объём пачки мелких файлов")
+    parser.add_argument("--verbose", action="store_true", help="печатать каждый файл")
+    args = parser.parse_args(argv)
+
+    key = args.key.encode('utf-8')
+    if len(key) not in KEY_SIZES:
+        parser.error("ключ AES должен быть длиной 16, 24 или 32 байта")
+
+    def log(record):
+        if "error" in record:
+            print(f"Ошибка: {record['path']}: {record['error']}", file=sys.stderr)
+        elif args.verbose:
+            print(f"{record['path']}: {record['size']} байт")
+
+    _, summary = run(args.action, args.mode, args.src, args.dst, key, args.aad.encode('utf-8'),
+                     args.segment_size, args.workers, args.batch_bytes, log)
+    print(f"Файлов: {summary['files']}, пропущено готовых: {summary['skipped']}, ошибок: {summary['failed']}")
+    print(f"Обработано {summary['bytes']} байт за {summary['seconds']:.3f} с ({summary['mb_s']:.2f} МБ/с)")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
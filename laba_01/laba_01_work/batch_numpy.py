@@ -0,0 +1,223 @@
+"""Пакетное шифрование множества независимых сообщений под одним ключом на NumPy.
+
+N сообщений одной длины укладываются в двумерный массив uint8 (N, длина), и каждый шаг
+режима из main_2 выполняется сразу для всех N: раунды AES считаются по T-таблицам
+векторными выборками, сцепление CBC идёт по блокам, но для всех сообщений разом.
+Сообщения разной длины раскладываются по корзинам одинаковой длины (encrypt_many)"""
+import os
+import time
+
+import numpy as np
+
+import main_2
+from main_2 import normalize_iv, pad_text
+from functions.aes import aes_key, SBOX, INV_SBOX, _TE, _TD
+
+BLOCK_SIZE = 16
+
+_TE_NP = [np.array(t, dtype=np.uint32) for t in _TE]
+_TD_NP = [np.array(t, dtype=np.uint32) for t in _TD]
+_SBOX_NP = np.array(SBOX, dtype=np.uint32)
+_INV_SBOX_NP = np.array(INV_SBOX, dtype=np.uint32)
+
+
+def _rounds(s, rk, rounds, tables, sbox, inverse):
+    """Раунды AES над столбцами состояния s0..s3 (массивы uint32 одной формы).
+    Для обратного шифра сдвиг строк идёт в другую сторону: столбцы берутся как 0, 3, 2, 1"""
+    t0, t1, t2, t3 = tables
+    order = (0, 3, 2, 1) if inverse else (0, 1, 2, 3)
+    s = [s[i] ^ np.uint32(rk[i]) for i in range(4)]
+    k = 4
+    for _ in range(rounds - 1):
+        s = [t0[s[c] >> 24] ^ t1[(s[(c + order[1]) % 4] >> 16) & 255] ^
+             t2[(s[(c + order[2]) % 4] >> 8) & 255] ^ t3[s[(c + order[3]) % 4] & 255] ^ np.uint32(rk[k + c])
+             for c in range(4)]
+        k += 4
+    return [((sbox[s[c] >> 24] << 24) | (sbox[(s[(c + order[1]) % 4] >> 16) & 255] << 16) |
+             (sbox[(s[(c + order[2]) % 4] >> 8) & 255] << 8) | sbox[s[(c + order[3]) % 4] & 255]) ^
+            np.uint32(rk[k + c])
+            for c in range(4)]
+
+
+def _to_words(blocks):
+    """(..., 16) uint8 -> 4 массива uint32 (слова блока big-endian)"""
+    words = np.ascontiguousarray(blocks).view('>u4').astype(np.uint32)
+    return [words[..., i] for i in range(4)]
+
+
+def _from_words(words):
+    out = np.stack(words, axis=-1).astype('>u4')
+    return out.view(np.uint8)
+
+
+class BatchAes:
+    """AES над массивами блоков: encrypt_blocks/decrypt_blocks принимают uint8 формы (..., 16)"""
+
+    def __init__(self, key):
+        self.key = aes_key(bytes(key))
+
+    def encrypt_blocks(self, blocks):
+        words = _rounds(_to_words(blocks), self.key.enc_keys, self.key.rounds, _TE_NP, _SBOX_NP, False)
+        return _from_words(words)
+
+    def decrypt_blocks(self, blocks):
+        words = _rounds(_to_words(blocks), self.key.dec_keys, self.key.rounds, _TD_NP, _INV_SBOX_NP, True)
+        return _from_words(words)
+
+
+def pack(messages):
+    """Список сообщений одной длины (или готовый массив) -> массив uint8 (N, длина)"""
+    if isinstance(messages, np.ndarray):
+        if messages.ndim != 2 or messages.dtype != np.uint8:
+            raise ValueError("Нужен двумерный массив uint8")
+        return messages
+    lengths = {len(m) for m in messages}
+    if len(lengths) > 1:
+        raise ValueError("Сообщения разной длины: используйте encrypt_many")
+    length = lengths.pop() if lengths else 0
+    return np.frombuffer(b''.join(bytes(m) for m in messages), dtype=np.uint8).reshape(len(messages), length)
+
+
+def pad_rows(data):
+    """Дополнение каждой строки как pad_text из main_2: до кратности 16, всегда хотя бы один байт"""
+    n, length = data.shape
+    padding_len = BLOCK_SIZE - length % BLOCK_SIZE
+    padded = np.empty((n, length + padding_len), dtype=np.uint8)
+    padded[:, :length] = data
+    padded[:, length:] = padding_len
+    return padded
+
+
+def unpad_rows(data):
+    """Снимает дополнение с каждой строки; строки разной длины, поэтому результат - список bytes"""
+    if data.shape[1] == 0 or data.shape[1] % BLOCK_SIZE:
+        raise ValueError("Длина шифртекста не кратна размеру блока")
+    padding = data[:, -1].astype(np.int64)
+    # байт последнего блока на расстоянии d от конца входит в дополнение, если d <= p, и обязан равняться p
+    covered = np.arange(BLOCK_SIZE, 0, -1) <= padding[:, None]
+    wrong = np.any(covered & (data[:, -BLOCK_SIZE:] != padding[:, None]), axis=1)
+    if np.any((padding < 1) | (padding > BLOCK_SIZE) | wrong):
+        raise ValueError("Неверное дополнение")
+    length = data.shape[1]
+    return [row[:length - p].tobytes() for row, p in zip(data, padding)]
+
+
+def _ivs(ivs, n):
+    """Один IV на все сообщения или по IV на сообщение -> массив (n, 16).
+    IV любой длины дополняются нулями или обрезаются, как normalize_iv, в том числе в массиве uint8"""
+    if isinstance(ivs, np.ndarray):
+        if ivs.dtype != np.uint8 or ivs.ndim not in (1, 2):
+            raise ValueError("IV: нужен массив uint8 (длина IV) или (N, длина IV)")
+        if ivs.ndim == 1:
+            ivs = ivs.tobytes()
+        else:
+            width = min(ivs.shape[1], BLOCK_SIZE)
+            normalized = np.zeros((ivs.shape[0], BLOCK_SIZE), dtype=np.uint8)
+            normalized[:, :width] = ivs[:, :width]
+            ivs = normalized
+    if isinstance(ivs, (bytes, bytearray, memoryview)):
+        return np.tile(np.frombuffer(normalize_iv(ivs, BLOCK_SIZE), dtype=np.uint8), (n, 1))
+    if not isinstance(ivs, np.ndarray):
+        ivs = pack([normalize_iv(iv, BLOCK_SIZE) for iv in ivs])
+    if len(ivs) != n:
+        raise ValueError(f"Нужно {n} IV, передано {len(ivs)}")
+    return ivs
+
+
+def ecb_encrypt_batch(messages, key):
+    """Массив шифртекстов (N, дополненная длина); блоки всех сообщений шифруются одним вызовом"""
+    return _ecb_encrypt_padded(pad_rows(pack(messages)), key)
+
+
+def _ecb_encrypt_padded(padded, key):
+    n, length = padded.shape
+    return BatchAes(key).encrypt_blocks(padded.reshape(n, length // BLOCK_SIZE, BLOCK_SIZE)).reshape(n, length)
+
+
+def ecb_decrypt_batch(ciphertexts, key):
+    data = pack(ciphertexts)
+    n, length = data.shape
+    if length == 0 or length % BLOCK_SIZE:
+        raise ValueError("Длина шифртекста не кратна размеру блока")
+    plain = BatchAes(key).decrypt_blocks(data.reshape(n, length // BLOCK_SIZE, BLOCK_SIZE)).reshape(n, length)
+    return unpad_rows(plain)
+
+
+def cbc_encrypt_batch(messages, key, ivs):
+    """CBC для N сообщений: шаг сцепления j выполняется для j-го блока всех сообщений сразу"""
+    return _cbc_encrypt_padded(pad_rows(pack(messages)), key, ivs)
+
+
+def _cbc_encrypt_padded(padded, key, ivs):
+    n, length = padded.shape
+    cipher = BatchAes(key)
+    blocks = padded.reshape(n, length // BLOCK_SIZE, BLOCK_SIZE)
+    out = np.empty_like(blocks)
+    previous = _ivs(ivs, n)
+    for j in range(blocks.shape[1]):
+        previous = cipher.encrypt_blocks(blocks[:, j] ^ previous)
+        out[:, j] = previous
+    return out.reshape(n, length)
+
+
+def cbc_decrypt_batch(ciphertexts, key, ivs):
+    """Расшифрование CBC не сцеплено: все блоки всех сообщений расшифровываются одним вызовом"""
+    data = pack(ciphertexts)
+    n, length = data.shape
+    if length == 0 or length % BLOCK_SIZE:
+        raise ValueError("Длина шифртекста не кратна размеру блока")
+    blocks = data.reshape(n, length // BLOCK_SIZE, BLOCK_SIZE)
+    plain = BatchAes(key).decrypt_blocks(blocks)
+    plain[:, 0] ^= _ivs(ivs, n)
+    plain[:, 1:] ^= blocks[:, :-1]
+    return unpad_rows(plain.reshape(n, length))
+
+
+def encrypt_many(messages, key, mode="cbc", ivs=None):
+    """Сообщения произвольной длины: корзины по дополненной длине шифруются пакетно,
+    результат - список bytes в исходном порядке"""
+    if mode not in ("ecb", "cbc"):
+        raise ValueError(f"Пакетный режим не поддерживается: {mode}")
+    if mode == "cbc" and ivs is None:
+        raise ValueError("Нужен IV")
+    single_iv = isinstance(ivs, (bytes, bytearray, memoryview))
+    buckets = {}
+    for index, message in enumerate(messages):
+        buckets.setdefault(len(message) // BLOCK_SIZE + 1, []).append(index)
+
+    results = [None] * len(messages)
+    for indexes in buckets.values():
+        # сообщения корзины разной длины, но после дополнения длина у всех одна
+        padded = pack([pad_text(bytes(messages[i]), BLOCK_SIZE) for i in indexes])
+        if mode == "ecb":
+            out = _ecb_encrypt_padded(padded, key)
+        else:
+            out = _cbc_encrypt_padded(padded, key, ivs if single_iv else [ivs[i] for i in indexes])
+        for i, row in zip(indexes, out):
+            results[i] = row.tobytes()
+    return results
+
+
+def benchmark(count=10000, size=32, key=b"secretkey1234567"):
+    """Наносекунд на запись: пакет против поштучных вызовов main_2"""
+    messages = [os.urandom(size) for _ in range(count)]
+    sample = max(count // 10, 1)  # поштучные вызовы медленные, хватает части сообщений
+    iv = os.urandom(BLOCK_SIZE)
+    results = {}
+    for mode, batch, single in (("ecb", lambda: ecb_encrypt_batch(messages, key),
+                                 lambda: [main_2.ecb_encrypt(m, key) for m in messages[:sample]]),
+                                ("cbc", lambda: cbc_encrypt_batch(messages, key, iv),
+                                 lambda: [main_2.cbc_encrypt(m, key, iv) for m in messages[:sample]])):
+        start = time.perf_counter()
+        batch()
+        batch_ns = (time.perf_counter() - start) / count * 1e9
+        start = time.perf_counter()
+        single()
+        single_ns = (time.perf_counter() - start) / sample * 1e9
+        results[mode] = (batch_ns, single_ns)
+    return results
+
+
+if __name__ == "__main__":
+    for mode, (batch_ns, single_ns) in benchmark().items():
+        print(f"{mode}: пакет {batch_ns:.0f} нс/запись, по одному {single_ns:.0f} нс/запись")
@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import main_2
+from functions.aes import aes_encrypt_blocks, aes_decrypt_blocks
+from functions.cbc import cbc_encrypt
+from functions.cfb import cfb_encrypt
+from functions.ecb import ecb_encrypt
+from functions.gcm import gcm_encrypt
+from functions import metrics
+from functions.keyed import KeyedCipher
+from functions.ofb import ofb_encrypt
+
+KEY = "secretkey"
+AES_KEY = b"secretkey1234567"
+AES_IV = b"initialiv1234567"
+AAD = b"authdata"
+
+DEFAULT_SIZES = "16,1K,64K,1M"
+MIN_TIME = 0.2  # секунд на один замер: короткие сообщения повторяются, пока не наберётся время
+THRESHOLD = 0.10  # падение скорости больше чем на 10% считается регрессией
+
+PER_CALL = {
+    "ecb": lambda m, iv: ecb_encrypt(m, KEY),
+    "cbc": lambda m, iv: cbc_encrypt(m, KEY, iv),
+    "cfb": lambda m, iv: cfb_encrypt(m, KEY, iv),
+    "ofb": lambda m, iv: ofb_encrypt(m, KEY, iv),
+    "gcm": lambda m, iv: gcm_encrypt(m, KEY, iv),
+}
+
+
+def _same(data):
+    return data
+
+
+def _aligned(data):
+    """Целые 16-байтовые блоки, не меньше одного: реальный объём замера берётся по результату"""
+    return data[:len(data) - len(data) % 16] or bytes(16)
+
+
+def _main_2_cases():
+    """(режим, операция, размер блока, подготовка(data) -> аргумент, функция(аргумент))"""
+    key, iv = AES_KEY, AES_IV
+    gcm_iv = iv[:12]
+
+    def encrypted(func, *args):
+        return lambda data: func(data, *args)
+
+    def gcm_encrypted(data):
+        return main_2.gcm_encrypt(data, key, gcm_iv, AAD)
+
+    return [
+        ("ecb", "encrypt", 16, _same, lambda d: main_2.ecb_encrypt(d, key)),
+        ("ecb", "decrypt", 16, encrypted(main_2.ecb_encrypt, key), lambda c: main_2.ecb_decrypt(c, key)),
+        ("cbc", "encrypt", 16, _same, lambda d: main_2.cbc_encrypt(d, key, iv)),
+        ("cbc", "decrypt", 16, encrypted(main_2.cbc_encrypt, key, iv), lambda c: main_2.cbc_decrypt(c, key, iv)),
+        ("cfb8", "encrypt", 1, _same, lambda d: main_2.cfb_encrypt(d, key, iv)),
+        ("cfb8", "decrypt", 1, encrypted(main_2.cfb_encrypt, key, iv), lambda c: main_2.cfb_decrypt(c, key, iv)),
+        ("cfb128", "encrypt", 16, _same, lambda d: main_2.cfb_encrypt(d, key, iv, 16)),
+        ("cfb128", "decrypt", 16, encrypted(main_2.cfb_encrypt, key, iv, 16),
+         lambda c: main_2.cfb_decrypt(c, key, iv, 16)),
+        ("ofb", "encrypt", 16, _same, lambda d: main_2.ofb_encrypt(d, key, iv)),
+        ("ofb", "decrypt", 16, encrypted(main_2.ofb_encrypt, key, iv), lambda c: main_2.ofb_decrypt(c, key, iv)),
+        ("gcm", "encrypt", 16, _same, lambda d: main_2.gcm_encrypt(d, key, gcm_iv, AAD)),
+        ("gcm", "decrypt", 16, gcm_encrypted, lambda ct: main_2.gcm_decrypt(ct[0], key, gcm_iv, AAD, ct[1])),
+    ]
+
+
+def _functions_cases():
+    """В functions/ есть только шифрование"""
+    return [
+        ("ecb", "encrypt", 8, _same, lambda d: ecb_encrypt(d, KEY)),
+        ("cbc", "encrypt", 8, _same, lambda d: cbc_encrypt(d, KEY, "randomiv")),
+        ("cfb", "encrypt", 1, _same, lambda d: cfb_encrypt(d, KEY, "randomiv")),
+        ("ofb", "encrypt", 1, _same, lambda d: ofb_encrypt(d, KEY, "randomiv")),
+        ("gcm", "encrypt", 16, _same, lambda d: gcm_encrypt(d, KEY, "randomiv")),
+    ]
+
+
+def _aes_cases():
+    """Голый блочный шифр по размерам ключа"""
+    cases = []
+    for size in (16, 24, 32):
+        key = AES_KEY.ljust(size, b'k')
+        cases.append((f"aes-{size * 8}", "encrypt", 16, _aligned, lambda d, k=key: aes_encrypt_blocks(d, k)))
+        cases.append((f"aes-{size * 8}", "decrypt", 16, _aligned, lambda d, k=key: aes_decrypt_blocks(d, k)))
+    return cases
+
+
+SUITES = {
+    "main_2": _main_2_cases,
+    "functions": _functions_cases,
+    "aes": _aes_cases,
+}
+
+
+def parse_size(text):
+    """'16', '64K', '1M', '1G' -> байты"""
+    text = text.strip().upper()
+    for suffix, factor in (("K", 2 ** 10), ("M", 2 ** 20), ("G", 2 ** 30)):
+        if text.endswith(suffix):
+            return int(text[:-1]) * factor
+    return int(text)
+
+
+def measure(func, arg, min_time=MIN_TIME):
+    """Лучшее время одного вызова и число повторов"""
+    best = float("inf")
+    runs = 0
+    total = 0.0
+    while total < min_time or runs == 0:
+        start = time.perf_counter()
+        func(arg)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        runs += 1
+    return best, runs
+
+
+def measure_memory(func, arg):
+    """Пик памяти за вызов (tracemalloc), объём и число выделений, живых после вызова"""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func(arg)
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        del result
+    finally:
+        tracemalloc.stop()
+    return peak - before, current - before, blocks
+
+
+def run_suite(suites, sizes, min_time=MIN_TIME, memory=True, log=None):
+    results = []
+    for suite in suites:
+        for mode, op, block_size, prepare, func in SUITES[suite]():
+            for size in sizes:
+                arg = prepare(os.urandom(size))
+                if prepare is _aligned:
+                    size = len(arg)
+                best, runs = measure(func, arg, min_time)
+                blocks = max(-(-size // block_size), 1)
+                record = {
+                    "suite": suite, "mode": mode, "op": op, "size": size,
+                    "mb_s": size / best / 2 ** 20, "ns_per_block": best / blocks * 1e9,
+                    "seconds": best, "runs": runs,
+                }
+                if memory:
+                    peak, retained, alloc_blocks = measure_memory(func, arg)
+                    record.update(peak_bytes=peak, retained_bytes=retained, alloc_blocks=alloc_blocks)
+                results.append(record)
+                if log:
+                    log(record)
+    return results
+
+
+def _key(record):
+    return record["suite"], record["mode"], record["op"], record["size"]
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    """Пары (запись, отношение скоростей) для замеров, где скорость упала больше чем на threshold"""
+    reference = {_key(r): r for r in baseline["results"]}
+    regressions = []
+    for record in current["results"]:
+        base = reference.get(_key(record))
+        if base is None:
+            continue
+        ratio = record["mb_s"] / base["mb_s"]
+        if ratio < 1 - threshold:
+            regressions.append((record, ratio))
+    return regressions
+
+
+def bench_keyed(sizes=(32, 64, 128, 256, 512), count=2000):
+    """Сообщений в секунду: отдельные вызовы *_encrypt против KeyedCipher.encrypt_many"""
+    results = []
+    for mode, encrypt in PER_CALL.items():
+        cipher = KeyedCipher(mode, KEY)
+        for size in sizes:
+            messages = [os.urandom(size) for _ in range(count)]
+            ivs = [os.urandom(6).hex() for _ in range(count)]
+
+            start = time.perf_counter()
+            for m, iv in zip(messages, ivs):
+                encrypt(m, iv)
+            per_call = count / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            cipher.encrypt_many(messages, ivs)
+            batch = count / (time.perf_counter() - start)
+
+            results.append({"mode": mode, "size": size, "per_call": per_call, "batch": batch})
+    return results
+
+
+def _print_record(r):
+    line = "| {:<9} | {:<7} | {:<7} | {:>10} | {:>10.3f} | {:>12.0f} |".format(
+        r["suite"], r["mode"], r["op"], r["size"], r["mb_s"], r["ns_per_block"])
+    if "peak_bytes" in r:
+        line += " {:>12} |".format(r["peak_bytes"])
+    print(line, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности режимов шифрования")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    modes = commands.add_parser("modes", help="все режимы на разных размерах сообщений")
+    modes.add_argument("--suite", action="append", choices=sorted(SUITES),
+                       help="набор замеров (по умолчанию все)")
+    modes.add_argument("--sizes", default=DEFAULT_SIZES, help="размеры через запятую, например 16,1K,1M,1G")
+    modes.add_argument("--min-time", type=float, default=MIN_TIME)
+    modes.add_argument("--no-memory", action="store_true", help="не замерять память (tracemalloc)")
+    modes.add_argument("--output", help="куда записать результаты в JSON")
+    modes.add_argument("--metrics", action="store_true",
+                       help="включить инструментацию и вывести счётчики этапов (замедляет замеры)")
+
+    cmp = commands.add_parser("compare", help="сравнить результаты с сохранённой базой")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=THRESHOLD)
+
+    keyed = commands.add_parser("keyed", help="сообщений/с для коротких сообщений под одним ключом")
+    keyed.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.command == "modes":
+        sizes = [parse_size(s) for s in args.sizes.split(",")]
+        if args.metrics:
+            metrics.enable()
+        print("| {:<9} | {:<7} | {:<7} | {:>10} | {:>10} | {:>12} |".format(
+            "Набор", "Режим", "Опер.", "Байт", "МБ/с", "нс/блок") + ("" if args.no_memory else " Пик, байт    |"))
+        results = run_suite(args.suite or list(SUITES), sizes, args.min_time, not args.no_memory, _print_record)
+        if args.metrics:
+            print(metrics.prometheus(), end="")
+        if args.output:
+            report = {
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+            }
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+
+    elif args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        for record, ratio in regressions:
+            print("Регрессия: {suite} {mode} {op} {size} байт - {mb_s:.3f} МБ/с".format(**record) +
+                  f" ({(1 - ratio) * 100:.0f}% медленнее базы)")
+        if regressions:
+            sys.exit(1)
+        print("Регрессий нет")
+
+    elif args.command == "keyed":
+        print("| {:<5} | {:>6} | {:>14} | {:>14} |".format("Режим", "Байт", "вызовы, сообщ/с", "пачка, сообщ/с"))
+        for r in bench_keyed(count=args.count):
+            print("| {:<5} | {:>6} | {:>14.0f} | {:>14.0f} |".format(r["mode"], r["size"], r["per_call"], r["batch"]))
+
+
+if __name__ == "__main__":
+    main()
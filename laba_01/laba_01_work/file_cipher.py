@@ -0,0 +1,188 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import main_2
+from functions.aes import KEY_SIZES
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+CHUNK_SIZE = 64 * 1024
+QUEUE_SIZE = 8
+TAG_SIZE = 16
+
+MODES = ("ecb", "cbc", "cfb", "ofb", "gcm")
+
+_READ_FAILED = object()  # метка в очереди: чтение оборвалось, файл не дочитан
+
+
+def make_cipher(mode, decrypt, key, iv, aad=b'', segment_size=1):
+    """Создаёт потоковый контекст режима из main_2"""
+    if mode == "ecb":
+        return main_2.EcbDecryptor(key) if decrypt else main_2.EcbEncryptor(key)
+    if mode == "cbc":
+        return main_2.CbcDecryptor(key, iv) if decrypt else main_2.CbcEncryptor(key, iv)
+    if mode == "cfb":
+        cls = main_2.CfbDecryptor if decrypt else main_2.CfbEncryptor
+        return cls(key, iv, segment_size)
+    if mode == "ofb":
+        return main_2.OfbEncryptor(key, iv)
+    if mode == "gcm":
+        return main_2.GcmDecryptor(key, iv, aad) if decrypt else main_2.GcmEncryptor(key, iv, aad)
+    raise ValueError(f"Неизвестный режим: {mode}")
+
+
+def peak_rss():
+    """Пиковый объём резидентной памяти процесса в байтах (None, если недоступно)"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def _reader(src, chunk_size, chunks, errors):
+    end = None
+    try:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            chunks.put(chunk)
+    except Exception as exc:
+        errors.append(exc)
+        end = _READ_FAILED
+    finally:
+        chunks.put(end)
+
+
+def _writer(dst, results, errors):
+    failed = False
+    while True:
+        chunk = results.get()
+        if chunk is None:
+            break
+        if failed:
+            continue  # дочитываем очередь, чтобы не заблокировать шифрование
+        try:
+            dst.write(chunk)
+        except Exception as exc:
+            errors.append(exc)
+            failed = True
+
+
+def _cipher_stage(cipher, chunks, results, decrypt_gcm):
+    """Шифрует куски из очереди; для расшифрования GCM придерживает последние TAG_SIZE байт (тег).
+    Если чтение оборвалось, контекст не завершается: тег по неполным данным не вычисляется"""
+    tail = b''
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _READ_FAILED:
+                return
+            if chunk is None:
+                break
+            if decrypt_gcm:
+                chunk = tail + chunk
+                tail = chunk[-TAG_SIZE:]
+                chunk = chunk[:-TAG_SIZE]
+            results.put(cipher.update(chunk))
+        if decrypt_gcm:
+            if len(tail) != TAG_SIZE:
+                raise ValueError("Файл слишком короткий: нет тега аутентификации")
+            results.put(cipher.finalize(tail))
+        else:
+            results.put(cipher.finalize())
+            if isinstance(cipher, main_2.GcmEncryptor):
+                results.put(cipher.tag)
+    finally:
+        results.put(None)
+
+
+def _discard(path):
+    """Удаляет недописанный результат; устройства вроде /dev/null не трогает"""
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def process_file(src_path, dst_path, cipher, chunk_size=CHUNK_SIZE, queue_size=QUEUE_SIZE):
+    """Пропускает файл через cipher тремя потоками (чтение, шифрование, запись),
+    связанными ограниченными очередями; возвращает число прочитанных байт.
+    При любой ошибке (подделка, ошибка чтения или записи) dst удаляется:
+    неподлинный или оборванный результат не остаётся"""
+    decrypt_gcm = isinstance(cipher, main_2.GcmDecryptor)
+    chunks = queue.Queue(maxsize=queue_size)
+    results = queue.Queue(maxsize=queue_size)
+    errors = []
+
+    with open(src_path, "rb") as src:
+        try:
+            with open(dst_path, "wb") as dst:
+                reader = threading.Thread(target=_reader, args=(src, chunk_size, chunks, errors), daemon=True)
+                writer = threading.Thread(target=_writer, args=(dst, results, errors), daemon=True)
+                reader.start()
+                writer.start()
+                try:
+                    _cipher_stage(cipher, chunks, results, decrypt_gcm)
+                finally:
+                    # при ошибке шифрования освобождаем читателя, чтобы он мог завершиться
+                    while reader.is_alive():
+                        try:
+                            chunks.get(timeout=0.1)
+                        except queue.Empty:
+                            pass
+                    reader.join()
+                    writer.join()
+            if errors:
+                raise errors[0]
+        except BaseException:
+            _discard(dst_path)
+            raise
+        return src.tell()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Потоковое шифрование файлов режимами ECB/CBC/CFB/OFB/GCM")
+    parser.add_argument("action", choices=("encrypt", "decrypt"))
+    parser.add_argument("mode", choices=MODES)
+    parser.add_argument("src", help="входной файл")
+    parser.add_argument("dst", help="выходной файл")
+    parser.add_argument("--key", required=True)
+    parser.add_argument("--iv", default="")
+    parser.add_argument("--aad", default="", help="дополнительные данные для GCM")
+    parser.add_argument("--segment-size", type=int, default=1, help="размер сегмента CFB в байтах")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    args = parser.parse_args(argv)
+
+    key = args.key.encode('utf-8')
+    if len(key) not in KEY_SIZES:
+        parser.error("ключ AES должен быть длиной 16, 24 или 32 байта")
+    if args.mode == "gcm" and not args.iv:
+        parser.error("для GCM нужен --iv (рекомендуется 12 байт)")
+
+    cipher = make_cipher(args.mode, args.action == "decrypt", key,
+                         args.iv.encode('utf-8'), args.aad.encode('utf-8'), args.segment_size)
+
+    start = time.perf_counter()
+    try:
+        size = process_file(args.src, args.dst, cipher, args.chunk_size, args.queue_size)
+    except (ValueError, OSError) as exc:
+        print(f"Ошибка: {exc}", file=sys.stderr)
+        return 1
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    rss = peak_rss()
+    print(f"Обработано {size} байт за {elapsed:.3f} с ({size / elapsed / 2 ** 20:.2f} МБ/с)")
+    print(f"Пиковая память: {rss / 2 ** 20:.1f} МБ" if rss is not None else "Пиковая память: н/д")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
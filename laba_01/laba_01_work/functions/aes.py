@@ -0,0 +1,186 @@
+import struct
+from functools import lru_cache
+
+BLOCK_SIZE = 16
+KEY_SIZES = (16, 24, 32)
+
+_BLOCK = struct.Struct('>4I')
+
+
+def _xtime(a):
+    """Умножение на x (т.е. на 2) в GF(2^8) по модулю x^8 + x^4 + x^3 + x + 1"""
+    a <<= 1
+    return a ^ 0x11B if a & 0x100 else a
+
+
+def _build_tables():
+    """S-блок, обратный S-блок и T-таблицы шифрования/расшифрования"""
+    exp = [0] * 255
+    log = [0] * 256
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        x ^= _xtime(x)  # умножение на генератор 3
+
+    def mul(a, b):
+        return exp[(log[a] + log[b]) % 255] if a and b else 0
+
+    sbox = [0] * 256
+    for a in range(256):
+        inv = exp[(255 - log[a]) % 255] if a else 0
+        s = inv
+        for _ in range(4):
+            inv = ((inv << 1) | (inv >> 7)) & 0xFF
+            s ^= inv
+        sbox[a] = s ^ 0x63
+    inv_sbox = [0] * 256
+    for a, s in enumerate(sbox):
+        inv_sbox[s] = a
+
+    def ror8(table):
+        return [((w >> 8) | (w << 24)) & 0xFFFFFFFF for w in table]
+
+    te0 = [(mul(s, 2) << 24) | (s << 16) | (s << 8) | mul(s, 3) for s in sbox]
+    td0 = [(mul(s, 14) << 24) | (mul(s, 9) << 16) | (mul(s, 13) << 8) | mul(s, 11) for s in inv_sbox]
+    te1 = ror8(te0)
+    te2 = ror8(te1)
+    te3 = ror8(te2)
+    td1 = ror8(td0)
+    td2 = ror8(td1)
+    td3 = ror8(td2)
+    return sbox, inv_sbox, (te0, te1, te2, te3), (td0, td1, td2, td3)
+
+
+SBOX, INV_SBOX, _TE, _TD = _build_tables()
+
+
+def _expand_key(key):
+    """Расписание ключа AES: 4 * (Nr + 1) 32-битных слов"""
+    nk = len(key) // 4
+    rounds = nk + 6
+    words = list(struct.unpack(f'>{nk}I', key))
+    rcon = 1
+    sbox = SBOX
+    for i in range(nk, 4 * (rounds + 1)):
+        t = words[-1]
+        if i % nk == 0:
+            t = ((t << 8) | (t >> 24)) & 0xFFFFFFFF
+            t = (sbox[t >> 24] << 24) | (sbox[(t >> 16) & 255] << 16) | (sbox[(t >> 8) & 255] << 8) | sbox[t & 255]
+            t ^= rcon << 24
+            rcon = _xtime(rcon)
+        elif nk > 6 and i % nk == 4:
+            t = (sbox[t >> 24] << 24) | (sbox[(t >> 16) & 255] << 16) | (sbox[(t >> 8) & 255] << 8) | sbox[t & 255]
+        words.append(words[i - nk] ^ t)
+    return rounds, words
+
+
+class AesKey:
+    """Развёрнутый ключ AES-128/192/256: расписание для шифрования и для обратного шифра"""
+
+    def __init__(self, key):
+        key = bytes(key)
+        if len(key) not in KEY_SIZES:
+            raise ValueError("Ключ AES должен быть длиной 16, 24 или 32 байта")
+        self.rounds, self.enc_keys = _expand_key(key)
+
+        # Эквивалентный обратный шифр: раундовые ключи в обратном порядке,
+        # к средним раундам применён InvMixColumns
+        td0, td1, td2, td3 = _TD
+        sbox = SBOX
+        dec_keys = []
+        for r in range(self.rounds, -1, -1):
+            round_key = self.enc_keys[4 * r:4 * r + 4]
+            if 0 < r < self.rounds:
+                round_key = [td0[sbox[w >> 24]] ^ td1[sbox[(w >> 16) & 255]] ^
+                             td2[sbox[(w >> 8) & 255]] ^ td3[sbox[w & 255]] for w in round_key]
+            dec_keys.extend(round_key)
+        self.dec_keys = dec_keys
+
+    def encrypt_blocks(self, data):
+        """Шифрует подряд идущие 16-байтовые блоки data"""
+        if len(data) % BLOCK_SIZE:
+            raise ValueError("Длина данных должна быть кратна 16 байтам")
+        te0, te1, te2, te3 = _TE
+        sbox = SBOX
+        rk = self.enc_keys
+        rounds = self.rounds
+        unpack = _BLOCK.unpack_from
+        pack = _BLOCK.pack_into
+        out = bytearray(len(data))
+        for i in range(0, len(data), BLOCK_SIZE):
+            s0, s1, s2, s3 = unpack(data, i)
+            s0 ^= rk[0]
+            s1 ^= rk[1]
+            s2 ^= rk[2]
+            s3 ^= rk[3]
+            k = 4
+            for _ in range(rounds - 1):
+                t0 = te0[s0 >> 24] ^ te1[(s1 >> 16) & 255] ^ te2[(s2 >> 8) & 255] ^ te3[s3 & 255] ^ rk[k]
+                t1 = te0[s1 >> 24] ^ te1[(s2 >> 16) & 255] ^ te2[(s3 >> 8) & 255] ^ te3[s0 & 255] ^ rk[k + 1]
+                t2 = te0[s2 >> 24] ^ te1[(s3 >> 16) & 255] ^ te2[(s0 >> 8) & 255] ^ te3[s1 & 255] ^ rk[k + 2]
+                t3 = te0[s3 >> 24] ^ te1[(s0 >> 16) & 255] ^ te2[(s1 >> 8) & 255] ^ te3[s2 & 255] ^ rk[k + 3]
+                s0, s1, s2, s3 = t0, t1, t2, t3
+                k += 4
+            pack(out, i,
+                 ((sbox[s0 >> 24] << 24) | (sbox[(s1 >> 16) & 255] << 16) |
+                  (sbox[(s2 >> 8) & 255] << 8) | sbox[s3 & 255]) ^ rk[k],
+                 ((sbox[s1 >> 24] << 24) | (sbox[(s2 >> 16) & 255] << 16) |
+                  (sbox[(s3 >> 8) & 255] << 8) | sbox[s0 & 255]) ^ rk[k + 1],
+                 ((sbox[s2 >> 24] << 24) | (sbox[(s3 >> 16) & 255] << 16) |
+                  (sbox[(s0 >> 8) & 255] << 8) | sbox[s1 & 255]) ^ rk[k + 2],
+                 ((sbox[s3 >> 24] << 24) | (sbox[(s0 >> 16) & 255] << 16) |
+                  (sbox[(s1 >> 8) & 255] << 8) | sbox[s2 & 255]) ^ rk[k + 3])
+        return bytes(out)
+
+    def decrypt_blocks(self, data):
+        """Расшифровывает подряд идущие 16-байтовые блоки data"""
+        if len(data) % BLOCK_SIZE:
+            raise ValueError("Длина данных должна быть кратна 16 байтам")
+        td0, td1, td2, td3 = _TD
+        inv_sbox = INV_SBOX
+        rk = self.dec_keys
+        rounds = self.rounds
+        unpack = _BLOCK.unpack_from
+        pack = _BLOCK.pack_into
+        out = bytearray(len(data))
+        for i in range(0, len(data), BLOCK_SIZE):
+            s0, s1, s2, s3 = unpack(data, i)
+            s0 ^= rk[0]
+            s1 ^= rk[1]
+            s2 ^= rk[2]
+            s3 ^= rk[3]
+            k = 4
+            for _ in range(rounds - 1):
+                t0 = td0[s0 >> 24] ^ td1[(s3 >> 16) & 255] ^ td2[(s2 >> 8) & 255] ^ td3[s1 & 255] ^ rk[k]
+                t1 = td0[s1 >> 24] ^ td1[(s0 >> 16) & 255] ^ td2[(s3 >> 8) & 255] ^ td3[s2 & 255] ^ rk[k + 1]
+                t2 = td0[s2 >> 24] ^ td1[(s1 >> 16) & 255] ^ td2[(s0 >> 8) & 255] ^ td3[s3 & 255] ^ rk[k + 2]
+                t3 = td0[s3 >> 24] ^ td1[(s2 >> 16) & 255] ^ td2[(s1 >> 8) & 255] ^ td3[s0 & 255] ^ rk[k + 3]
+                s0, s1, s2, s3 = t0, t1, t2, t3
+                k += 4
+            pack(out, i,
+                 ((inv_sbox[s0 >> 24] << 24) | (inv_sbox[(s3 >> 16) & 255] << 16) |
+                  (inv_sbox[(s2 >> 8) & 255] << 8) | inv_sbox[s1 & 255]) ^ rk[k],
+                 ((inv_sbox[s1 >> 24] << 24) | (inv_sbox[(s0 >> 16) & 255] << 16) |
+                  (inv_sbox[(s3 >> 8) & 255] << 8) | inv_sbox[s2 & 255]) ^ rk[k + 1],
+                 ((inv_sbox[s2 >> 24] << 24) | (inv_sbox[(s1 >> 16) & 255] << 16) |
+                  (inv_sbox[(s0 >> 8) & 255] << 8) | inv_sbox[s3 & 255]) ^ rk[k + 2],
+                 ((inv_sbox[s3 >> 24] << 24) | (inv_sbox[(s2 >> 16) & 255] << 16) |
+                  (inv_sbox[(s1 >> 8) & 255] << 8) | inv_sbox[s0 & 255]) ^ rk[k + 3])
+        return bytes(out)
+
+
+@lru_cache(maxsize=64)
+def aes_key(key):
+    """Расписание ключа строится один раз на ключ и переиспользуется во всех вызовах"""
+    return AesKey(key)
+
+
+def aes_encrypt_blocks(data, key, block_size=BLOCK_SIZE):
+    """Пакетное шифрование блоков AES (сигнатура как у функций блоков в functions.parallel)"""
+    return aes_key(bytes(key)).encrypt_blocks(data)
+
+
+def aes_decrypt_blocks(data, key, block_size=BLOCK_SIZE):
+    """Пакетное расшифрование блоков AES"""
+    return aes_key(bytes(key)).decrypt_blocks(data)
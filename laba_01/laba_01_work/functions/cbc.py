@@ -1,25 +1,18 @@
+from functions.engine import xor_bytes, expand_key, as_buffer, writable_buffer, unpad_length, CHUNK_SIZE
+
+
 def pad_text(text, block_size):
     """Дополняет текст до длины, кратной block_size"""
     padding_len = block_size - (len(text) % block_size)
     padding = bytes([padding_len] * padding_len)
-    return text + padding
-
-def xor_bytes(a, b):
-    """Выполняет побитовое XOR двух байтовых строк одинаковой длины"""
-    return bytes(x ^ y for x, y in zip(a, b))
-
+    return bytes(text) + padding
 
 def cbc_encrypt(plaintext, key, iv):
     """Шифрование в режиме CBC (принимает как текст, так и бинарные данные)"""
     block_size = 8
 
-    # Если plaintext - строка, преобразуем в байты, иначе считаем, что это уже байты
-    if isinstance(plaintext, str):
-        plaintext_bytes = plaintext.encode('utf-8')
-    elif isinstance(plaintext, bytes):
-        plaintext_bytes = plaintext
-    else:
-        raise ValueError("plaintext должен быть строкой или байтами")
+    # Строка кодируется в байты, bytes и прочие буферы (bytearray, memoryview, mmap) берутся без копирования
+    plaintext_bytes = as_buffer(plaintext)
 
     key_bytes = key.encode('utf-8')
     iv_bytes = iv.encode('utf-8')
@@ -32,17 +25,57 @@ def cbc_encrypt(plaintext, key, iv):
         iv_bytes = iv_bytes + b'\x00' * (block_size - len(iv_bytes))
     iv_bytes = iv_bytes[:block_size]
 
+    return cbc_encrypt_bytes(plaintext_bytes, key_bytes, iv_bytes)
+
+
+def cbc_encrypt_bytes(plaintext_bytes, key_bytes, iv_bytes, block_size=8):
+    """CBC для уже подготовленных байтов открытого текста, ключа и IV"""
     # Дополнение данных
     padded_data = pad_text(plaintext_bytes, block_size)
 
-    ciphertext = b''
+    ciphertext = bytearray(len(padded_data))
     previous_block = iv_bytes
 
     for i in range(0, len(padded_data), block_size):
         block = padded_data[i:i + block_size]
         block_xor = xor_bytes(block, previous_block)
         encrypted_block = xor_bytes(block_xor, key_bytes)
-        ciphertext += encrypted_block
+        ciphertext[i:i + block_size] = encrypted_block
         previous_block = encrypted_block
 
-    return ciphertext
+    return bytes(ciphertext)
+
+
+def cbc_encrypt_into(src, dst, key_bytes, iv_bytes, block_size=8):
+    """CBC из буфера src в буфер dst: блоки читаются срезами memoryview и пишутся прямо в dst,
+    дополняется только последний блок. Возвращает число записанных байт"""
+    src = as_buffer(src)
+    full = len(src) - len(src) % block_size
+    size = full + block_size
+    out = writable_buffer(dst, size)
+    previous_block = iv_bytes
+    for i in range(0, full, block_size):
+        previous_block = xor_bytes(xor_bytes(src[i:i + block_size], previous_block), key_bytes)
+        out[i:i + block_size] = previous_block
+    last_block = pad_text(src[full:], block_size)
+    out[full:size] = xor_bytes(xor_bytes(last_block, previous_block), key_bytes)
+    return size
+
+
+def cbc_decrypt_into(src, dst, key_bytes, iv_bytes, block_size=8):
+    """Расшифрование CBC в dst: P_i = D(C_i) XOR C_(i-1) не зависит от соседних открытых блоков,
+    поэтому порция считается целиком. src и dst могут быть одним буфером.
+    Возвращает длину открытого текста без дополнения"""
+    src = as_buffer(src)
+    if not src or len(src) % block_size:
+        raise ValueError("Длина шифртекста не кратна размеру блока")
+    out = writable_buffer(dst, len(src))
+    step = CHUNK_SIZE - CHUNK_SIZE % block_size
+    key_stream = expand_key(key_bytes, block_size) * (step // block_size)
+    previous = bytes(iv_bytes)
+    for i in range(0, len(src), step):
+        end = min(i + step, len(src))
+        shifted = previous + bytes(src[i:end - block_size])
+        previous = bytes(src[end - block_size:end])  # до записи: src может совпадать с dst
+        out[i:end] = xor_bytes(xor_bytes(src[i:end], key_stream), shifted)
+    return unpad_length(out, len(src), block_size)
@@ -1,18 +1,12 @@
-def xor_bytes(a, b):
-    """Выполняет побитовое XOR двух байтовых строк"""
-    return bytes(x ^ y for x, y in zip(a, b))
+from functions.engine import xor_bytes, as_buffer, writable_buffer
 
 
 def cfb_encrypt(plaintext, key, iv, segment_size=1):
     """Шифрование в режиме CFB"""
     block_size = 8
 
-    if isinstance(plaintext, str):
-        plaintext_bytes = plaintext.encode('utf-8')
-    elif isinstance(plaintext, bytes):
-        plaintext_bytes = plaintext
-    else:
-        raise ValueError("plaintext должен быть строкой или байтами")
+    # Строка кодируется в байты, bytes и прочие буферы (bytearray, memoryview, mmap) берутся без копирования
+    plaintext_bytes = as_buffer(plaintext)
 
     key_bytes = key.encode('utf-8')
     iv_bytes = iv.encode('utf-8')
@@ -24,16 +18,66 @@ def cfb_encrypt(plaintext, key, iv, segment_size=1):
     if len(iv_bytes) < block_size:
         iv_bytes = iv_bytes + b'\x00' * (block_size - len(iv_bytes))
     iv_bytes = iv_bytes[:block_size]
-    
-    ciphertext = b''
-    shift_register = iv_bytes
 
+    return cfb_encrypt_bytes(plaintext_bytes, key_bytes, iv_bytes, segment_size)
+
+
+def cfb_encrypt_bytes(plaintext_bytes, key_bytes, iv_bytes, segment_size=1):
+    """CFB для уже подготовленных байтов открытого текста, ключа и IV.
+    segment_size - от 1 байта (CFB-8) до размера блока (CFB-64)"""
+    block_size = len(iv_bytes)
+    if not 1 <= segment_size <= block_size:
+        raise ValueError(f"segment_size должен быть от 1 до {block_size}")
+
+    ciphertext = bytearray(len(plaintext_bytes))
+
+    if segment_size == block_size:
+        # Полный блок: регистр целиком заменяется блоком шифртекста, без сдвигов
+        shift_register = iv_bytes
+        for i in range(0, len(plaintext_bytes), block_size):
+            encrypted_block = xor_bytes(shift_register, key_bytes)
+            shift_register = xor_bytes(plaintext_bytes[i:i + block_size], encrypted_block)
+            ciphertext[i:i + block_size] = shift_register
+        return bytes(ciphertext)
+
+    shift_register = bytearray(iv_bytes)
     for i in range(0, len(plaintext_bytes), segment_size):
         encrypted_block = xor_bytes(shift_register, key_bytes)
         plaintext_segment = plaintext_bytes[i:i + segment_size]
         ciphertext_segment = xor_bytes(plaintext_segment, encrypted_block[:segment_size])
-        ciphertext += ciphertext_segment
+        ciphertext[i:i + segment_size] = ciphertext_segment
 
-        shift_register = shift_register[segment_size:] + ciphertext_segment
-    
-    return ciphertext
+        # Сдвиг регистра на месте
+        del shift_register[:segment_size]
+        shift_register += ciphertext_segment
+
+    return bytes(ciphertext)
+
+
+def _cfb_into(src, dst, key_bytes, iv_bytes, segment_size, decrypt):
+    """CFB из src в dst; регистр сдвигается сегментами шифртекста - при расшифровании это вход"""
+    block_size = len(iv_bytes)
+    if not 1 <= segment_size <= block_size:
+        raise ValueError(f"segment_size должен быть от 1 до {block_size}")
+    src = as_buffer(src)
+    out = writable_buffer(dst, len(src))
+
+    shift_register = bytearray(iv_bytes)
+    for i in range(0, len(src), segment_size):
+        encrypted_block = xor_bytes(shift_register, key_bytes)
+        segment = src[i:i + segment_size]
+        ciphertext_segment = bytes(segment) if decrypt else None  # до записи: src может совпадать с dst
+        result = xor_bytes(segment, encrypted_block[:segment_size])
+        out[i:i + len(result)] = result
+        del shift_register[:segment_size]
+        shift_register += result if ciphertext_segment is None else ciphertext_segment
+    return len(src)
+
+
+def cfb_encrypt_into(src, dst, key_bytes, iv_bytes, segment_size=1):
+    """CFB из буфера src в буфер dst (len(dst) >= len(src)), возвращает число записанных байт"""
+    return _cfb_into(src, dst, key_bytes, iv_bytes, segment_size, decrypt=False)
+
+
+def cfb_decrypt_into(src, dst, key_bytes, iv_bytes, segment_size=1):
+    return _cfb_into(src, dst, key_bytes, iv_bytes, segment_size, decrypt=True)
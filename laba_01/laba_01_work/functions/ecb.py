@@ -1,20 +1,18 @@
+from functions.engine import encrypt_blocks, as_buffer, writable_buffer, unpad_length, CHUNK_SIZE
+
+
 def pad_text(text, block_size):
     """Дополняет текст до длины, кратной block_size"""
     padding_len = block_size - (len(text) % block_size)
     padding = bytes([padding_len] * padding_len)
-    return text + padding
+    return bytes(text) + padding
 
 
 def ecb_encrypt(plaintext, key):
     """Шифрование в режиме ECB"""
     block_size = 8
-    # Если plaintext - строка, преобразуем в байты, иначе считаем, что это уже байты
-    if isinstance(plaintext, str):
-        plaintext_bytes = plaintext.encode('utf-8')
-    elif isinstance(plaintext, bytes):
-        plaintext_bytes = plaintext
-    else:
-        raise ValueError("plaintext должен быть строкой или байтами")
+    # Строка кодируется в байты, bytes и прочие буферы (bytearray, memoryview, mmap) берутся без копирования
+    plaintext_bytes = as_buffer(plaintext)
 
     key_bytes = key.encode('utf-8')
 
@@ -22,13 +20,42 @@ def ecb_encrypt(plaintext, key):
         key_bytes = key_bytes + b'\x00' * (block_size - len(key_bytes))
     key_bytes = key_bytes[:block_size]
 
-    padded_text = pad_text(plaintext_bytes, block_size)
+    return ecb_encrypt_bytes(plaintext_bytes, key_bytes)
 
-    ciphertext = b''
-    for i in range(0, len(padded_text), block_size):
-        block = padded_text[i:i + block_size]
-        encrypted_block = bytes(a ^ b for a, b in zip(block, key_bytes))
-        ciphertext += encrypted_block
 
-    return ciphertext
+def ecb_encrypt_bytes(plaintext_bytes, key_bytes, block_size=8):
+    """ECB для уже подготовленных байтов открытого текста и ключа"""
+    padded_text = pad_text(plaintext_bytes, block_size)
+
+    # Блоки ECB независимы, поэтому шифруем всё сообщение за один проход
+    return encrypt_blocks(padded_text, key_bytes, block_size)
+
+
+def ecb_encrypt_into(src, dst, key_bytes, block_size=8):
+    """ECB из буфера src в буфер dst без полноразмерных промежуточных копий: полные блоки шифруются
+    порциями прямо в dst, дополняется только последний блок. Возвращает число записанных байт"""
+    src = as_buffer(src)
+    full = len(src) - len(src) % block_size
+    size = full + block_size
+    out = writable_buffer(dst, size)
+    step = CHUNK_SIZE - CHUNK_SIZE % block_size
+    for i in range(0, full, step):
+        end = min(i + step, full)
+        out[i:end] = encrypt_blocks(src[i:end], key_bytes, block_size)
+    out[full:size] = encrypt_blocks(pad_text(src[full:], block_size), key_bytes, block_size)
+    return size
+
+
+def ecb_decrypt_into(src, dst, key_bytes, block_size=8):
+    """Обратное к ecb_encrypt_into (XOR с ключом обратен сам себе). dst вмещает len(src) байт,
+    возвращается длина открытого текста без дополнения"""
+    src = as_buffer(src)
+    if not src or len(src) % block_size:
+        raise ValueError("Длина шифртекста не кратна размеру блока")
+    out = writable_buffer(dst, len(src))
+    step = CHUNK_SIZE - CHUNK_SIZE % block_size
+    for i in range(0, len(src), step):
+        end = min(i + step, len(src))
+        out[i:end] = encrypt_blocks(src[i:end], key_bytes, block_size)
+    return unpad_length(out, len(src), block_size)
 
@@ -0,0 +1,76 @@
+CHUNK_SIZE = 64 * 1024  # порция для вариантов *_into: промежуточные буферы не больше порции
+
+
+def as_buffer(data):
+    """Строка кодируется в UTF-8; bytes и любые объекты с буферным протоколом (bytearray, memoryview,
+    mmap, array) отдаются без копирования - как есть или как плоский memoryview байтов"""
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    if isinstance(data, bytes):
+        return data
+    try:
+        return memoryview(data).cast('B')
+    except TypeError:
+        raise ValueError("plaintext должен быть строкой или объектом с буферным протоколом") from None
+
+
+def writable_buffer(dst, size):
+    """Плоский memoryview изменяемого буфера dst; проверяет, что в него помещается size байт"""
+    view = memoryview(dst).cast('B')
+    if view.readonly:
+        raise ValueError("Буфер результата доступен только для чтения")
+    if len(view) < size:
+        raise ValueError(f"Буфер результата мал: нужно {size} байт, есть {len(view)}")
+    return view
+
+
+def xor_bytes(a, b):
+    """Побитовое XOR двух байтовых строк (по длине более короткой) одной операцией над длинными целыми"""
+    n = min(len(a), len(b))
+    if n == 0:
+        return b''
+    return (int.from_bytes(a[:n], 'big') ^ int.from_bytes(b[:n], 'big')).to_bytes(n, 'big')
+
+
+def xor_into(dst, a, b, offset=0):
+    """Записывает a XOR b в изменяемый буфер dst начиная с offset, возвращает число записанных байт"""
+    n = min(len(a), len(b))
+    dst[offset:offset + n] = xor_bytes(a, b)
+    return n
+
+
+def unpad_length(buffer, length, block_size):
+    """Длина данных в buffer[:length] без дополнения pad_text (последний байт - длина дополнения)"""
+    padding_len = buffer[length - 1]
+    if not 1 <= padding_len <= block_size or buffer[length - padding_len:length] != bytes([padding_len]) * padding_len:
+        raise ValueError("Неверное дополнение")
+    return length - padding_len
+
+
+def expand_key(key, block_size):
+    """Повторяет ключ до длины блока и обрезает лишнее"""
+    if len(key) < block_size:
+        key = key * (block_size // len(key) + 1)
+    return bytes(key[:block_size])
+
+
+def encrypt_blocks(data, key, block_size):
+    """Шифрует все блоки data (XOR с ключом) за один проход по всему буферу"""
+    if not data:
+        return b''
+    block_key = expand_key(key, block_size)
+    count = -(-len(data) // block_size)
+    return xor_bytes(data, block_key * count)
+
+
+def counter_blocks(counter, count):
+    """Строит подряд count блоков счётчика (32-битный счётчик в конце блока) начиная с counter"""
+    prefix = bytes(counter[:-4])
+    start = int.from_bytes(counter[-4:], 'big')
+    return b''.join(prefix + ((start + i) & 0xFFFFFFFF).to_bytes(4, 'big') for i in range(count))
+
+
+def add_counter(counter, n):
+    """Возвращает блок счётчика, увеличенный на n (32-битный счётчик в конце блока)"""
+    value = (int.from_bytes(counter[-4:], 'big') + n) & 0xFFFFFFFF
+    return bytes(counter[:-4]) + value.to_bytes(4, 'big')
@@ -1,6 +1,6 @@
-def xor_bytes(a, b):
-    """Выполняет побитовое XOR двух байтовых строк"""
-    return bytes(x ^ y for x, y in zip(a, b))
+from functions.engine import xor_bytes, encrypt_blocks, add_counter, as_buffer, writable_buffer, CHUNK_SIZE
+from functions.ghash import Ghash, ghash, gcm_auth_data
+from functions.parallel import ctr_xor
 
 def inc_counter(counter):
     """Увеличивает 32-битный счётчик в конце блока"""
@@ -8,30 +8,12 @@ def inc_counter(counter):
     counter_int = (counter_int + 1) & 0xFFFFFFFF  # Ограничиваем 32 битами
     return counter[:-4] + counter_int.to_bytes(4, 'big')
 
-def ghash(h, data):
-    """Упрощённая имитация GHASH (XOR вместо умножения в поле Галуа)"""
+def gcm_encrypt(plaintext, key, iv, aad=b'', workers=1):
+    """Шифрование в режиме GCM (workers > 1 или None - гамма считается на пуле процессов)"""
     block_size = 16
-    result = bytes(block_size)
 
-    if len(data) % block_size != 0:
-        data += b'\x00' * (block_size - len(data) % block_size)
-
-    for i in range(0, len(data), block_size):
-        block = data[i:i + block_size]
-        result = xor_bytes(result, block)
-    
-    return xor_bytes(result, h)
-
-def gcm_encrypt(plaintext, key, iv, aad=b''):
-    """Шифрование в режиме GCM"""
-    block_size = 16
-
-    if isinstance(plaintext, str):
-        plaintext_bytes = plaintext.encode('utf-8')
-    elif isinstance(plaintext, bytes):
-        plaintext_bytes = plaintext
-    else:
-        raise ValueError("plaintext должен быть строкой или байтами")
+    # Строка кодируется в байты, bytes и прочие буферы (bytearray, memoryview, mmap) берутся без копирования
+    plaintext_bytes = as_buffer(plaintext)
 
     key_bytes = key.encode('utf-8')
     iv_bytes = iv.encode('utf-8')
@@ -42,21 +24,62 @@ def gcm_encrypt(plaintext, key, iv, aad=b''):
 
     if len(iv_bytes) != 12:
         iv_bytes = iv_bytes.ljust(12, b'\x00')[:12]
-    counter = iv_bytes + b'\x00\x00\x00\x01'
+
+    return gcm_encrypt_bytes(plaintext_bytes, key_bytes, iv_bytes, aad, workers)
+
+
+def gcm_encrypt_bytes(plaintext_bytes, key_bytes, iv_bytes, aad=b'', workers=1, block_size=16):
+    """GCM для уже подготовленных байтов открытого текста, ключа и 12-байтового IV"""
+    j0 = iv_bytes + b'\x00\x00\x00\x01'  # блок J0 маскирует тег, данные шифруются начиная с J0 + 1
 
     h = xor_bytes(bytes(block_size), key_bytes)
     
-    ciphertext = b''
-    for i in range(0, len(plaintext_bytes), block_size):
-        keystream = xor_bytes(counter, key_bytes)
-        plaintext_block = plaintext_bytes[i:i + block_size]
-        ciphertext_block = xor_bytes(plaintext_block, keystream[:len(plaintext_block)])
-        ciphertext += ciphertext_block
-        counter = inc_counter(counter)
-
-    len_aad = len(aad) * 8
-    len_ciphertext = len(ciphertext) * 8
-    auth_data = aad + ciphertext + len_aad.to_bytes(8, 'big') + len_ciphertext.to_bytes(8, 'big')
-    tag = ghash(h, auth_data)
+    # Блоки счётчика не зависят от данных: строим их сразу и шифруем одним проходом
+    # (или по диапазонам на нескольких ядрах)
+    ciphertext = ctr_xor(plaintext_bytes, key_bytes, inc_counter(j0), encrypt_blocks, block_size, workers)
+
+    auth_data = gcm_auth_data(aad, ciphertext)
+    tag = xor_bytes(ghash(h, auth_data), encrypt_blocks(j0, key_bytes, block_size))
     
     return ciphertext, tag
+
+
+def _gcm_into(src, dst, key_bytes, iv_bytes, aad, tag, block_size):
+    """GCM из src в dst порциями; GHASH считается по шифртексту потоково.
+    При расшифровании (tag задан) тег проверяется отдельным проходом до записи открытого текста"""
+    src = as_buffer(src)
+    out = writable_buffer(dst, len(src))
+    j0 = bytes(iv_bytes) + b'\x00\x00\x00\x01'
+    h = xor_bytes(bytes(block_size), key_bytes)
+    counter = inc_counter(j0)
+    step = CHUNK_SIZE - CHUNK_SIZE % block_size
+    auth = Ghash(h).update(aad).pad()
+    lengths = (len(aad) * 8).to_bytes(8, 'big') + (len(src) * 8).to_bytes(8, 'big')
+
+    if tag is not None:
+        for i in range(0, len(src), step):
+            auth.update(src[i:i + step])
+        expected = xor_bytes(auth.pad().update(lengths).digest(), encrypt_blocks(j0, key_bytes, block_size))
+        if expected != bytes(tag):
+            raise ValueError("Тег аутентификации не совпадает")
+
+    for i in range(0, len(src), step):
+        end = min(i + step, len(src))
+        out[i:end] = ctr_xor(src[i:end], key_bytes, add_counter(counter, i // block_size), encrypt_blocks,
+                             block_size, 1)
+        if tag is None:
+            auth.update(out[i:end])
+
+    if tag is None:
+        tag = xor_bytes(auth.pad().update(lengths).digest(), encrypt_blocks(j0, key_bytes, block_size))
+    return len(src), tag
+
+
+def gcm_encrypt_into(src, dst, key_bytes, iv_bytes, aad=b'', block_size=16):
+    """GCM из буфера src в буфер dst; возвращает (число записанных байт, тег)"""
+    return _gcm_into(src, dst, key_bytes, iv_bytes, aad, None, block_size)
+
+
+def gcm_decrypt_into(src, dst, key_bytes, iv_bytes, aad, tag, block_size=16):
+    """Проверяет тег и расшифровывает src в dst; при несовпадении тега dst не трогается"""
+    return _gcm_into(src, dst, key_bytes, iv_bytes, aad, tag, block_size)[0]
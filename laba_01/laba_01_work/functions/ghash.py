@@ -0,0 +1,130 @@
+from functools import lru_cache
+
+BLOCK_SIZE = 16
+AGGREGATE = 8  # число блоков, обрабатываемых за шаг с заранее вычисленными H^1..H^8
+
+_R = 0xE1 << 120  # x^128 = x^7 + x^2 + x + 1 в битовом порядке GCM
+
+
+def gf_mult(x, y):
+    """Умножение в GF(2^128) по определению (NIST SP 800-38D, алгоритм 1); x, y - 128-битные целые"""
+    z = 0
+    v = y
+    for i in range(127, -1, -1):
+        if (x >> i) & 1:
+            z ^= v
+        v = (v >> 1) ^ _R if v & 1 else v >> 1
+    return z
+
+
+def _build_tables(h):
+    """Таблицы Шоупа по байтам: tables[i][b] = (байт b в позиции i) * H, всего 16 x 256 значений"""
+    # h_x[j] = H * x^j; бит j многочлена - это бит 127 - j целого числа
+    h_x = [h]
+    for _ in range(127):
+        v = h_x[-1]
+        h_x.append((v >> 1) ^ _R if v & 1 else v >> 1)
+
+    tables = []
+    for i in range(BLOCK_SIZE):
+        table = [0] * 256
+        for k in range(8):
+            table[1 << k] = h_x[8 * i + 7 - k]
+        for b in range(3, 256):
+            low = b & -b
+            if b != low:
+                table[b] = table[b ^ low] ^ table[low]
+        tables.append(table)
+    return tables
+
+
+def _table_mult_bytes(t, b):
+    """(16-байтовый блок b) * H по таблицам: 16 выборок и XOR без побитового цикла"""
+    return (t[0][b[0]] ^ t[1][b[1]] ^ t[2][b[2]] ^ t[3][b[3]] ^
+            t[4][b[4]] ^ t[5][b[5]] ^ t[6][b[6]] ^ t[7][b[7]] ^
+            t[8][b[8]] ^ t[9][b[9]] ^ t[10][b[10]] ^ t[11][b[11]] ^
+            t[12][b[12]] ^ t[13][b[13]] ^ t[14][b[14]] ^ t[15][b[15]])
+
+
+def _table_mult(tables, x):
+    """x * H для 128-битного целого x"""
+    return _table_mult_bytes(tables, x.to_bytes(BLOCK_SIZE, 'big'))
+
+
+class GhashKey:
+    """Предвычисленные для ключа H таблицы умножения и степени H^1..H^8"""
+
+    def __init__(self, h):
+        self.h = int.from_bytes(h, 'big')
+        self.tables = _build_tables(self.h)
+        powers = [self.h]
+        for _ in range(AGGREGATE - 1):
+            powers.append(_table_mult(self.tables, powers[-1]))
+        # power_tables[k] - таблицы для H^(AGGREGATE - k), чтобы первый блок группы умножался на H^8
+        self.power_tables = [self.tables if p == self.h else _build_tables(p) for p in reversed(powers)]
+
+    def mult(self, x):
+        return _table_mult(self.tables, x)
+
+    def absorb(self, state, data):
+        """Добавляет к состоянию блоки data (длина кратна 16): Y = (Y ^ X_i) * H.
+        Группа из 8 блоков сводится за один шаг: (Y ^ X_1) * H^8 ^ X_2 * H^7 ^ ... ^ X_8 * H;
+        произведения внутри группы независимы, в целое переводится только первый блок"""
+        step = AGGREGATE * BLOCK_SIZE
+        full = len(data) - len(data) % step
+        t8, t7, t6, t5, t4, t3, t2, t1 = self.power_tables
+        mult = _table_mult_bytes
+        for i in range(0, full, step):
+            first = (state ^ int.from_bytes(data[i:i + 16], 'big')).to_bytes(BLOCK_SIZE, 'big')
+            state = (mult(t8, first) ^ mult(t7, data[i + 16:i + 32]) ^ mult(t6, data[i + 32:i + 48]) ^
+                     mult(t5, data[i + 48:i + 64]) ^ mult(t4, data[i + 64:i + 80]) ^
+                     mult(t3, data[i + 80:i + 96]) ^ mult(t2, data[i + 96:i + 112]) ^
+                     mult(t1, data[i + 112:i + 128]))
+        for i in range(full, len(data), BLOCK_SIZE):
+            state = _table_mult(t1, state ^ int.from_bytes(data[i:i + BLOCK_SIZE], 'big'))
+        return state
+
+
+@lru_cache(maxsize=8)
+def ghash_key(h):
+    """Таблицы для H строятся один раз и переиспользуются для всех сообщений под этим ключом.
+    Таблицы одного ключа занимают около 1.7 МБ (8 наборов по 16 x 256 целых), поэтому кэш маленький"""
+    return GhashKey(bytes(h))
+
+
+class Ghash:
+    """Потоковый GHASH: update() добавляет данные, pad() дополняет нулями до границы блока"""
+
+    def __init__(self, h):
+        self.key = ghash_key(bytes(h))
+        self._state = 0
+        self._buffer = b''
+
+    def update(self, data):
+        data = self._buffer + bytes(data) if self._buffer else bytes(data)
+        size = len(data) - len(data) % BLOCK_SIZE
+        self._state = self.key.absorb(self._state, data[:size])
+        self._buffer = data[size:]
+        return self
+
+    def pad(self):
+        if self._buffer:
+            self._state = self.key.absorb(self._state, self._buffer.ljust(BLOCK_SIZE, b'\x00'))
+            self._buffer = b''
+        return self
+
+    def digest(self):
+        return self.pad()._state.to_bytes(BLOCK_SIZE, 'big')
+
+
+def ghash(h, data):
+    """GHASH_H(data) с дополнением data нулями до кратности 16 байтам"""
+    return Ghash(h).update(data).digest()
+
+
+def gcm_auth_data(aad, ciphertext):
+    """Вход GHASH для GCM: AAD и шифртекст дополняются по отдельности, затем длины в битах"""
+    def pad(data):
+        return data + bytes(-len(data) % BLOCK_SIZE)
+    lengths = (len(aad) * 8).to_bytes(8, 'big') + (len(ciphertext) * 8).to_bytes(8, 'big')
+    return pad(bytes(aad)) + pad(bytes(ciphertext)) + lengths
@@ -0,0 +1,95 @@
+from functions.cbc import cbc_encrypt_bytes, cbc_encrypt_into, cbc_decrypt_into
+from functions.cfb import cfb_encrypt_bytes, cfb_encrypt_into, cfb_decrypt_into
+from functions.ecb import ecb_encrypt_bytes, ecb_encrypt_into, ecb_decrypt_into
+from functions.engine import as_buffer
+from functions.gcm import gcm_encrypt_bytes, gcm_encrypt_into, gcm_decrypt_into
+from functions.ofb import ofb_encrypt_bytes, ofb_encrypt_into, ofb_decrypt_into
+
+BLOCK_SIZES = {"ecb": 8, "cbc": 8, "cfb": 8, "ofb": 8, "gcm": 16}
+
+
+def _fit(value, size):
+    """Кодирует и дополняет нулями или обрезает до size байт (как в функциях режимов)"""
+    return bytes(as_buffer(value)).ljust(size, b'\x00')[:size]
+
+
+class KeyedCipher:
+    """Шифр с заранее подготовленным ключом для режимов из functions/.
+
+    Ключ кодируется и выравнивается один раз при создании, поэтому при шифровании
+    множества коротких сообщений под одним ключом остаётся только сама работа режима"""
+
+    def __init__(self, mode, key, segment_size=1):
+        if mode not in BLOCK_SIZES:
+            raise ValueError(f"Неизвестный режим: {mode}")
+        self.mode = mode
+        self.block_size = BLOCK_SIZES[mode]
+        if mode == "cfb" and not 1 <= segment_size <= self.block_size:
+            raise ValueError(f"segment_size должен быть от 1 до {self.block_size}")
+        self.segment_size = segment_size
+        self.key_bytes = _fit(key, self.block_size)
+        self.iv_size = 12 if mode == "gcm" else self.block_size
+
+    def encrypt(self, plaintext, iv=None, aad=b''):
+        return self.encrypt_many([plaintext], None if iv is None else [iv], aad)[0]
+
+    def encrypt_many(self, messages, ivs=None, aad=b''):
+        """Шифрует пачку сообщений за один вызов; ivs - по одному IV на сообщение (для ECB не нужен).
+        Для GCM возвращает пары (ciphertext, tag), как gcm_encrypt"""
+        key_bytes = self.key_bytes
+        if self.mode == "ecb":
+            return [ecb_encrypt_bytes(as_buffer(m), key_bytes) for m in messages]
+        if ivs is None or len(ivs) != len(messages):
+            raise ValueError("Нужен IV для каждого сообщения")
+
+        iv_size = self.iv_size
+
+        def iv_of(iv):
+            return _fit(iv, iv_size)
+
+        if self.mode == "cbc":
+            return [cbc_encrypt_bytes(as_buffer(m), key_bytes, iv_of(iv)) for m, iv in zip(messages, ivs)]
+        if self.mode == "cfb":
+            segment_size = self.segment_size
+            return [cfb_encrypt_bytes(as_buffer(m), key_bytes, iv_of(iv), segment_size)
+                    for m, iv in zip(messages, ivs)]
+        if self.mode == "ofb":
+            return [ofb_encrypt_bytes(as_buffer(m), key_bytes, iv_of(iv)) for m, iv in zip(messages, ivs)]
+        return [gcm_encrypt_bytes(as_buffer(m), key_bytes, iv_of(iv), aad) for m, iv in zip(messages, ivs)]
+
+    def _iv(self, iv):
+        if self.mode == "ecb":
+            return None
+        if iv is None:
+            raise ValueError("Нужен IV")
+        return _fit(iv, self.iv_size)
+
+    def encrypt_into(self, src, dst, iv=None, aad=b''):
+        """Шифрует буфер src прямо в буфер dst без полноразмерных промежуточных копий.
+        Возвращает число записанных байт (для ECB и CBC - с дополнением), для GCM - (число байт, тег)"""
+        iv = self._iv(iv)
+        if self.mode == "ecb":
+            return ecb_encrypt_into(src, dst, self.key_bytes)
+        if self.mode == "cbc":
+            return cbc_encrypt_into(src, dst, self.key_bytes, iv)
+        if self.mode == "cfb":
+            return cfb_encrypt_into(src, dst, self.key_bytes, iv, self.segment_size)
+        if self.mode == "ofb":
+            return ofb_encrypt_into(src, dst, self.key_bytes, iv)
+        return gcm_encrypt_into(src, dst, self.key_bytes, iv, aad)
+
+    def decrypt_into(self, src, dst, iv=None, aad=b'', tag=None):
+        """Расшифровывает буфер src в буфер dst (len(dst) >= len(src)); возвращает длину открытого текста.
+        Для GCM нужен tag, при несовпадении - ValueError"""
+        iv = self._iv(iv)
+        if self.mode == "ecb":
+            return ecb_decrypt_into(src, dst, self.key_bytes)
+        if self.mode == "cbc":
+            return cbc_decrypt_into(src, dst, self.key_bytes, iv)
+        if self.mode == "cfb":
+            return cfb_decrypt_into(src, dst, self.key_bytes, iv, self.segment_size)
+        if self.mode == "ofb":
+            return ofb_decrypt_into(src, dst, self.key_bytes, iv)
+        if tag is None:
+            raise ValueError("Для GCM нужен тег")
+        return gcm_decrypt_into(src, dst, self.key_bytes, iv, aad, tag)
@@ -0,0 +1,192 @@
+"""Необязательная инструментация горячих путей режимов шифрования.
+
+Пока инструментация выключена, код режимов работает с исходными функциями и
+не платит ничего. enable() подменяет функции этапов (блочная функция, XOR,
+дополнение, GHASH) и входные функции режимов обёртками, которые считают
+вызовы, байты, блоки и время; disable() возвращает исходные функции.
+Время режима за вычетом этапов - сборка вывода и прочая служебная работа.
+Подменяются ссылки в уже загруженных модулях, поэтому enable() вызывается
+после импорта main_2 и functions/*.
+"""
+import functools
+import importlib
+import sys
+import threading
+import time
+
+# (модуль, атрибут, этап, номер аргумента с данными); "Класс.метод" - подмена метода
+# в классе (аргумент 0 - self), иначе - подмена ссылок на функцию во всех модулях
+# режимов, кроме определяющего
+STAGES = [
+    ("functions.engine", "xor_bytes", "xor", 0),
+    ("functions.engine", "encrypt_blocks", "block", 0),
+    ("functions.aes", "AesKey.encrypt_blocks", "block", 1),
+    ("functions.aes", "AesKey.decrypt_blocks", "block", 1),
+    ("functions.ghash", "GhashKey.absorb", "ghash", 2),
+    ("functions.ecb", "pad_text", "pad", 0),
+    ("functions.cbc", "pad_text", "pad", 0),
+    ("main_2", "pad_text", "pad", 0),
+]
+
+MODES = [
+    ("functions.ecb", "ecb_encrypt_bytes"),
+    ("functions.cbc", "cbc_encrypt_bytes"),
+    ("functions.cfb", "cfb_encrypt_bytes"),
+    ("functions.ofb", "ofb_encrypt_bytes"),
+    ("functions.gcm", "gcm_encrypt_bytes"),
+] + [(f"functions.{mode}", f"{mode}_{op}_into") for mode in ("ecb", "cbc", "cfb", "ofb", "gcm")
+     for op in ("encrypt", "decrypt")] + \
+    [("main_2", f"{mode}_{op}") for mode in ("ecb", "cbc", "cfb", "ofb", "gcm") for op in ("encrypt", "decrypt")]
+
+# Модули, в которых подменяются ссылки на функции этапов
+MODULES = ["functions.ecb", "functions.cbc", "functions.cfb", "functions.ofb", "functions.gcm",
+           "functions.parallel", "functions.keyed", "main_2"]
+
+enabled = False
+
+_lock = threading.Lock()
+_counters = {}  # имя -> [вызовы, байты, блоки, секунды]
+_listeners = []
+_patches = []  # (объект, атрибут, исходное значение)
+
+
+class _Timed:
+    """Обёртка, считающая вызовы, байты, блоки и время. При передаче в пул процессов
+    сериализуется как исходная функция, так что дочерние процессы не инструментированы"""
+
+    def __init__(self, name, func, arg=0):
+        self.name = name
+        self.func = func
+        self.arg = arg  # номер аргумента с данными
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = self.func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        data = args[self.arg]
+        size = len(data) if hasattr(data, '__len__') else 0
+        blocks = 0
+        if self.name == "block":
+            block_size = args[2] if self.arg == 0 and len(args) > 2 else 16
+            blocks = -(-size // block_size)
+        record(self.name, size, blocks, elapsed)
+        return result
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return functools.partial(self, instance)
+
+    def __reduce__(self):
+        return _resolve, (self.func.__module__, self.func.__qualname__)
+
+
+def _resolve(module_name, qualname):
+    """Объект по модулю и полному имени ("функция" или "Класс.метод")"""
+    obj = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def record(name, size, blocks, seconds):
+    """Добавляет замер к счётчикам и уведомляет подписчиков"""
+    with _lock:
+        counter = _counters.setdefault(name, [0, 0, 0, 0.0])
+        counter[0] += 1
+        counter[1] += size
+        counter[2] += blocks
+        counter[3] += seconds
+        listeners = list(_listeners)
+    for listener in listeners:
+        listener(name, size, blocks, seconds)
+
+
+def add_listener(callback):
+    """callback(имя, байты, блоки, секунды) вызывается на каждый замер"""
+    with _lock:
+        _listeners.append(callback)
+
+
+def remove_listener(callback):
+    with _lock:
+        _listeners.remove(callback)
+
+
+def _patch(obj, attr, value):
+    _patches.append((obj, attr, getattr(obj, attr)))
+    setattr(obj, attr, value)
+
+
+def _replace_references(func, wrapper, skip):
+    for module_name in MODULES:
+        module = sys.modules.get(module_name)
+        if module is None or module_name == skip:
+            continue
+        for attr, value in list(vars(module).items()):
+            if value is func:
+                _patch(module, attr, wrapper)
+
+
+def enable():
+    """Включает инструментацию в уже загруженных модулях режимов"""
+    global enabled
+    if enabled:
+        return
+    for module_name, attr, stage, arg in STAGES:
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        if "." in attr:
+            class_name, method = attr.split(".")
+            cls = getattr(module, class_name)
+            _patch(cls, method, _Timed(stage, getattr(cls, method), arg))
+        elif module_name in ("functions.ecb", "functions.cbc", "main_2"):
+            # у каждого модуля своя pad_text
+            _patch(module, attr, _Timed(stage, getattr(module, attr)))
+        else:
+            func = getattr(module, attr)
+            _replace_references(func, _Timed(stage, func), skip=module_name)
+    for module_name, attr in MODES:
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        func = getattr(module, attr)
+        wrapper = _Timed(f"{module_name}.{attr}", func)
+        _patch(module, attr, wrapper)
+        _replace_references(func, wrapper, skip=module_name)
+    enabled = True
+
+
+def disable():
+    """Возвращает исходные функции"""
+    global enabled
+    while _patches:
+        obj, attr, value = _patches.pop()
+        setattr(obj, attr, value)
+    enabled = False
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+
+
+def snapshot():
+    """Копия счётчиков: {имя: {"calls", "bytes", "blocks", "seconds"}}"""
+    with _lock:
+        return {name: {"calls": c[0], "bytes": c[1], "blocks": c[2], "seconds": c[3]}
+                for name, c in _counters.items()}
+
+
+def prometheus(prefix="cipher"):
+    """Счётчики в текстовом формате экспозиции Prometheus"""
+    data = snapshot()
+    lines = []
+    for field, kind in (("calls", "calls_total"), ("bytes", "bytes_total"),
+                        ("blocks", "blocks_total"), ("seconds", "seconds_total")):
+        metric = f"{prefix}_{kind}"
+        lines.append(f"# TYPE {metric} counter")
+        for name in sorted(data):
+            lines.append(f'{metric}{{stage="{name}"}} {data[name][field]}')
+    return "\n".join(lines) + "\n"
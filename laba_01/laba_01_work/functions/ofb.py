@@ -1,17 +1,11 @@
-def xor_bytes(a, b):
-    """Выполняет побитовое XOR двух байтовых строк"""
-    return bytes(x ^ y for x, y in zip(a, b))
+from functions.engine import xor_bytes, as_buffer, writable_buffer, CHUNK_SIZE
 
 def ofb_encrypt(plaintext, key, iv):
     """Шифрование в режиме OFB"""
     block_size = 8
 
-    if isinstance(plaintext, str):
-        plaintext_bytes = plaintext.encode('utf-8')
-    elif isinstance(plaintext, bytes):
-        plaintext_bytes = plaintext
-    else:
-        raise ValueError("plaintext должен быть строкой или байтами")
+    # Строка кодируется в байты, bytes и прочие буферы (bytearray, memoryview, mmap) берутся без копирования
+    plaintext_bytes = as_buffer(plaintext)
 
     key_bytes = key.encode('utf-8')
     iv_bytes = iv.encode('utf-8')
@@ -23,16 +17,55 @@ def ofb_encrypt(plaintext, key, iv):
     if len(iv_bytes) < block_size:
         iv_bytes = iv_bytes + b'\x00' * (block_size - len(iv_bytes))
     iv_bytes = iv_bytes[:block_size]
-    
-    ciphertext = b''
-    shift_register = iv_bytes
 
-    for i in range(len(plaintext_bytes)):
-        keystream_block = xor_bytes(shift_register, key_bytes)
-        plaintext_byte = plaintext_bytes[i:i + 1]
-        ciphertext_byte = xor_bytes(plaintext_byte, keystream_block[:1])
-        ciphertext += ciphertext_byte
+    return ofb_encrypt_bytes(plaintext_bytes, key_bytes, iv_bytes)
 
-        shift_register = keystream_block
-    
-    return ciphertext
+
+def ofb_keystream(key_bytes, iv_bytes, length):
+    """Гамма OFB на length байт, вырабатываемая заранее, до появления данных.
+    Блочная функция (XOR с ключом) применяется к регистру как к целому числу"""
+    key_int = int.from_bytes(key_bytes, 'big')
+    shift_register = int.from_bytes(iv_bytes, 'big')
+    shift = 8 * (len(iv_bytes) - 1)  # первый байт блока
+
+    keystream = bytearray(length)
+    for i in range(length):
+        shift_register ^= key_int
+        keystream[i] = shift_register >> shift
+    return keystream
+
+
+def ofb_encrypt_bytes(plaintext_bytes, key_bytes, iv_bytes):
+    """OFB для уже подготовленных байтов открытого текста, ключа и IV"""
+    # Гамма не зависит от данных: вырабатываем её целиком, затем XOR за один проход
+    keystream = ofb_keystream(key_bytes, iv_bytes, len(plaintext_bytes))
+    return xor_bytes(plaintext_bytes, keystream)
+
+
+def ofb_keystream_chunks(key_bytes, iv_bytes, length, chunk_size=CHUNK_SIZE):
+    """Та же гамма, что ofb_keystream, но порциями по chunk_size байт"""
+    key_int = int.from_bytes(key_bytes, 'big')
+    shift_register = int.from_bytes(iv_bytes, 'big')
+    shift = 8 * (len(iv_bytes) - 1)
+
+    for start in range(0, length, chunk_size):
+        keystream = bytearray(min(chunk_size, length - start))
+        for i in range(len(keystream)):
+            shift_register ^= key_int
+            keystream[i] = shift_register >> shift
+        yield keystream
+
+
+def ofb_encrypt_into(src, dst, key_bytes, iv_bytes):
+    """OFB из буфера src в буфер dst порциями; гамма не больше порции. Возвращает число записанных байт"""
+    src = as_buffer(src)
+    out = writable_buffer(dst, len(src))
+    offset = 0
+    for keystream in ofb_keystream_chunks(key_bytes, iv_bytes, len(src)):
+        end = offset + len(keystream)
+        out[offset:end] = xor_bytes(src[offset:end], keystream)
+        offset = end
+    return len(src)
+
+
+ofb_decrypt_into = ofb_encrypt_into  # OFB симметричен
@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from functions.engine import xor_bytes, counter_blocks, add_counter
+
+# Сообщения меньше порога быстрее обработать в текущем процессе:
+# запуск пула и передача данных между процессами стоят дороже самого шифрования
+PARALLEL_THRESHOLD = 1024 * 1024
+
+
+def split_ranges(length, block_size, parts):
+    """Делит length байт на не более parts диапазонов (start, end) с границами, кратными block_size"""
+    blocks = -(-length // block_size)
+    if blocks == 0:
+        return []
+    per_part = -(-blocks // parts)
+    return [(start * block_size, min((start + per_part) * block_size, length))
+            for start in range(0, blocks, per_part)]
+
+
+def map_ranges(func, jobs, workers=None, executor=None):
+    """Выполняет func(*job) для каждого задания на пуле процессов, сохраняя порядок результатов"""
+    if executor is not None:
+        return list(executor.map(func, *zip(*jobs)))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(func, *zip(*jobs)))
+
+
+def _run(range_func, jobs_args, length, block_size, workers, executor):
+    """Общая схема: делит сообщение на диапазоны, jobs_args(start, end) строит аргументы задания"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or length < PARALLEL_THRESHOLD:
+        return range_func(*jobs_args(0, length))
+    jobs = [jobs_args(start, end) for start, end in split_ranges(length, block_size, workers)]
+    return b''.join(map_ranges(range_func, jobs, workers, executor))
+
+
+def ctr_range(block_func, key, counter, data, block_size=16):
+    """XOR data с гаммой block_func(counter), block_func(counter + 1), ... для одного диапазона"""
+    count = -(-len(data) // block_size)
+    keystream = block_func(counter_blocks(counter, count), key, block_size)
+    return xor_bytes(data, keystream)
+
+
+def ctr_xor(data, key, counter, block_func, block_size=16, workers=None, executor=None):
+    """Режим счётчика: сообщение делится на диапазоны счётчика, которые обрабатываются на пуле процессов.
+    block_func(blocks, key, block_size) шифрует подряд идущие блоки и должна быть функцией уровня модуля"""
+    def job(start, end):
+        return block_func, key, add_counter(counter, start // block_size), bytes(data[start:end]), block_size
+
+    return _run(ctr_range, job, len(data), block_size, workers, executor)
+
+
+def ecb_range(block_func, key, data, block_size=16):
+    """Блоки ECB независимы: весь диапазон шифруется одним пакетным вызовом"""
+    return block_func(data, key, block_size)
+
+
+def ecb_blocks(data, key, block_func, block_size=16, workers=None, executor=None):
+    """Пакетное шифрование (или расшифрование) независимых блоков ECB на пуле процессов"""
+    return _run(ecb_range, lambda start, end: (block_func, key, bytes(data[start:end]), block_size),
+                len(data), block_size, workers, executor)
+
+
+def cbc_decrypt_range(decrypt_func, key, previous, data, block_size=16):
+    """Расшифрование диапазона CBC: P_i = D(C_i) XOR C_(i-1), где previous - блок перед диапазоном"""
+    decrypted = decrypt_func(data, key, block_size)
+    return xor_bytes(decrypted, previous + data[:-block_size])
+
+
+def cbc_decrypt_blocks(ciphertext, key, iv, decrypt_func, block_size=16, workers=None, executor=None):
+    """Расшифрование CBC на пуле процессов (без снятия дополнения); длина должна быть кратна блоку"""
+    if len(ciphertext) % block_size:
+        raise ValueError("Длина шифртекста не кратна размеру блока")
+
+    def job(start, end):
+        previous = iv if start == 0 else ciphertext[start - block_size:start]
+        return decrypt_func, key, bytes(previous), bytes(ciphertext[start:end]), block_size
+
+    return _run(cbc_decrypt_range, job, len(ciphertext), block_size, workers, executor)
+
+
+def cfb_decrypt_range(block_func, key, register, data, segment_size, block_size=16):
+    """Расшифрование диапазона CFB: регистр перед каждым сегментом - это предыдущие block_size байт
+    шифртекста, поэтому все регистры диапазона известны заранее и шифруются одним пакетом"""
+    stream = register + data
+    segments = range(0, len(data), segment_size)
+    encrypted = block_func(b''.join(stream[i:i + block_size] for i in segments), key, block_size)
+    keystream = b''.join(encrypted[j * block_size:j * block_size + segment_size] for j in range(len(segments)))
+    return xor_bytes(data, keystream)
+
+
+def cfb_decrypt_segments(ciphertext, key, iv, block_func, segment_size=1, block_size=16,
+                         workers=None, executor=None):
+    """Расшифрование CFB на пуле процессов; диапазоны выровнены по сегментам"""
+    def job(start, end):
+        register = (iv + ciphertext[max(start - block_size, 0):start])[-block_size:]
+        return block_func, key, bytes(register), bytes(ciphertext[start:end]), segment_size, block_size
+
+    return _run(cfb_decrypt_range, job, len(ciphertext), segment_size, workers, executor)
@@ -1,6 +1,11 @@
-def xor_bytes(a, b):
-    """Побитовое XOR двух байтовых строк"""
-    return bytes(x ^ y for x, y in zip(a, b))
+import queue
+import threading
+import weakref
+
+from functions.aes import aes_key, aes_encrypt_blocks, aes_decrypt_blocks
+from functions.engine import xor_bytes, counter_blocks, add_counter, unpad_length
+from functions.ghash import Ghash, gcm_auth_data
+from functions.parallel import ctr_xor, ecb_blocks, cbc_decrypt_blocks, cfb_decrypt_range, cfb_decrypt_segments
 
 
 def pad_text(data, block_size):
@@ -10,104 +15,354 @@ def pad_text(data, block_size):
     return data + padding
 
 
-def fake_aes_encrypt(block, key):
-    """Упрощённая имитация AES (XOR с ключом)"""
-    if len(key) < len(block):
-        key = (key * (len(block) // len(key) + 1))[:len(block)]
-    return xor_bytes(block, key)
+def normalize_iv(iv, size):
+    """Дополняет IV нулями или обрезает до size байт"""
+    return bytes(iv).ljust(size, b'\x00')[:size]
 
 
-# ECB (Electronic Codebook)
-def ecb_encrypt(data, key):
-    block_size = 16
-    padded_data = pad_text(data, block_size)
-    ciphertext = b''
-    for i in range(0, len(padded_data), block_size):
-        block = padded_data[i:i + block_size]
-        encrypted_block = fake_aes_encrypt(block, key)
-        ciphertext += encrypted_block
-    return ciphertext
+def aes_encrypt(block, key):
+    """Шифрование одного блока AES (ключ 16, 24 или 32 байта, расписание кэшируется)"""
+    return aes_encrypt_blocks(block, key)
+
 
+def aes_decrypt(block, key):
+    return aes_decrypt_blocks(block, key)
 
-def ecb_decrypt(ciphertext, key):
+
+class _Context:
+    """Базовый потоковый контекст: update() по частям, finalize() в конце"""
     block_size = 16
-    plaintext = b''
-    for i in range(0, len(ciphertext), block_size):
-        block = ciphertext[i:i + block_size]
-        decrypted_block = fake_aes_encrypt(block, key)  # XOR обратим
-        plaintext += decrypted_block
-    padding_len = plaintext[-1]
-    return plaintext[:-padding_len]
+
+    def __init__(self, key):
+        self.key = key
+        self._buffer = b''
+        self._finalized = False
+
+    def _ready(self, length):
+        """Сколько байт из накопленных можно обработать сразу"""
+        return length - length % self.block_size
+
+    def update(self, data):
+        if self._finalized:
+            raise ValueError("Контекст уже завершён")
+        data = self._buffer + bytes(data) if self._buffer else bytes(data)
+        size = self._ready(len(data))
+        self._buffer = data[size:]
+        return self._process(data[:size]) if size else b''
+
+    def finalize(self):
+        if self._finalized:
+            raise ValueError("Контекст уже завершён")
+        self._finalized = True
+        return self._finish(self._buffer)
+
+    def _process(self, data):
+        raise NotImplementedError
+
+    def _finish(self, data):
+        return self._process(data) if data else b''
+
+
+def _check_length(ciphertext, block_size):
+    if not ciphertext or len(ciphertext) % block_size:
+        raise ValueError("Длина шифртекста не кратна размеру блока")
+
+
+def unpad(plaintext, block_size):
+    """Снимает дополнение pad_text, проверяя его байты"""
+    return plaintext[:unpad_length(plaintext, len(plaintext), block_size)]
+
+
+class _PaddedDecryptor(_Context):
+    """Расшифрование с удалением дополнения: последний блок придерживается до finalize()"""
+
+    def _ready(self, length):
+        size = length - length % self.block_size
+        if size == length:
+            size -= self.block_size
+        return max(size, 0)
+
+    def _finish(self, data):
+        if len(data) != self.block_size:
+            raise ValueError("Длина шифртекста не кратна размеру блока")
+        return unpad(self._process(data), self.block_size)
+
+
+class _StreamContext(_Context):
+    """Контекст потокового режима: данные XOR-ятся с гаммой, остаток гаммы сохраняется"""
+
+    def __init__(self, key):
+        super().__init__(key)
+        self._keystream_left = b''
+
+    def _ready(self, length):
+        return length
+
+    def _next_blocks(self, count):
+        raise NotImplementedError
+
+    def _keystream(self, size):
+        keystream = self._keystream_left
+        if len(keystream) < size:
+            count = -(-(size - len(keystream)) // self.block_size)
+            keystream += self._next_blocks(count)
+        self._keystream_left = keystream[size:]
+        return keystream[:size]
+
+    def _process(self, data):
+        return xor_bytes(data, self._keystream(len(data)))
+
+
+# ECB (Electronic Codebook)
+class EcbEncryptor(_Context):
+    def _process(self, data):
+        return aes_encrypt_blocks(data, self.key, self.block_size)
+
+    def _finish(self, data):
+        return self._process(pad_text(data, self.block_size))
+
+
+class EcbDecryptor(_PaddedDecryptor):
+    def _process(self, data):
+        return aes_decrypt_blocks(data, self.key, self.block_size)
+
+
+def ecb_encrypt(data, key, workers=1):
+    """workers > 1 (или None - по числу ядер): блоки шифруются на пуле процессов"""
+    if workers != 1:
+        return ecb_blocks(pad_text(data, 16), key, aes_encrypt_blocks, 16, workers)
+    cipher = EcbEncryptor(key)
+    return cipher.update(data) + cipher.finalize()
+
+
+def ecb_decrypt(ciphertext, key, workers=1):
+    if workers != 1:
+        _check_length(ciphertext, 16)
+        return unpad(ecb_blocks(ciphertext, key, aes_decrypt_blocks, 16, workers), 16)
+    cipher = EcbDecryptor(key)
+    return cipher.update(ciphertext) + cipher.finalize()
 
 
 # CBC (Cipher Block Chaining)
+class CbcEncryptor(_Context):
+    def __init__(self, key, iv):
+        super().__init__(key)
+        self._previous_block = normalize_iv(iv, self.block_size)
+
+    def _process(self, data):
+        block_size = self.block_size
+        ciphertext = bytearray(len(data))
+        previous_block = self._previous_block
+        for i in range(0, len(data), block_size):
+            block_xor = xor_bytes(data[i:i + block_size], previous_block)
+            previous_block = aes_encrypt(block_xor, self.key)
+            ciphertext[i:i + block_size] = previous_block
+        self._previous_block = previous_block
+        return bytes(ciphertext)
+
+    def _finish(self, data):
+        return self._process(pad_text(data, self.block_size))
+
+
+class CbcDecryptor(_PaddedDecryptor):
+    def __init__(self, key, iv):
+        super().__init__(key)
+        self._previous_block = normalize_iv(iv, self.block_size)
+
+    def _process(self, data):
+        # все блоки шифртекста уже известны: расшифровываем их одним пакетом, затем XOR со сдвигом на блок
+        decrypted = aes_decrypt_blocks(data, self.key, self.block_size)
+        plaintext = xor_bytes(decrypted, self._previous_block + data[:-self.block_size])
+        self._previous_block = data[-self.block_size:]
+        return plaintext
+
+
 def cbc_encrypt(data, key, iv):
-    block_size = 16
-    padded_data = pad_text(data, block_size)
-    ciphertext = b''
-    previous_block = iv
-    for i in range(0, len(padded_data), block_size):
-        block = padded_data[i:i + block_size]
-        block_xor = xor_bytes(block, previous_block)
-        encrypted_block = fake_aes_encrypt(block_xor, key)
-        ciphertext += encrypted_block
-        previous_block = encrypted_block
-    return ciphertext
-
-
-def cbc_decrypt(ciphertext, key, iv):
-    block_size = 16
-    plaintext = b''
-    previous_block = iv
-    for i in range(0, len(ciphertext), block_size):
-        block = ciphertext[i:i + block_size]
-        decrypted_block = fake_aes_encrypt(block, key)
-        plaintext_block = xor_bytes(decrypted_block, previous_block)
-        plaintext += plaintext_block
-        previous_block = block
-    padding_len = plaintext[-1]
-    return plaintext[:-padding_len]
+    cipher = CbcEncryptor(key, iv)
+    return cipher.update(data) + cipher.finalize()
+
+
+def cbc_decrypt(ciphertext, key, iv, workers=1):
+    """Расшифрование CBC не зависит от соседних открытых блоков, поэтому распараллеливается (workers)"""
+    if workers != 1:
+        _check_length(ciphertext, 16)
+        plaintext = cbc_decrypt_blocks(ciphertext, key, normalize_iv(iv, 16), aes_decrypt_blocks, 16, workers)
+        return unpad(plaintext, 16)
+    cipher = CbcDecryptor(key, iv)
+    return cipher.update(ciphertext) + cipher.finalize()
 
 
 # CFB (Cipher Feedback)
+class CfbEncryptor(_Context):
+    """CFB с сегментом от 1 байта (CFB-8) до полного блока (CFB-128)"""
+
+    def __init__(self, key, iv, segment_size=1):
+        super().__init__(key)
+        if not 1 <= segment_size <= self.block_size:
+            raise ValueError(f"Размер сегмента CFB должен быть от 1 до {self.block_size} байт")
+        self.segment_size = segment_size
+        self._aes = aes_key(bytes(key))
+        self._shift_register = bytearray(normalize_iv(iv, self.block_size))
+
+    def _ready(self, length):
+        return length - length % self.segment_size
+
+    def _process(self, data):
+        segment_size = self.segment_size
+        encrypt = self._aes.encrypt_blocks
+        output = bytearray(len(data))
+        shift_register = self._shift_register
+
+        if segment_size == self.block_size:
+            # Полный блок: один вызов шифра на блок, регистр заменяется блоком шифртекста
+            for i in range(0, len(data), segment_size):
+                output[i:i + segment_size] = xor_bytes(data[i:i + segment_size], encrypt(shift_register))
+                shift_register[:] = output[i:i + segment_size]
+            return bytes(output)
+
+        for i in range(0, len(data), segment_size):
+            keystream = encrypt(shift_register)
+            output_segment = xor_bytes(data[i:i + segment_size], keystream[:segment_size])
+            output[i:i + segment_size] = output_segment
+            # Сдвиг регистра на месте
+            del shift_register[:segment_size]
+            shift_register += output_segment
+        return bytes(output)
+
+
+class CfbDecryptor(CfbEncryptor):
+    def _process(self, data):
+        # При расшифровании все регистры - это уже известный шифртекст, гамма считается одним пакетом
+        register = bytes(self._shift_register)
+        output = cfb_decrypt_range(aes_encrypt_blocks, self.key, register, data, self.segment_size, self.block_size)
+        self._shift_register[:] = (register + data)[-self.block_size:]
+        return output
+
+
 def cfb_encrypt(data, key, iv, segment_size=1):
-    block_size = 16
-    ciphertext = b''
-    shift_register = iv
-    for i in range(0, len(data), segment_size):
-        keystream = fake_aes_encrypt(shift_register, key)
-        plaintext_segment = data[i:i + segment_size]
-        ciphertext_segment = xor_bytes(plaintext_segment, keystream[:segment_size])
-        ciphertext += ciphertext_segment
-        shift_register = shift_register[segment_size:] + ciphertext_segment
-    return ciphertext
-
-
-def cfb_decrypt(ciphertext, key, iv, segment_size=1):
-    block_size = 16
-    plaintext = b''
-    shift_register = iv
-    for i in range(0, len(ciphertext), segment_size):
-        keystream = fake_aes_encrypt(shift_register, key)
-        ciphertext_segment = ciphertext[i:i + segment_size]
-        plaintext_segment = xor_bytes(ciphertext_segment, keystream[:segment_size])
-        plaintext += plaintext_segment
-        shift_register = shift_register[segment_size:] + ciphertext_segment
-    return plaintext
+    cipher = CfbEncryptor(key, iv, segment_size)
+    return cipher.update(data) + cipher.finalize()
+
+
+def cfb_decrypt(ciphertext, key, iv, segment_size=1, workers=1):
+    """Регистры CFB при расшифровании берутся из известного шифртекста, поэтому сегменты
+    обрабатываются параллельно (workers)"""
+    if workers != 1:
+        return cfb_decrypt_segments(ciphertext, key, normalize_iv(iv, 16), aes_encrypt_blocks,
+                                    segment_size, 16, workers)
+    cipher = CfbDecryptor(key, iv, segment_size)
+    return cipher.update(ciphertext) + cipher.finalize()
 
 
 # OFB (Output Feedback)
-def ofb_encrypt(data, key, iv):
+def _ofb_generate(encrypt, shift_register, blocks, block_size):
+    """Пакет гаммы OFB из blocks блоков и новое состояние регистра сдвига"""
+    keystream = bytearray(blocks * block_size)
+    for i in range(0, len(keystream), block_size):
+        shift_register = encrypt(shift_register)
+        keystream[i:i + block_size] = shift_register
+    return bytes(keystream), shift_register
+
+
+def _ofb_produce(aes, shift_register, blocks, block_size, batches, stop):
+    """Фоновый поток OfbKeystream. Держит только ключ, очередь и событие, но не сам объект:
+    брошенный объект собирается сборщиком мусора, и weakref.finalize останавливает поток"""
+    while not stop.is_set():
+        batch, shift_register = _ofb_generate(aes.encrypt_blocks, shift_register, blocks, block_size)
+        while not stop.is_set():
+            try:
+                batches.put(batch, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+
+
+class OfbKeystream:
+    """Гамма OFB для сессии (ключ, IV), вырабатываемая пакетами по batch_blocks блоков заранее.
+    С background=True пакеты готовит фоновый поток (до depth пакетов в очереди),
+    и данные при поступлении только XOR-ятся с готовой гаммой. Поток останавливают close(),
+    выход из with или сборка объекта"""
     block_size = 16
-    ciphertext = b''
-    shift_register = iv
-    for i in range(0, len(data), block_size):
-        keystream = fake_aes_encrypt(shift_register, key)
-        plaintext_segment = data[i:i + block_size]
-        ciphertext_segment = xor_bytes(plaintext_segment, keystream[:len(plaintext_segment)])
-        ciphertext += ciphertext_segment
-        shift_register = keystream
-    return ciphertext
+
+    def __init__(self, key, iv, batch_blocks=1024, background=False, depth=4):
+        self._aes = aes_key(bytes(key))
+        self._shift_register = normalize_iv(iv, self.block_size)
+        self.batch_blocks = batch_blocks
+        self._batch = b''
+        self._offset = 0
+        self._batches = None
+        self._stop = None
+        if background:
+            self._batches = queue.Queue(maxsize=depth)
+            self._stop = threading.Event()
+            weakref.finalize(self, self._stop.set)
+            threading.Thread(target=_ofb_produce, daemon=True,
+                             args=(self._aes, self._shift_register, batch_blocks,
+                                   self.block_size, self._batches, self._stop)).start()
+
+    def _generate(self):
+        batch, self._shift_register = _ofb_generate(self._aes.encrypt_blocks, self._shift_register,
+                                                    self.batch_blocks, self.block_size)
+        return batch
+
+    def _next_batch(self):
+        return self._batches.get() if self._batches is not None else self._generate()
+
+    def read(self, size):
+        """Следующие size байт гаммы"""
+        parts = []
+        while size > 0:
+            if self._offset == len(self._batch):
+                self._batch = self._next_batch()
+                self._offset = 0
+            part = self._batch[self._offset:self._offset + size]
+            self._offset += len(part)
+            size -= len(part)
+            parts.append(part)
+        return b''.join(parts)
+
+    def close(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class OfbEncryptor(_StreamContext):
+    def __init__(self, key, iv, batch_blocks=1024, background=False):
+        super().__init__(key)
+        self._source = OfbKeystream(key, iv, batch_blocks, background)
+
+    def _keystream(self, size):
+        return self._source.read(size)
+
+    def finalize(self):
+        output = super().finalize()
+        self._source.close()
+        return output
+
+    def close(self):
+        """Останавливает фоновую выработку гаммы, если finalize() не будет вызван"""
+        self._source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+OfbDecryptor = OfbEncryptor  # OFB симметричен
+
+
+def ofb_encrypt(data, key, iv):
+    # гамма вырабатывается одним пакетом на всё сообщение
+    cipher = OfbEncryptor(key, iv, batch_blocks=max(-(-len(data) // 16), 1))
+    return cipher.update(data) + cipher.finalize()
 
 
 def ofb_decrypt(ciphertext, key, iv):
@@ -121,61 +376,106 @@ def inc_counter(counter):
     return counter[:-4] + counter_int.to_bytes(4, 'big')
 
 
-def ghash(h, data):  # Упрощённый GHASH
-    block_size = 16
-    result = bytes(block_size)
-    if len(data) % block_size != 0:
-        data += b'\x00' * (block_size - len(data) % block_size)
-    for i in range(0, len(data), block_size):
-        block = data[i:i + block_size]
-        result = xor_bytes(result, block)
-    return xor_bytes(result, h)
-
-
-def gcm_encrypt(data, key, iv, aad=b''):
-    block_size = 16
-    if len(iv) != 12:
-        iv = iv.ljust(12, b'\x00')[:12]
-    counter = iv + b'\x00\x00\x00\x01'
-    h = fake_aes_encrypt(bytes(block_size), key)
-
-    ciphertext = b''
-    for i in range(0, len(data), block_size):
-        keystream = fake_aes_encrypt(counter, key)
-        plaintext_block = data[i:i + block_size]
-        ciphertext_block = xor_bytes(plaintext_block, keystream[:len(plaintext_block)])
-        ciphertext += ciphertext_block
-        counter = inc_counter(counter)
-
-    len_aad = len(aad) * 8
-    len_ciphertext = len(ciphertext) * 8
-    auth_data = aad + ciphertext + len_aad.to_bytes(8, 'big') + len_ciphertext.to_bytes(8, 'big')
-    tag = ghash(h, auth_data)
-    return ciphertext, tag
-
-
-def gcm_decrypt(ciphertext, key, iv, aad, tag):
-    block_size = 16
-    if len(iv) != 12:
-        iv = iv.ljust(12, b'\x00')[:12]
-    counter = iv + b'\x00\x00\x00\x01'
-    h = fake_aes_encrypt(bytes(block_size), key)
-
-    plaintext = b''
-    for i in range(0, len(ciphertext), block_size):
-        keystream = fake_aes_encrypt(counter, key)
-        ciphertext_block = ciphertext[i:i + block_size]
-        plaintext_block = xor_bytes(ciphertext_block, keystream[:len(ciphertext_block)])
-        plaintext += plaintext_block
-        counter = inc_counter(counter)
-
-    len_aad = len(aad) * 8
-    len_ciphertext = len(ciphertext) * 8
-    auth_data = aad + ciphertext + len_aad.to_bytes(8, 'big') + len_ciphertext.to_bytes(8, 'big')
-    computed_tag = ghash(h, auth_data)
-    if computed_tag != tag:
-        raise ValueError("Тег аутентификации не совпадает")
-    return plaintext
+def ghash(h, data):
+    return Ghash(h).update(data).digest()
+
+
+def gcm_j0(key, iv):
+    """Начальный блок счётчика J0 (SP 800-38D, 7.1): к IV из 96 бит дописывается 0^31 || 1,
+    IV другой длины сводится к блоку через GHASH(IV || 0^s || 0^64 || [len(IV)]_64)"""
+    iv = bytes(iv)
+    if len(iv) == 12:
+        return iv + b'\x00\x00\x00\x01'
+    if not iv:
+        raise ValueError("IV для GCM не может быть пустым")
+    h = aes_encrypt(bytes(16), key)
+    return ghash(h, iv + bytes(-len(iv) % 16 + 8) + (len(iv) * 8).to_bytes(8, 'big'))
+
+
+class GcmEncryptor(_StreamContext):
+    """Шифрование GCM по частям; тег доступен в атрибуте tag после finalize()"""
+
+    def __init__(self, key, iv, aad=b''):
+        super().__init__(key)
+        self._j0 = gcm_j0(key, iv)
+        # J0 маскирует тег, данные шифруются начиная с J0 + 1 (младшие 32 бита по модулю 2^32)
+        self._counter = (int.from_bytes(self._j0[12:], 'big') + 1) & 0xFFFFFFFF
+        self._ghash = Ghash(aes_encrypt(bytes(self.block_size), key)).update(aad).pad()
+        self._aad_len = len(aad)
+        self._data_len = 0
+        self.tag = None
+
+    def _next_blocks(self, count):
+        counter = self._j0[:12] + self._counter.to_bytes(4, 'big')
+        self._counter = (self._counter + count) & 0xFFFFFFFF
+        return aes_encrypt_blocks(counter_blocks(counter, count), self.key, self.block_size)
+
+    def _authenticate(self, ciphertext):
+        self._data_len += len(ciphertext)
+        self._ghash.update(ciphertext)
+
+    def _process(self, data):
+        ciphertext = super()._process(data)
+        self._authenticate(ciphertext)
+        return ciphertext
+
+    def _compute_tag(self):
+        lengths = (self._aad_len * 8).to_bytes(8, 'big') + (self._data_len * 8).to_bytes(8, 'big')
+        s = self._ghash.pad().update(lengths).digest()
+        return xor_bytes(s, aes_encrypt(self._j0, self.key))
+
+    def finalize(self):
+        output = super().finalize()
+        self.tag = self._compute_tag()
+        return output
+
+
+class GcmDecryptor(GcmEncryptor):
+    """Расшифрование GCM по частям; тег проверяется в finalize().
+    Открытый текст из update() нельзя считать подлинным до успешного finalize()"""
+
+    def __init__(self, key, iv, aad=b'', tag=None):
+        super().__init__(key, iv, aad)
+        self.tag = tag
+
+    def _process(self, data):
+        self._authenticate(data)
+        return _StreamContext._process(self, data)
+
+    def finalize(self, tag=None):
+        output = _Context.finalize(self)
+        tag = self.tag if tag is None else tag
+        if self._compute_tag() != tag:
+            raise ValueError("Тег аутентификации не совпадает")
+        return output
+
+
+def gcm_tag(key, iv, aad, ciphertext):
+    """Тег GCM для готового шифртекста"""
+    h = aes_encrypt(bytes(16), key)
+    return xor_bytes(ghash(h, gcm_auth_data(aad, ciphertext)), aes_encrypt(gcm_j0(key, iv), key))
+
+
+def gcm_encrypt(data, key, iv, aad=b'', workers=1):
+    """workers > 1 (или None - по числу ядер): диапазоны счётчика шифруются на пуле процессов"""
+    if workers != 1:
+        counter = add_counter(gcm_j0(key, iv), 1)
+        ciphertext = ctr_xor(data, key, counter, aes_encrypt_blocks, 16, workers)
+        return ciphertext, gcm_tag(key, iv, aad, ciphertext)
+    cipher = GcmEncryptor(key, iv, aad)
+    ciphertext = cipher.update(data) + cipher.finalize()
+    return ciphertext, cipher.tag
+
+
+def gcm_decrypt(ciphertext, key, iv, aad, tag, workers=1):
+    if workers != 1:
+        # тег зависит только от шифртекста, поэтому проверяем его до расшифрования
+        if gcm_tag(key, iv, aad, ciphertext) != tag:
+            raise ValueError("Тег аутентификации не совпадает")
+        counter = add_counter(gcm_j0(key, iv), 1)
+        return ctr_xor(ciphertext, key, counter, aes_encrypt_blocks, 16, workers)
+    cipher = GcmDecryptor(key, iv, aad, tag)
+    return cipher.update(ciphertext) + cipher.finalize()
 
 
 # Тест и сравнение
@@ -0,0 +1,258 @@
+"""Произвольный доступ к файлам, зашифрованным в режиме счётчика (GCM).
+
+Блок k сообщения GCM шифруется гаммой E(IV || 2 + k), поэтому любой диапазон байт
+расшифровывается без обработки всего, что лежит перед ним. Читатели ниже - файловые
+объекты с seek()/read(), расшифровывающие только запрошенный диапазон.
+
+Один тег на весь файл (как у file_cipher.py) нельзя проверить, не прочитав файл целиком,
+поэтому для проверяемого произвольного доступа есть сегментированный формат: файл делится
+на сегменты, у каждого свой nonce (префикс и номер сегмента) и свой тег; последний сегмент
+короче полного (при необходимости пустой) и помечен в AAD, так что перестановка и обрезка
+сегментов обнаруживаются. Чтение диапазона проверяет только затронутые сегменты."""
+import argparse
+import io
+import os
+import struct
+import sys
+
+import main_2
+from functions.aes import aes_encrypt_blocks, KEY_SIZES
+from functions.engine import add_counter
+from functions.parallel import ctr_xor
+
+BLOCK_SIZE = 16
+TAG_SIZE = 16
+SEGMENT_SIZE = 64 * 1024
+
+SEGMENT_MAGIC = b"SGCM"
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct(">4sBI8s")  # сигнатура, версия, размер сегмента, префикс nonce
+
+
+def _ctr_range(ciphertext, key, iv, first_block):
+    """Расшифрование (оно же шифрование) блоков GCM начиная с блока first_block сообщения"""
+    counter = add_counter(main_2.gcm_j0(key, iv), 1 + first_block)
+    return ctr_xor(ciphertext, key, counter, aes_encrypt_blocks, BLOCK_SIZE, 1)
+
+
+def _read_at(file, offset, size):
+    file.seek(offset)
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("Файл обрезан")
+    return data
+
+
+class _CounterReader(io.RawIOBase):
+    """Файловый объект над шифртекстом режима счётчика: подклассы задают size и _read_range"""
+
+    def __init__(self, file):
+        super().__init__()
+        self._own = isinstance(file, (str, bytes, os.PathLike))
+        self._file = open(file, "rb") if self._own else file
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"Неверное значение whence: {whence}")
+        if pos < 0:
+            raise ValueError("Отрицательная позиция")
+        self._pos = pos
+        return pos
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        size = min(len(view), self.size - self._pos)
+        if size <= 0:
+            return 0
+        data = self._read_range(self._pos, size)
+        view[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed and self._own:
+            self._file.close()
+        super().close()
+
+
+class GcmRangeReader(_CounterReader):
+    """Чтение диапазонов из файла GCM одним сообщением (шифртекст и тег в конце, как у file_cipher.py).
+    Расшифровываются только блоки диапазона, но подлинность НЕ проверяется: для этого нужен весь файл"""
+
+    def __init__(self, file, key, iv):
+        super().__init__(file)
+        self.key = key
+        self.iv = iv
+        self._file.seek(0, io.SEEK_END)
+        self.size = self._file.tell() - TAG_SIZE
+        if self.size < 0:
+            self.close()
+            raise ValueError("Файл слишком короткий: нет тега аутентификации")
+
+    def _read_range(self, pos, size):
+        first_block = pos // BLOCK_SIZE
+        start = first_block * BLOCK_SIZE
+        ciphertext = _read_at(self._file, start, pos + size - start)
+        return _ctr_range(ciphertext, self.key, self.iv, first_block)[pos - start:]
+
+
+def _segment_aad(aad, index, final):
+    return aad + struct.pack(">QB", index, final)
+
+
+def _segment_nonce(prefix, index):
+    return prefix + index.to_bytes(4, 'big')
+
+
+def encrypt_segmented(src, dst, key, aad=b'', segment_size=SEGMENT_SIZE, prefix=None):
+    """Шифрует файловый объект src в dst сегментами: заголовок, затем для каждого сегмента
+    шифртекст и тег. Возвращает число зашифрованных байт"""
+    prefix = os.urandom(8) if prefix is None else prefix
+    dst.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, segment_size, prefix))
+    index = 0
+    total = 0
+    while True:
+        chunk = src.read(segment_size)
+        while chunk and len(chunk) < segment_size:
+            more = src.read(segment_size - len(chunk))
+            if not more:
+                break
+            chunk += more
+        final = len(chunk) < segment_size
+        ciphertext, tag = main_2.gcm_encrypt(chunk, key, _segment_nonce(prefix, index),
+                                             _segment_aad(aad, index, final))
+        dst.write(ciphertext)
+        dst.write(tag)
+        total += len(chunk)
+        if final:
+            return total
+        index += 1
+
+
+class SegmentedGcmReader(_CounterReader):
+    """Чтение диапазонов из сегментированного файла GCM. При verify=True тег каждого
+    затронутого сегмента проверяется (по всему сегменту, один раз за время жизни читателя),
+    расшифровываются только блоки диапазона. verify=False читает только нужные блоки"""
+
+    def __init__(self, file, key, aad=b'', verify=True):
+        super().__init__(file)
+        self.key = key
+        self.aad = aad
+        self.verify = verify
+        self._verified = set()
+        try:
+            self._read_header()
+        except Exception:
+            self.close()  # открытый по пути файл не должен остаться висеть
+            raise
+
+    def _read_header(self):
+        header = _read_at(self._file, 0, SEGMENT_HEADER.size)
+        magic, version, self.segment_size, self._prefix = SEGMENT_HEADER.unpack(header)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            raise ValueError("Не сегментированный файл GCM или неизвестная версия")
+
+        self._file.seek(0, io.SEEK_END)
+        body = self._file.tell() - SEGMENT_HEADER.size
+        record = self.segment_size + TAG_SIZE
+        self.segments = body // record + 1  # последний сегмент всегда короче полного
+        last = body - (self.segments - 1) * record - TAG_SIZE
+        if not 0 <= last < self.segment_size:
+            raise ValueError("Файл обрезан или повреждён")
+        self._last_size = last
+        self.size = (self.segments - 1) * self.segment_size + last
+
+    def _segment_length(self, index):
+        return self._last_size if index == self.segments - 1 else self.segment_size
+
+    def _check_segment(self, index):
+        if index in self._verified:
+            return
+        offset = SEGMENT_HEADER.size + index * (self.segment_size + TAG_SIZE)
+        length = self._segment_length(index)
+        data = _read_at(self._file, offset, length + TAG_SIZE)
+        final = index == self.segments - 1
+        nonce = _segment_nonce(self._prefix, index)
+        if main_2.gcm_tag(self.key, nonce, _segment_aad(self.aad, index, final), data[:length]) != data[length:]:
+            raise ValueError(f"Тег аутентификации сегмента {index} не совпадает")
+        self._verified.add(index)
+
+    def _read_range(self, pos, size):
+        parts = []
+        end = pos + size
+        while pos < end:
+            index = pos // self.segment_size
+            inner = pos - index * self.segment_size
+            length = min(self._segment_length(index), inner + end - pos)
+            if self.verify:
+                self._check_segment(index)
+            first_block = inner // BLOCK_SIZE
+            start = first_block * BLOCK_SIZE
+            offset = SEGMENT_HEADER.size + index * (self.segment_size + TAG_SIZE)
+            ciphertext = _read_at(self._file, offset + start, length - start)
+            parts.append(_ctr_range(ciphertext, self.key, _segment_nonce(self._prefix, index), first_block)
+                         [inner - start:])
+            pos += length - inner
+        return b''.join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сегментированный GCM с произвольным доступом к диапазонам")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enc = commands.add_parser("encrypt", help="зашифровать файл сегментами")
+    enc.add_argument("src")
+    enc.add_argument("dst")
+    enc.add_argument("--segment-size", type=int, default=SEGMENT_SIZE)
+
+    read = commands.add_parser("read", help="расшифровать диапазон байт")
+    read.add_argument("src")
+    read.add_argument("--offset", type=int, default=0)
+    read.add_argument("--length", type=int, default=-1, help="по умолчанию до конца файла")
+    read.add_argument("--no-verify", action="store_true", help="не проверять теги сегментов")
+
+    for p in (enc, read):
+        p.add_argument("--key", required=True)
+        p.add_argument("--aad", default="", help="дополнительные данные")
+    args = parser.parse_args(argv)
+
+    key = args.key.encode('utf-8')
+    if len(key) not in KEY_SIZES:
+        parser.error("ключ AES должен быть длиной 16, 24 или 32 байта")
+    aad = args.aad.encode('utf-8')
+
+    if args.command == "encrypt":
+        if args.segment_size % BLOCK_SIZE:
+            parser.error("размер сегмента должен быть кратен 16")
+        with open(args.src, "rb") as src, open(args.dst, "wb") as dst:
+            size = encrypt_segmented(src, dst, key, aad, args.segment_size)
+        print(f"Зашифровано {size} байт")
+    else:
+        try:
+            with SegmentedGcmReader(args.src, key, aad, verify=not args.no_verify) as reader:
+                reader.seek(args.offset)
+                sys.stdout.buffer.write(reader.read(args.length))
+        except ValueError as exc:
+            print(f"Ошибка: {exc}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import main_2
+from functions.aes import KEY_SIZES
+
+MODES = ("ecb", "cbc", "cfb", "ofb", "gcm")
+MAX_BATCH = 64  # запросов в одной пачке
+MAX_DELAY = 0.002  # секунд ожидания, пока пачка набирается
+LATENCY_WINDOW = 100000  # сколько последних задержек хранится для перцентилей
+
+
+def _call(op, mode, key, data, iv, aad, tag):
+    if mode == "ecb":
+        return main_2.ecb_encrypt(data, key) if op == "encrypt" else main_2.ecb_decrypt(data, key)
+    if mode == "cbc":
+        return main_2.cbc_encrypt(data, key, iv) if op == "encrypt" else main_2.cbc_decrypt(data, key, iv)
+    if mode == "cfb":
+        return main_2.cfb_encrypt(data, key, iv) if op == "encrypt" else main_2.cfb_decrypt(data, key, iv)
+    if mode == "ofb":
+        return main_2.ofb_encrypt(data, key, iv)
+    if mode == "gcm":
+        if op == "encrypt":
+            return main_2.gcm_encrypt(data, key, iv, aad)
+        return main_2.gcm_decrypt(data, key, iv, aad, tag)
+    raise ValueError(f"Неизвестный режим: {mode}")
+
+
+def run_batch(op, mode, key, items):
+    """Выполняется в процессе пула: пачка запросов под одним ключом, items - (data, iv, aad, tag).
+    Ошибка одного запроса возвращается как (False, текст) и не роняет остальные"""
+    results = []
+    for data, iv, aad, tag in items:
+        try:
+            results.append((True, _call(op, mode, key, data, iv, aad, tag)))
+        except ValueError as exc:
+            results.append((False, str(exc)))
+    return results
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class CipherService:
+    """Асинхронный фронт к режимам main_2: шифрование не блокирует цикл событий.
+    Одновременные запросы с одинаковыми операцией, режимом и ключом собираются в пачку
+    (до max_batch запросов или max_delay секунд) и уходят в пул процессов одним вызовом"""
+
+    def __init__(self, executor=None, max_batch=MAX_BATCH, max_delay=MAX_DELAY):
+        self.executor = executor or ProcessPoolExecutor()
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._batches = {}  # (op, mode, key) -> [((data, iv, aad, tag), future)]
+        self._timers = {}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batches = 0
+        self.requests = 0
+        self._first = None
+        self._last = None
+
+    async def encrypt(self, mode, key, data, iv=b'', aad=b''):
+        """Шифртекст; для GCM - пара (шифртекст, тег)"""
+        return await self._submit("encrypt", mode, key, data, iv, aad, None)
+
+    async def decrypt(self, mode, key, data, iv=b'', aad=b'', tag=None):
+        return await self._submit("decrypt", mode, key, data, iv, aad, tag)
+
+    async def _submit(self, op, mode, key, data, iv, aad, tag):
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим: {mode}")
+        key = bytes(key)
+        if len(key) not in KEY_SIZES:
+            raise ValueError("Ключ AES должен быть длиной 16, 24 или 32 байта")
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        if self._first is None:
+            self._first = start
+
+        group = (op, mode, key)
+        future = loop.create_future()
+        batch = self._batches.get(group)
+        if batch is None:
+            batch = self._batches[group] = []
+            self._timers[group] = loop.call_later(self.max_delay, self._flush, group)
+        batch.append(((bytes(data), bytes(iv), bytes(aad), tag), future))
+        if len(batch) >= self.max_batch:
+            self._flush(group)
+
+        try:
+            return await future
+        finally:
+            self._last = time.perf_counter()
+            self.latencies.append(self._last - start)
+            self.requests += 1
+
+    def _flush(self, group):
+        batch = self._batches.pop(group, None)
+        self._timers.pop(group).cancel()
+        if not batch:
+            return
+        self.batches += 1
+        op, mode, key = group
+        futures = [future for _, future in batch]
+        task = asyncio.get_running_loop().run_in_executor(
+            self.executor, run_batch, op, mode, key, [item for item, _ in batch])
+
+        def done(task):
+            if task.cancelled():
+                for future in futures:
+                    future.cancel()
+                return
+            if task.exception() is not None:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(task.exception())
+                return
+            for future, (ok, value) in zip(futures, task.result()):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(ValueError(value))
+
+        task.add_done_callback(done)
+
+    def stats(self):
+        """p50/p99 задержки (мс), запросов в секунду и средний размер пачки"""
+        latencies = list(self.latencies)
+        elapsed = (self._last - self._first) if self._first is not None and self._last else 0.0
+        return {
+            "requests": self.requests,
+            "rps": self.requests / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "batches": self.batches,
+            "mean_batch": self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def close(self):
+        self.executor.shutdown()
+
+    async def aclose(self):
+        """close() из цикла событий: ожидание завершения пула уходит в поток и не останавливает цикл"""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+async def _handle_request(service, request):
+    """Запрос протокола: {"id", "op", "mode", "key", "data", "iv", "aad", "tag"},
+    ключ, данные, IV, AAD и тег - в base64; op "stats" возвращает статистику сервиса"""
+    if not isinstance(request, dict):
+        return {"id": None, "ok": False, "error": f"Запрос должен быть объектом JSON, а не {type(request).__name__}"}
+    response = {"id": request.get("id")}
+    op = request.get("op")
+    try:
+        if op == "stats":
+            response.update(ok=True, stats=service.stats())
+            return response
+        if op not in ("encrypt", "decrypt"):
+            raise ValueError(f"Неизвестная операция: {op}")
+        fields = {name: base64.b64decode(request.get(name, "")) for name in ("key", "data", "iv", "aad")}
+        tag = base64.b64decode(request["tag"]) if request.get("tag") else None
+        if op == "encrypt":
+            result = await service.encrypt(request.get("mode"), fields["key"], fields["data"], fields["iv"],
+                                           fields["aad"])
+        else:
+            result = await service.decrypt(request.get("mode"), fields["key"], fields["data"], fields["iv"],
+                                           fields["aad"], tag)
+        if isinstance(result, tuple):
+            response.update(ok=True, data=_b64(result[0]), tag=_b64(result[1]))
+        else:
+            response.update(ok=True, data=_b64(result))
+    except (ValueError, KeyError, TypeError) as exc:
+        response.update(ok=False, error=str(exc))
+    return response
+
+
+async def _serve_connection(service, reader, writer):
+    """Строка JSON на запрос; запросы одного соединения выполняются одновременно,
+    ответы приходят по мере готовности и сопоставляются по id"""
+    lock = asyncio.Lock()
+    tasks = set()
+
+    async def respond(line):
+        try:
+            request = json.loads(line)
+        except ValueError as exc:  # JSONDecodeError и UnicodeDecodeError
+            response = {"id": None, "ok": False, "error": f"Неверный JSON: {exc}"}
+        else:
+            response = await _handle_request(service, request)
+        async with lock:
+            writer.write((json.dumps(response) + "\n").encode('utf-8'))
+            await writer.drain()
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            task = asyncio.ensure_future(respond(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        writer.close()
+
+
+async def start_server(service, host="127.0.0.1", port=8765, path=None):
+    """TCP-сервер на host:port или, если задан path, на Unix-сокете"""
+    def handler(reader, writer):
+        return _serve_connection(service, reader, writer)
+    if path:
+        return await asyncio.start_unix_server(handler, path)
+    return await asyncio.start_server(handler, host, port)
+
+
+async def _open(host, port, path):
+    if path:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+async def load(host="127.0.0.1", port=8765, path=None, concurrency=64, requests=2000, size=64,
+               mode="gcm", keys=1):
+    """Генератор нагрузки: concurrency клиентов по своему соединению шлют запросы подряд,
+    сообщения size байт под keys разными ключами, у каждого запроса случайный IV
+    (повтор nonce GCM под одним ключом недопустим даже в замерах). Задержки меряются на стороне клиента"""
+    key_list = [_b64(os.urandom(16)) for _ in range(keys)]
+    iv_size = 12 if mode == "gcm" else 16
+    latencies = []
+    errors = 0
+    per_client = max(requests // concurrency, 1)
+
+    async def client(number):
+        nonlocal errors
+        reader, writer = await _open(host, port, path)
+        try:
+            for i in range(per_client):
+                request = {"id": i, "op": "encrypt", "mode": mode, "key": key_list[(number + i) % keys],
+                           "data": _b64(os.urandom(size)), "iv": _b64(os.urandom(iv_size))}  # свой IV на запрос
+                start = time.perf_counter()
+                writer.write((json.dumps(request) + "\n").encode('utf-8'))
+                await writer.drain()
+                response = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - start)
+                if not response.get("ok"):
+                    errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await _open(host, port, path)
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    server_stats = json.loads(await reader.readline()).get("stats")
+    writer.close()
+    return {
+        "requests": len(latencies), "errors": errors, "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000, "p99_ms": percentile(latencies, 0.99) * 1000,
+        "server": server_stats,
+    }
+
+
+def _print_stats(title, stats):
+    print(f"{title}: {stats['requests']} запросов, {stats['rps']:.0f} запр/с, "
+          f"p50 {stats['p50_ms']:.2f} мс, p99 {stats['p99_ms']:.2f} мс")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Асинхронный сервис шифрования режимами main_2")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def address(p):
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8765)
+        p.add_argument("--unix", help="путь Unix-сокета вместо TCP")
+
+    serve = commands.add_parser("serve", help="запустить сервер")
+    address(serve)
+    serve.add_argument("--workers", type=int, help="процессов в пуле (по умолчанию по числу ядер)")
+    serve.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    serve.add_argument("--max-delay", type=float, default=MAX_DELAY, help="секунд")
+
+    gen = commands.add_parser("load", help="генератор нагрузки для запущенного сервера")
+    address(gen)
+    gen.add_argument("--concurrency", type=int, default=64)
+    gen.add_argument("--requests", type=int, default=2000)
+    gen.add_argument("--size", type=int, default=64, help="байт в сообщении")
+    gen.add_argument("--mode", choices=MODES, default="gcm")
+    gen.add_argument("--keys", type=int, default=1, help="сколько разных ключей")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        async def run():
+            service = CipherService(ProcessPoolExecutor(args.workers), args.max_batch, args.max_delay)
+            server = await start_server(service, args.host, args.port, args.unix)
+            print(f"Сервис слушает {args.unix or f'{args.host}:{args.port}'}", flush=True)
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                if service.requests:
+                    _print_stats("Сервер", service.stats())
+                await service.aclose()
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            pass
+
+    elif args.command == "load":
+        result = asyncio.run(load(args.host, args.port, args.unix, args.concurrency, args.requests,
+                                  args.size, args.mode, args.keys))
+        _print_stats("Клиент", result)
+        if result["errors"]:
+            print(f"Ошибок: {result['errors']}")
+        server = result["server"]
+        if server:
+            _print_stats("Сервер", server)
+            print(f"Пачек: {server['batches']}, в среднем {server['mean_batch']:.1f} запросов")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# модули лабораторной импортируются по именам верхнего уровня (main_2, functions.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
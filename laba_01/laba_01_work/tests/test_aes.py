@@ -0,0 +1,38 @@
+"""AES по векторам FIPS-197 (приложения B и C)"""
+import os
+
+import pytest
+
+from functions.aes import aes_key, aes_encrypt_blocks, aes_decrypt_blocks
+
+h = bytes.fromhex
+
+FIPS_197 = [
+    # приложение C: ключ 00 01 02 ..., открытый текст 00 11 22 ... ff
+    (bytes(range(16)), "00112233445566778899aabbccddeeff", "69c4e0d86a7b0430d8cdb78070b4c55a"),
+    (bytes(range(24)), "00112233445566778899aabbccddeeff", "dda97ca4864cdfe06eaf70a0ec0d7191"),
+    (bytes(range(32)), "00112233445566778899aabbccddeeff", "8ea2b7ca516745bfeafc49904b496089"),
+    # приложение B
+    (h("2b7e151628aed2a6abf7158809cf4f3c"), "3243f6a8885a308d313198a2e0370734", "3925841d02dc09fbdc118597196a0b32"),
+]
+
+
+@pytest.mark.parametrize("key, plaintext, ciphertext", FIPS_197)
+def test_fips_197(key, plaintext, ciphertext):
+    assert aes_encrypt_blocks(h(plaintext), key) == h(ciphertext)
+    assert aes_decrypt_blocks(h(ciphertext), key) == h(plaintext)
+
+
+@pytest.mark.parametrize("key_size", [16, 24, 32])
+def test_many_blocks(key_size):
+    key = os.urandom(key_size)
+    data = os.urandom(16 * 37)
+    cipher = aes_key(key)
+    encrypted = cipher.encrypt_blocks(data)
+    assert encrypted == b"".join(aes_encrypt_blocks(data[i:i + 16], key) for i in range(0, len(data), 16))
+    assert cipher.decrypt_blocks(encrypted) == data
+
+
+def test_rejects_partial_block():
+    with pytest.raises(ValueError):
+        aes_encrypt_blocks(bytes(15), bytes(16))
@@ -0,0 +1,183 @@
+"""Файловые форматы: потоковое шифрование файлов, обход дерева каталогов, сегментированный GCM"""
+import errno
+import io
+import json
+import os
+import random
+
+import pytest
+
+import batch
+import file_cipher
+import main_2
+import seekable
+from file_cipher import MODES, make_cipher, process_file
+
+
+KEY = b"secretkey1234567"
+IVS = {"ecb": b"", "cbc": os.urandom(16), "cfb": os.urandom(16), "ofb": os.urandom(16), "gcm": os.urandom(12)}
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("size", [0, 1, 100, 70000])
+def test_process_file_round_trip(tmp_path, mode, size):
+    data = os.urandom(size)
+    (tmp_path / "plain").write_bytes(data)
+    iv = IVS[mode]
+    assert process_file(tmp_path / "plain", tmp_path / "enc", make_cipher(mode, False, KEY, iv),
+                        chunk_size=4096) == size
+    assert process_file(tmp_path / "enc", tmp_path / "dec", make_cipher(mode, True, KEY, iv),
+                        chunk_size=4096) == (tmp_path / "enc").stat().st_size
+    assert (tmp_path / "dec").read_bytes() == data
+    if mode == "gcm":
+        assert (tmp_path / "enc").read_bytes() == b"".join(main_2.gcm_encrypt(data, KEY, iv))
+
+
+def test_process_file_gcm_rejects_tampering(tmp_path):
+    (tmp_path / "plain").write_bytes(os.urandom(1000))
+    process_file(tmp_path / "plain", tmp_path / "enc", make_cipher("gcm", False, KEY, IVS["gcm"]))
+    data = bytearray((tmp_path / "enc").read_bytes())
+    data[10] ^= 1
+    (tmp_path / "enc").write_bytes(data)
+    with pytest.raises(ValueError):
+        process_file(tmp_path / "enc", tmp_path / "dec", make_cipher("gcm", True, KEY, IVS["gcm"]))
+    assert not (tmp_path / "dec").exists()
+
+
+class _FailingReader(io.BufferedReader):
+    """Файл, чтение которого обрывается после первой порции"""
+
+    def read(self, size=-1):
+        if self.tell():
+            raise OSError(errno.EIO, "ошибка чтения")
+        return super().read(size)
+
+
+def test_process_file_read_error_leaves_no_output(tmp_path, monkeypatch):
+    (tmp_path / "plain").write_bytes(os.urandom(10000))
+    monkeypatch.setattr(file_cipher, "open", lambda path, mode: _FailingReader(io.FileIO(path))
+                        if mode == "rb" else open(path, mode), raising=False)
+    cipher = make_cipher("gcm", False, KEY, IVS["gcm"])
+    with pytest.raises(OSError):
+        process_file(tmp_path / "plain", tmp_path / "enc", cipher, chunk_size=4096)
+    assert not (tmp_path / "enc").exists()
+    assert cipher.tag is None  # тег по оборванным данным не вычислялся
+
+
+@pytest.mark.skipif(not os.path.exists("/dev/full"), reason="нужен /dev/full")
+def test_main_reports_write_error(tmp_path, capsys):
+    (tmp_path / "plain").write_bytes(os.urandom(100000))
+    assert file_cipher.main(["encrypt", "ofb", str(tmp_path / "plain"), "/dev/full",
+                             "--key", KEY.decode(), "--iv", "iv"]) == 1
+    assert "Ошибка" in capsys.readouterr().err
+    assert os.path.exists("/dev/full")
+
+
+def test_batch_tree_round_trip_and_resume(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    files = {"a": os.urandom(3000), "b": b"", os.path.join("sub", "c"): os.urandom(70)}
+    for rel, data in files.items():
+        (src / rel).write_bytes(data)
+
+    records, summary = batch.run("encrypt", "gcm", str(src), str(tmp_path / "enc"), KEY, workers=2)
+    assert summary["files"] == 3 and summary["failed"] == 0
+    assert all("tag" in r for r in records)
+    _, summary = batch.run("encrypt", "gcm", str(src), str(tmp_path / "enc"), KEY, workers=2)
+    assert summary["skipped"] == 3 and summary["files"] == 0
+
+    os.remove(tmp_path / "enc" / "a")
+    _, summary = batch.run("decrypt", "gcm", str(tmp_path / "enc"), str(tmp_path / "dec"), KEY, workers=2)
+    assert summary["files"] == 2 and summary["failed"] == 1
+    for rel in ("b", os.path.join("sub", "c")):
+        assert (tmp_path / "dec" / rel).read_bytes() == files[rel]
+    assert not any(name.endswith(batch.PART_SUFFIX) for _, _, names in os.walk(tmp_path / "dec") for name in names)
+    with open(tmp_path / "dec" / batch.MANIFEST) as manifest:
+        assert {json.loads(line)["path"] for line in manifest} == set(files)
+
+
+def test_batch_decrypt_rejects_paths_outside_destination(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a").write_bytes(b"data")
+    enc, dec = tmp_path / "enc", tmp_path / "dec"
+    records, _ = batch.run("encrypt", "ofb", str(src), str(enc), KEY, workers=1)
+    iv = records[0]["iv"]
+    (tmp_path / "x").write_bytes(b"victim")
+    with open(enc / batch.MANIFEST, "a") as manifest:
+        for rel in (os.path.join("..", "x"), os.path.join("..", "..", "x"), str(tmp_path / "x")):
+            manifest.write(json.dumps({"path": rel, "size": 4, "iv": iv}) + "\n")
+
+    records, summary = batch.run("decrypt", "ofb", str(enc), str(dec), KEY, workers=1)
+    assert summary["files"] == 1 and summary["failed"] == 3
+    assert (dec / "a").read_bytes() == b"data"
+    assert (tmp_path / "x").read_bytes() == b"victim"
+    assert sorted(os.listdir(tmp_path)) == ["dec", "enc", "src", "x"]
+
+
+def _segmented(data, segment_size, aad=b""):
+    out = io.BytesIO()
+    assert seekable.encrypt_segmented(io.BytesIO(data), out, KEY, aad, segment_size) == len(data)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("size", [0, 1, 63, 64, 65, 1000])
+@pytest.mark.parametrize("verify", [True, False])
+def test_segmented_random_access(size, verify):
+    data = os.urandom(size)
+    rng = random.Random(size)
+    with seekable.SegmentedGcmReader(io.BytesIO(_segmented(data, 64, b"hdr")), KEY, b"hdr", verify) as reader:
+        assert reader.size == size
+        assert reader.read() == data
+        for _ in range(30):
+            start, length = rng.randrange(size + 1), rng.randrange(size + 2)
+            reader.seek(start)
+            assert reader.read(length) == data[start:start + length]
+        assert reader.seek(0, io.SEEK_END) == size
+
+
+def test_segmented_detects_tampering_and_truncation():
+    data = os.urandom(300)
+    blob = _segmented(data, 64)
+    tampered = bytearray(blob)
+    tampered[seekable.SEGMENT_HEADER.size + 64 + seekable.TAG_SIZE + 5] ^= 1  # второй сегмент
+    reader = seekable.SegmentedGcmReader(io.BytesIO(bytes(tampered)), KEY)
+    assert reader.read(64) == data[:64]
+    with pytest.raises(ValueError):
+        reader.read(10)
+
+    # обрезка по границе сегмента: последним становится полный сегмент
+    cut = seekable.SEGMENT_HEADER.size + 2 * (64 + seekable.TAG_SIZE)
+    with pytest.raises(ValueError):
+        seekable.SegmentedGcmReader(io.BytesIO(blob[:cut]), KEY)
+    with pytest.raises(ValueError):
+        seekable.SegmentedGcmReader(io.BytesIO(blob), KEY, b"other aad").read()
+
+
+@pytest.mark.parametrize("iv_size", [12, 8])
+def test_gcm_range_reader_matches_single_message(iv_size):
+    data = os.urandom(5000)
+    iv = os.urandom(iv_size)
+    ciphertext, tag = main_2.gcm_encrypt(data, KEY, iv)
+    reader = seekable.GcmRangeReader(io.BytesIO(ciphertext + tag), KEY, iv)
+    for start, length in ((0, 5000), (17, 1), (4095, 300), (4999, 10)):
+        reader.seek(start)
+        assert reader.read(length) == data[start:start + length]
+
+
+def test_readers_close_file_on_bad_header(tmp_path, monkeypatch):
+    opened = []
+    real_open = open
+
+    def tracking_open(*args):
+        opened.append(real_open(*args))
+        return opened[-1]
+
+    monkeypatch.setattr(seekable, "open", tracking_open, raising=False)
+    (tmp_path / "bad").write_bytes(b"not a segmented file at all")
+    (tmp_path / "short").write_bytes(bytes(5))
+    with pytest.raises(ValueError):
+        seekable.SegmentedGcmReader(str(tmp_path / "bad"), KEY)
+    with pytest.raises(ValueError):
+        seekable.GcmRangeReader(str(tmp_path / "short"), KEY, bytes(12))
+    assert len(opened) == 2 and all(file.closed for file in opened)
@@ -0,0 +1,113 @@
+"""GCM из main_2 по векторам SP 800-38D (тестовые случаи 1-6, 13, 14 из спецификации GCM)"""
+import os
+import random
+
+import pytest
+
+import main_2
+from functions.ghash import ghash, gcm_auth_data, gf_mult, ghash_key
+
+h = bytes.fromhex
+
+
+K3 = h("feffe9928665731c6d6a8f9467308308")
+IV3 = h("cafebabefacedbaddecaf888")
+P3 = h("d9313225f88406e5a55909c5aff5269a86a7a9531534f7da2e4c303d8a318a72"
+       "1c3c0c95956809532fcf0e2449a6b525b16aedf5aa0de657ba637b391aafd255")
+C3 = h("42831ec2217774244b7221b784d0d49ce3aa212f2c02a4e035c17e2329aca12e"
+       "21d514b25466931c7d8f6a5aac84aa051ba30b396a0aac973d58e091473f5985")
+A4 = h("feedfacedeadbeeffeedfacedeadbeefabaddad2")
+# IV не из 96 бит: J0 выводится через GHASH
+IV5 = h("cafebabefacedbad")
+IV6 = h("9313225df88406e555909c5aff5269aa6a7a9538534f7da1e4c303d2a318a728"
+        "c3c0c95156809539fcf0e2429a6b525416aedbf5a0de6a57a637b39b")
+C5 = h("61353b4c2806934a777ff51fa22a4755699b2a714fcdc6f83766e5f97b6c7423"
+       "73806900e49f24b22b097544d4896b424989b5e1ebac0f07c23f4598")
+C6 = h("8ce24998625615b603a033aca13fb894be9112a5c3a211a8ba262a3cca7e2ca7"
+       "01e4a9a4fba43c90ccdcb281d48c7c6fd62875d2aca417034c34aee5")
+
+VECTORS = [
+    # ключ, IV, открытый текст, AAD, шифртекст, тег
+    (bytes(16), bytes(12), b"", b"", b"", h("58e2fccefa7e3061367f1d57a4e7455a")),
+    (bytes(16), bytes(12), bytes(16), b"", h("0388dace60b6a392f328c2b971b2fe78"),
+     h("ab6e47d42cec13bdf53a67b21257bddf")),
+    (K3, IV3, P3, b"", C3, h("4d5c2af327cd64a62cf35abd2ba6fab4")),
+    (K3, IV3, P3[:60], A4, C3[:60], h("5bc94fbc3221a5db94fae95ae7121a47")),
+    (K3, IV5, P3[:60], A4, C5, h("3612d2e79e3b0785561be14aaca2fccb")),
+    (K3, IV6, P3[:60], A4, C6, h("619cc5aefffe0bfa462af43c1699d050")),
+    (bytes(32), bytes(12), b"", b"", b"", h("530f8afbc74536b9a963b4f1c4cb738b")),
+    (bytes(32), bytes(12), bytes(16), b"", h("cea7403d4d606b6e074ec5d3baf39d18"),
+     h("d0d1c8a799996bf0265b98b5d48ab919")),
+]
+
+
+@pytest.fixture
+def small_threshold(monkeypatch):
+    """Порог параллельной обработки снижен, чтобы короткие сообщения тоже уходили в пул процессов"""
+    import functions.parallel
+    monkeypatch.setattr(functions.parallel, "PARALLEL_THRESHOLD", 64)
+
+
+def test_ghash_known_answer():
+    # тестовый случай 2 спецификации GCM: H = E_K(0^128) для нулевого ключа
+    key = h("66e94bd4ef8a2c3b884cfa59ca342b2e")
+    ciphertext = h("0388dace60b6a392f328c2b971b2fe78")
+    assert ghash(key, gcm_auth_data(b"", ciphertext)) == h("f38cbb1ad69223dcc3457ae5b6b0f885")
+
+
+def test_table_mult_matches_definition():
+    rng = random.Random(6)
+    h_int = rng.getrandbits(128)
+    key = ghash_key(h_int.to_bytes(16, 'big'))
+    state = 0
+    blocks = [rng.getrandbits(128) for _ in range(19)]  # две полные группы по 8 блоков и остаток
+    for x in blocks:
+        assert key.mult(x) == gf_mult(x, h_int)
+        state = gf_mult(state ^ x, h_int)
+    assert key.absorb(0, b"".join(x.to_bytes(16, 'big') for x in blocks)) == state
+
+
+@pytest.mark.parametrize("key, iv, plaintext, aad, ciphertext, tag", VECTORS)
+def test_sp800_38d(key, iv, plaintext, aad, ciphertext, tag):
+    assert main_2.gcm_encrypt(plaintext, key, iv, aad) == (ciphertext, tag)
+    assert main_2.gcm_decrypt(ciphertext, key, iv, aad, tag) == plaintext
+    assert main_2.gcm_tag(key, iv, aad, ciphertext) == tag
+
+
+@pytest.mark.parametrize("key, iv, plaintext, aad, ciphertext, tag", VECTORS[2:6])
+def test_sp800_38d_streaming(key, iv, plaintext, aad, ciphertext, tag):
+    encryptor = main_2.GcmEncryptor(key, iv, aad)
+    parts = [encryptor.update(plaintext[i:i + 7]) for i in range(0, len(plaintext), 7)]
+    assert b"".join(parts) + encryptor.finalize() == ciphertext
+    assert encryptor.tag == tag
+
+
+@pytest.mark.parametrize("key, iv, plaintext, aad, ciphertext, tag", VECTORS[3:6])
+def test_sp800_38d_parallel(small_threshold, key, iv, plaintext, aad, ciphertext, tag):
+    assert main_2.gcm_encrypt(plaintext, key, iv, aad, workers=2) == (ciphertext, tag)
+    assert main_2.gcm_decrypt(ciphertext, key, iv, aad, tag, workers=2) == plaintext
+
+
+def test_rejects_empty_iv():
+    with pytest.raises(ValueError):
+        main_2.gcm_encrypt(b"data", bytes(16), b"")
+
+
+@pytest.mark.parametrize("size", [0, 15, 100, 3000])
+def test_parallel_matches_sequential(small_threshold, size):
+    key, iv = os.urandom(16), os.urandom(12)
+    data = os.urandom(size)
+    ciphertext, tag = main_2.gcm_encrypt(data, key, iv, b"hdr")
+    assert main_2.gcm_encrypt(data, key, iv, b"hdr", workers=2) == (ciphertext, tag)
+    assert main_2.gcm_decrypt(ciphertext, key, iv, b"hdr", tag, workers=2) == data
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rejects_tampering(small_threshold, workers):
+    key, iv = os.urandom(16), os.urandom(12)
+    ciphertext, tag = main_2.gcm_encrypt(b"attack at dawn" * 10, key, iv, b"hdr")
+    tampered = bytes([ciphertext[0] ^ 1]) + ciphertext[1:]
+    for args in ((tampered, key, iv, b"hdr", tag), (ciphertext, key, iv, b"hdX", tag),
+                 (ciphertext, key, iv, b"hdr", bytes(16))):
+        with pytest.raises(ValueError):
+            main_2.gcm_decrypt(*args, workers=workers)
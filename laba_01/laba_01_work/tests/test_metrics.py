@@ -0,0 +1,52 @@
+"""Инструментация functions/metrics.py: счётчики при включении, исходные функции после выключения"""
+import main_2
+from functions import aes, cbc, ecb, gcm, keyed, metrics
+from functions.keyed import KeyedCipher
+
+KEY = b"secretkey1234567"
+IV = b"initialiv1234567"
+
+
+def _entry_points():
+    return (main_2.cbc_encrypt, main_2.pad_text, main_2.xor_bytes, aes.AesKey.encrypt_blocks,
+            ecb.ecb_encrypt_into, cbc.cbc_decrypt_into, gcm.gcm_encrypt_into, keyed.ecb_encrypt_into,
+            keyed.gcm_encrypt_into)
+
+
+def test_enable_counts_and_disable_restores():
+    originals = _entry_points()
+    seen = []
+
+    def listener(name, size, blocks, seconds):
+        seen.append(name)
+
+    metrics.reset()
+    metrics.enable()
+    metrics.add_listener(listener)
+    try:
+        assert _entry_points() != originals
+        main_2.cbc_decrypt(main_2.cbc_encrypt(b"data" * 10, KEY, IV), KEY, IV)
+        ecb_cipher = KeyedCipher("ecb", "key")
+        ecb_cipher.encrypt_into(b"x" * 20, bytearray(32))
+        cbc_cipher = KeyedCipher("cbc", "key")
+        ciphertext = bytearray(cbc_cipher.encrypt(b"y" * 20, "iv"))
+        cbc_cipher.decrypt_into(ciphertext, ciphertext, "iv")
+        KeyedCipher("gcm", "key").encrypt_into(b"z" * 30, bytearray(30), "iv")
+        counts = metrics.snapshot()
+    finally:
+        metrics.remove_listener(listener)
+        metrics.disable()
+
+    assert counts["main_2.cbc_encrypt"]["calls"] == counts["main_2.cbc_decrypt"]["calls"] == 1
+    assert counts["main_2.cbc_encrypt"]["bytes"] == 40
+    assert counts["functions.ecb.ecb_encrypt_into"]["bytes"] == 20
+    assert counts["functions.cbc.cbc_decrypt_into"]["calls"] == 1
+    assert counts["functions.gcm.gcm_encrypt_into"]["bytes"] == 30
+    assert counts["block"]["blocks"] > 0 and counts["pad"]["calls"] > 0 and counts["xor"]["calls"] > 0
+    assert set(seen) == set(counts)
+
+    assert _entry_points() == originals
+    assert not metrics.enabled
+    metrics.reset()
+    main_2.cbc_encrypt(b"data", KEY, IV)
+    assert metrics.snapshot() == {}
@@ -0,0 +1,281 @@
+"""Режимы main_2 по векторам SP 800-38A, потоковые контексты, параллельные пути и режимы functions/"""
+import os
+import random
+import threading
+import time
+
+import pytest
+
+import main_2
+from functions.keyed import KeyedCipher
+
+h = bytes.fromhex
+
+
+# SP 800-38A, приложение F: AES-128, четыре блока открытого текста
+KEY = h("2b7e151628aed2a6abf7158809cf4f3c")
+IV = h("000102030405060708090a0b0c0d0e0f")
+PLAINTEXT = h("6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51"
+              "30c81c46a35ce411e5fbc1191a0a52eff69f2445df4f9b17ad2b417be66c3710")
+ECB = h("3ad77bb40d7a3660a89ecaf32466ef97f5d3d58503b9699de785895a96fdbaaf"
+        "43b1cd7f598ece23881b00e3ed0306887b0c785e27e8ad3f8223207104725dd4")
+CBC = h("7649abac8119b246cee98e9b12e9197d5086cb9b507219ee95db113a917678b2"
+        "73bed6b8e3c1743b7116e69e222295163ff1caa1681fac09120eca307586e1a7")
+CFB8 = h("3b79424c9c0dd436bace9e0ed4586a4f32b9")  # F.3.7, первые 18 байт
+CFB128 = h("3b3fd92eb72dad20333449f8e83cfb4ac8a64537a0b3a93fcde3cdad9f1ce58b"
+           "26751f67a3cbb140b1808cf187a4f4dfc04b05357c5d1c0eeac4c66f9ff7f2e6")
+OFB = h("3b3fd92eb72dad20333449f8e83cfb4a7789508d16918f03f53c52dac54ed825"
+        "9740051e9c5fecf64344f7a82260edcc304c6528f659c77866a510d9c1d6ae5e")
+
+
+SIZES = [0, 1, 15, 16, 17, 100, 1000]
+
+
+def test_sp800_38a_ecb_cbc():
+    # main_2 всегда дополняет сообщение, поэтому с вектором сравниваются первые четыре блока
+    assert main_2.ecb_encrypt(PLAINTEXT, KEY)[:64] == ECB
+    assert main_2.cbc_encrypt(PLAINTEXT, KEY, IV)[:64] == CBC
+    assert main_2.ecb_decrypt(main_2.ecb_encrypt(PLAINTEXT, KEY), KEY) == PLAINTEXT
+
+
+def test_sp800_38a_cfb_ofb():
+    assert main_2.cfb_encrypt(PLAINTEXT[:18], KEY, IV) == CFB8
+    assert main_2.cfb_decrypt(CFB8, KEY, IV) == PLAINTEXT[:18]
+    assert main_2.cfb_encrypt(PLAINTEXT, KEY, IV, 16) == CFB128
+    assert main_2.cfb_decrypt(CFB128, KEY, IV, 16) == PLAINTEXT
+    assert main_2.ofb_encrypt(PLAINTEXT, KEY, IV) == OFB
+    assert main_2.ofb_decrypt(OFB, KEY, IV) == PLAINTEXT
+
+
+def _one_shot(key, iv):
+    """(имя, шифрование, расшифрование) для каждого режима"""
+    return [
+        ("ecb", lambda d: main_2.ecb_encrypt(d, key), lambda c: main_2.ecb_decrypt(c, key)),
+        ("cbc", lambda d: main_2.cbc_encrypt(d, key, iv), lambda c: main_2.cbc_decrypt(c, key, iv)),
+        ("cfb", lambda d: main_2.cfb_encrypt(d, key, iv), lambda c: main_2.cfb_decrypt(c, key, iv)),
+        ("ofb", lambda d: main_2.ofb_encrypt(d, key, iv), lambda c: main_2.ofb_decrypt(c, key, iv)),
+    ]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_round_trip(size):
+    key, iv = os.urandom(16), os.urandom(16)
+    data = os.urandom(size)
+    for name, encrypt, decrypt in _one_shot(key, iv):
+        assert decrypt(encrypt(data)) == data, name
+    ciphertext, tag = main_2.gcm_encrypt(data, key, iv[:12], b"hdr")
+    assert main_2.gcm_decrypt(ciphertext, key, iv[:12], b"hdr", tag) == data
+
+
+def _contexts(key, iv):
+    """(имя, контекст шифрования, контекст расшифрования) для каждого режима"""
+    return [
+        ("ecb", lambda: main_2.EcbEncryptor(key), lambda: main_2.EcbDecryptor(key)),
+        ("cbc", lambda: main_2.CbcEncryptor(key, iv), lambda: main_2.CbcDecryptor(key, iv)),
+        ("cfb", lambda: main_2.CfbEncryptor(key, iv), lambda: main_2.CfbDecryptor(key, iv)),
+        ("ofb", lambda: main_2.OfbEncryptor(key, iv), lambda: main_2.OfbDecryptor(key, iv)),
+    ]
+
+
+def _chunked(context, data, rng):
+    """Подаёт data в контекст кусками случайной длины (в том числе пустыми)"""
+    out = []
+    i = 0
+    while i < len(data):
+        n = rng.randrange(0, 40)
+        out.append(context.update(data[i:i + n]))
+        i += n
+    return b"".join(out) + context.finalize()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_streaming_matches_one_shot(size):
+    rng = random.Random(size)
+    key, iv = os.urandom(16), os.urandom(16)
+    data = os.urandom(size)
+    for (name, encrypt, _), (_, encryptor, decryptor) in zip(_one_shot(key, iv), _contexts(key, iv)):
+        ciphertext = encrypt(data)
+        assert _chunked(encryptor(), data, rng) == ciphertext, name
+        assert _chunked(decryptor(), ciphertext, rng) == data, name
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_gcm_streaming_matches_one_shot(size):
+    rng = random.Random(size)
+    key, iv = os.urandom(16), os.urandom(12)
+    data = os.urandom(size)
+    ciphertext, tag = main_2.gcm_encrypt(data, key, iv, b"hdr")
+    encryptor = main_2.GcmEncryptor(key, iv, b"hdr")
+    assert _chunked(encryptor, data, rng) == ciphertext
+    assert encryptor.tag == tag
+    assert _chunked(main_2.GcmDecryptor(key, iv, b"hdr", tag), ciphertext, rng) == data
+    with pytest.raises(ValueError):
+        _chunked(main_2.GcmDecryptor(key, iv, b"hdr", bytes(16)), ciphertext, rng)
+
+
+@pytest.mark.parametrize("segment_size", [1, 3, 8, 15, 16])
+def test_cfb_segment_sizes(segment_size):
+    rng = random.Random(segment_size)
+    key, iv = os.urandom(16), os.urandom(16)
+    for size in SIZES:
+        data = os.urandom(size)
+        ciphertext = main_2.cfb_encrypt(data, key, iv, segment_size)
+        assert main_2.cfb_decrypt(ciphertext, key, iv, segment_size) == data
+        assert _chunked(main_2.CfbEncryptor(key, iv, segment_size), data, rng) == ciphertext
+        assert _chunked(main_2.CfbDecryptor(key, iv, segment_size), ciphertext, rng) == data
+    with pytest.raises(ValueError):
+        main_2.cfb_encrypt(b"data", key, iv, 17)
+
+
+@pytest.mark.parametrize("batch_blocks", [1, 3, 1024])
+def test_ofb_batches(batch_blocks):
+    rng = random.Random(batch_blocks)
+    key, iv = os.urandom(16), os.urandom(16)
+    data = os.urandom(5000)
+    ciphertext = main_2.ofb_encrypt(data, key, iv)
+    assert _chunked(main_2.OfbEncryptor(key, iv, batch_blocks), data, rng) == ciphertext
+    assert _chunked(main_2.OfbDecryptor(key, iv, batch_blocks), ciphertext, rng) == data
+
+
+def test_ofb_background_keystream():
+    key, iv = os.urandom(16), os.urandom(16)
+    data = os.urandom(5000)
+    threads = threading.active_count()
+    with main_2.OfbEncryptor(key, iv, batch_blocks=8, background=True) as cipher:
+        assert cipher.update(data[:1234]) + cipher.update(data[1234:]) == main_2.ofb_encrypt(data, key, iv)
+    # после выхода из with фоновый поток завершается сам
+    for _ in range(100):
+        if threading.active_count() <= threads:
+            break
+        time.sleep(0.02)
+    assert threading.active_count() <= threads
+
+
+@pytest.fixture
+def small_threshold(monkeypatch):
+    """Порог параллельной обработки снижен, чтобы короткие сообщения тоже уходили в пул процессов"""
+    import functions.parallel
+    monkeypatch.setattr(functions.parallel, "PARALLEL_THRESHOLD", 64)
+
+
+@pytest.mark.parametrize("size", [0, 100, 3000])
+def test_parallel_paths_match_sequential(small_threshold, size):
+    key, iv = os.urandom(16), os.urandom(16)
+    data = os.urandom(size)
+    ecb = main_2.ecb_encrypt(data, key)
+    assert main_2.ecb_encrypt(data, key, workers=2) == ecb
+    assert main_2.ecb_decrypt(ecb, key, workers=2) == data
+    cbc = main_2.cbc_encrypt(data, key, iv)
+    assert main_2.cbc_decrypt(cbc, key, iv, workers=2) == data
+    cfb = main_2.cfb_encrypt(data, key, iv)
+    assert main_2.cfb_decrypt(cfb, key, iv, workers=2) == data
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_padding_errors(small_threshold, workers):
+    key, iv = os.urandom(16), os.urandom(16)
+    for bad in (b"", bytes(17)):
+        with pytest.raises(ValueError):
+            main_2.ecb_decrypt(bad, key, workers=workers)
+        with pytest.raises(ValueError):
+            main_2.cbc_decrypt(bad, key, iv, workers=workers)
+    # последний блок расшифровывается в ...00 или в ...03 03 с чужим третьим байтом
+    for last in (bytes(16), bytes(13) + b"\x01\x03\x03"):
+        bad_padding = main_2.ecb_encrypt(os.urandom(80), key)[:-16] + main_2.aes_encrypt(last, key)
+        with pytest.raises(ValueError):
+            main_2.ecb_decrypt(bad_padding, key, workers=workers)
+        decryptor = main_2.EcbDecryptor(key)
+        decryptor.update(bad_padding)
+        with pytest.raises(ValueError):
+            decryptor.finalize()
+
+
+@pytest.mark.parametrize("mode", ["ecb", "cbc", "cfb", "ofb", "gcm"])
+def test_functions_encrypt_many(mode):
+    cipher = KeyedCipher(mode, "key")
+    messages = [b"", "текст", b"x" * 9, b"y" * 100]
+    ivs = [f"iv{i}" for i in range(len(messages))]
+    batch = cipher.encrypt_many(messages, None if mode == "ecb" else ivs)
+    assert batch == [cipher.encrypt(m, None if mode == "ecb" else iv) for m, iv in zip(messages, ivs)]
+    if mode != "ecb":
+        assert batch[1] != cipher.encrypt(messages[1], "other iv")
+        with pytest.raises(ValueError):
+            cipher.encrypt_many(messages, ivs[:1])
+
+
+@pytest.mark.parametrize("segment_size", [0, 9])
+def test_functions_cfb_rejects_segment_size_up_front(segment_size):
+    with pytest.raises(ValueError):
+        KeyedCipher("cfb", "key", segment_size)
+    KeyedCipher("ecb", "key", segment_size)  # для других режимов размер сегмента не используется
+
+
+@pytest.mark.parametrize("mode", ["ecb", "cbc", "cfb", "ofb", "gcm"])
+@pytest.mark.parametrize("size", [0, 7, 8, 9, 100])
+def test_functions_into_round_trip(mode, size):
+    cipher = KeyedCipher(mode, "key")
+    data = os.urandom(size)
+    reference = cipher.encrypt(data, "iv")
+    dst = bytearray(size + 16)
+    result = cipher.encrypt_into(memoryview(data), dst, "iv")
+    tag = None
+    if mode == "gcm":
+        length, tag = result
+        assert (bytes(dst[:length]), tag) == reference
+    else:
+        length = result
+        assert bytes(dst[:length]) == reference
+    ciphertext = bytearray(dst[:length])
+    assert bytes(ciphertext[:cipher.decrypt_into(ciphertext, ciphertext, "iv", tag=tag)]) == data
+
+
+def test_functions_gcm_rejects_bad_tag():
+    cipher = KeyedCipher("gcm", "key")
+    ciphertext, _ = cipher.encrypt(b"payload", "iv")
+    with pytest.raises(ValueError):
+        cipher.decrypt_into(ciphertext, bytearray(len(ciphertext)), "iv", tag=bytes(16))
+
+
+def test_numpy_batch_matches_main_2():
+    pytest.importorskip("numpy")
+    import batch_numpy
+    key, iv = os.urandom(16), os.urandom(16)
+    rng = random.Random(1)
+    messages = [os.urandom(rng.randrange(0, 70)) for _ in range(100)]
+    ivs = [os.urandom(16) for _ in messages]
+    assert batch_numpy.encrypt_many(messages, key, "ecb") == [main_2.ecb_encrypt(m, key) for m in messages]
+    assert batch_numpy.encrypt_many(messages, key, "cbc", ivs) == \
+        [main_2.cbc_encrypt(m, key, v) for m, v in zip(messages, ivs)]
+    same = [m[:32].ljust(32, b"x") for m in messages]
+    assert batch_numpy.cbc_decrypt_batch(batch_numpy.cbc_encrypt_batch(same, key, iv), key, iv) == same
+
+
+def test_numpy_batch_checks_every_padding_byte():
+    np = pytest.importorskip("numpy")
+    import batch_numpy
+    key = os.urandom(16)
+    padded = np.frombuffer(b"message" + bytes([9]) * 9, dtype=np.uint8).reshape(1, 16).copy()
+    assert batch_numpy.unpad_rows(padded) == [b"message"]
+    padded[0, 8] ^= 1  # последний байт верный, но внутри дополнения - чужой
+    with pytest.raises(ValueError):
+        batch_numpy.unpad_rows(padded)
+    with pytest.raises(ValueError):
+        main_2.ecb_decrypt(batch_numpy._ecb_encrypt_padded(padded, key)[0].tobytes(), key)
+    with pytest.raises(ValueError):
+        batch_numpy.ecb_decrypt_batch(batch_numpy._ecb_encrypt_padded(padded, key), key)
+
+
+def test_numpy_batch_normalizes_array_ivs():
+    np = pytest.importorskip("numpy")
+    import batch_numpy
+    key = os.urandom(16)
+    messages = [os.urandom(20) for _ in range(3)]
+    ivs = [os.urandom(12) for _ in messages]
+    expected = [main_2.cbc_encrypt(m, key, v) for m, v in zip(messages, ivs)]
+    array = np.frombuffer(b"".join(ivs), dtype=np.uint8).reshape(3, 12)
+    assert [row.tobytes() for row in batch_numpy.cbc_encrypt_batch(messages, key, array)] == expected
+    assert [row.tobytes() for row in batch_numpy.cbc_encrypt_batch(messages, key, array[0])] == \
+        [main_2.cbc_encrypt(m, key, ivs[0]) for m in messages]
+    with pytest.raises(ValueError):
+        batch_numpy.cbc_encrypt_batch(messages, key, array[:2])
+    assert set(batch_numpy.benchmark(count=5, size=16)) == {"ecb", "cbc"}
@@ -0,0 +1,128 @@
+"""Асинхронный сервис: сборка запросов в пачки, ошибки отдельных запросов, строковый протокол"""
+import asyncio
+import base64
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import main_2
+import service
+
+
+KEY = b"secretkey1234567"
+IV = os.urandom(12)
+
+
+def _service(max_batch=service.MAX_BATCH, max_delay=0.05):
+    return service.CipherService(ThreadPoolExecutor(2), max_batch, max_delay)
+
+
+def test_concurrent_requests_share_a_batch():
+    messages = [os.urandom(n) for n in range(10)]
+
+    async def run():
+        cipher_service = _service()
+        try:
+            results = await asyncio.gather(*(cipher_service.encrypt("cbc", KEY, m, IV + bytes(4)) for m in messages))
+        finally:
+            await cipher_service.aclose()
+        return cipher_service, results
+
+    cipher_service, results = asyncio.run(run())
+    assert results == [main_2.cbc_encrypt(m, KEY, IV + bytes(4)) for m in messages]
+    stats = cipher_service.stats()
+    assert stats["requests"] == 10 and stats["batches"] == 1
+
+
+def test_max_batch_splits_requests():
+    async def run():
+        cipher_service = _service(max_batch=4)
+        try:
+            await asyncio.gather(*(cipher_service.encrypt("ecb", KEY, b"x" * n) for n in range(10)))
+        finally:
+            await cipher_service.aclose()
+        return cipher_service.batches
+
+    assert asyncio.run(run()) == 3
+
+
+def test_bad_tag_fails_only_its_request():
+    ciphertext, tag = main_2.gcm_encrypt(b"message", KEY, IV, b"")
+
+    async def run():
+        cipher_service = _service()
+        try:
+            return await asyncio.gather(cipher_service.decrypt("gcm", KEY, ciphertext, IV, b"", tag),
+                                        cipher_service.decrypt("gcm", KEY, ciphertext, IV, b"", bytes(16)),
+                                        return_exceptions=True)
+        finally:
+            await cipher_service.aclose()
+
+    good, bad = asyncio.run(run())
+    assert good == b"message"
+    assert isinstance(bad, ValueError)
+
+
+def test_rejects_unknown_mode_and_key_size():
+    async def run():
+        cipher_service = _service()
+        try:
+            with pytest.raises(ValueError):
+                await cipher_service.encrypt("ctr", KEY, b"data")
+            with pytest.raises(ValueError):
+                await cipher_service.encrypt("ecb", b"short", b"data")
+        finally:
+            await cipher_service.aclose()
+
+    asyncio.run(run())
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def test_line_protocol(tmp_path):
+    ciphertext, tag = main_2.gcm_encrypt(b"message", KEY, IV, b"aad")
+    common = {"mode": "gcm", "key": _b64(KEY), "iv": _b64(IV), "aad": _b64(b"aad")}
+    lines = [
+        json.dumps({"id": 1, "op": "encrypt", "data": _b64(b"message"), **common}),
+        json.dumps({"id": 2, "op": "decrypt", "data": _b64(ciphertext), "tag": _b64(tag), **common}),
+        json.dumps({"id": 3, "op": "decrypt", "data": _b64(ciphertext), "tag": _b64(bytes(16)), **common}),
+        json.dumps({"id": 4, "op": "sign", **common}),
+        json.dumps({"id": 5, "op": "encrypt", "data": 5, **common}),
+        "[1, 2]",
+        "5",
+        "{not json",
+    ]
+
+    async def run():
+        cipher_service = _service(max_delay=0.001)
+        server = await service.start_server(cipher_service, path=str(tmp_path / "socket"))
+        try:
+            reader, writer = await asyncio.open_unix_connection(str(tmp_path / "socket"))
+            writer.write("".join(line + "\n" for line in lines).encode('utf-8'))
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in lines]
+            writer.write(b'{"op": "stats"}\n')
+            stats = json.loads(await reader.readline())
+            writer.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+            await cipher_service.aclose()
+        return responses, stats
+
+    responses, stats = asyncio.run(run())
+    by_id = {r["id"]: r for r in responses if r["id"] is not None}
+    assert by_id[1] == {"id": 1, "ok": True, "data": _b64(ciphertext), "tag": _b64(tag)}
+    assert by_id[2] == {"id": 2, "ok": True, "data": _b64(b"message")}
+    for request_id in (3, 4, 5):
+        assert not by_id[request_id]["ok"] and by_id[request_id]["error"]
+
+    malformed = [r for r in responses if r["id"] is None]
+    assert len(malformed) == 3
+    assert all(not r["ok"] for r in malformed)
+    assert sum("JSON" in r["error"] for r in malformed) == 3
+    assert stats["ok"] and stats["stats"]["requests"] == 3
@@ -0,0 +1,89 @@
+import argparse
+import os
+import time
+
+from main import generate_keys, encrypt_bytes, private_op
+
+KEY_SIZES = "1024,2048"
+MIN_TIME = 0.2  # секунд на один замер
+
+
+def measure(func, arg, min_time=MIN_TIME):
+    """Лучшее время одного вызова и число повторов"""
+    best = float("inf")
+    runs = 0
+    total = 0.0
+    while total < min_time or runs == 0:
+        start = time.perf_counter()
+        func(arg)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        runs += 1
+    return best, runs
+
+
+def bench_decrypt(key_sizes, count=16, min_time=MIN_TIME):
+    """Расшифрований в секунду: полное pow(c, d, n) против КТО"""
+    results = []
+    for key_size in key_sizes:
+        public_key, private_key = generate_keys(key_size)
+        blocks = encrypt_bytes(os.urandom(count * key_size // 8), public_key)
+        full = private_op(tuple(private_key))
+        crt = private_op(private_key)
+        assert [full(c) for c in blocks] == [crt(c) for c in blocks]
+
+        full_time, _ = measure(lambda cs: [full(c) for c in cs], blocks, min_time)
+        crt_time, _ = measure(lambda cs: [crt(c) for c in cs], blocks, min_time)
+        results.append({"key_size": key_size, "full": len(blocks) / full_time,
+                        "crt": len(blocks) / crt_time, "speedup": full_time / crt_time})
+    return results
+
+
+def bench_keygen(key_sizes, workers=None, repeat=3):
+    """Среднее время генерации ключа: последовательно и в пуле процессов"""
+    workers = workers or os.cpu_count()
+    results = []
+    for key_size in key_sizes:
+        times = {}
+        for label, w in (("sequential", 1), ("parallel", workers)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                generate_keys(key_size, w)
+            times[label] = (time.perf_counter() - start) / repeat
+        results.append({"key_size": key_size, "workers": workers, **times})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности RSA")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    decrypt = commands.add_parser("decrypt", help="расшифрование: pow(c, d, n) против КТО")
+    decrypt.add_argument("--key-sizes", default=KEY_SIZES, help="размеры ключей через запятую")
+    decrypt.add_argument("--count", type=int, default=16, help="сколько блоков расшифровывать за замер")
+    decrypt.add_argument("--min-time", type=float, default=MIN_TIME)
+
+    keygen = commands.add_parser("keygen", help="генерация ключей: одно ядро против пула процессов")
+    keygen.add_argument("--key-sizes", default="2048,4096", help="размеры ключей через запятую")
+    keygen.add_argument("--workers", type=int, help="процессов в пуле (по умолчанию по числу ядер)")
+    keygen.add_argument("--repeat", type=int, default=3, help="ключей на замер (время сильно разбросано)")
+    args = parser.parse_args()
+
+    key_sizes = [int(s) for s in args.key_sizes.split(",")]
+    if args.command == "decrypt":
+        print("| {:>6} | {:>14} | {:>14} | {:>9} |".format("Бит", "pow, блок/с", "КТО, блок/с", "Ускорение"))
+        for r in bench_decrypt(key_sizes, args.count, args.min_time):
+            print("| {:>6} | {:>14.1f} | {:>14.1f} | {:>8.2f}x |".format(
+                r["key_size"], r["full"], r["crt"], r["speedup"]))
+
+    elif args.command == "keygen":
+        results = bench_keygen(key_sizes, args.workers, args.repeat)
+        print("| {:>6} | {:>9} | {:>12} | {:>12} |".format("Бит", "Процессов", "1 ядро, с", "Пул, с"))
+        for r in results:
+            print("| {:>6} | {:>9} | {:>12.2f} | {:>12.2f} |".format(
+                r["key_size"], r["workers"], r["sequential"], r["parallel"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,38 @@
 from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_OAEP
+from Crypto.Cipher import PKCS1_OAEP, AES
+from Crypto.Random import get_random_bytes
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import os
+import struct
+import time
+
+# Гибридный формат: RSA-OAEP шифрует только случайный сеансовый ключ, файл идёт порциями через AES-GCM.
+# Заголовок: сигнатура, длина обёрнутого ключа, размер порции, префикс nonce; затем обёрнутый ключ
+# и порции (шифртекст + тег 16 байт). Nonce порции - префикс и номер порции, последняя порция
+# короче CHUNK_SIZE (при необходимости пустая) и помечена в AAD, так что обрезку файла видно
+HYBRID_MAGIC = b"HYB1"
+HYBRID_HEADER = struct.Struct(">4sHI8s")
+SESSION_KEY_SIZE = 32
+TAG_SIZE = 16
+CHUNK_SIZE = 1 << 20
+MAX_CHUNK_SIZE = 64 << 20  # размер порции берётся из заголовка до проверки тегов, поэтому ограничен
+
+_key_cache = {}  # абсолютный путь -> ((mtime_ns, размер), разобранный ключ)
+
+
+def load_key(path):
+  """ RSA.import_key с кэшем: PEM разбирается заново, только если у файла сменились mtime или размер """
+  path = os.path.abspath(path)
+  stat = os.stat(path)
+  stamp = (stat.st_mtime_ns, stat.st_size)
+  cached = _key_cache.get(path)
+  if cached is not None and cached[0] == stamp:
+    return cached[1]
+  with open(path, "rb") as key_file:
+    key = RSA.import_key(key_file.read())
+  _key_cache[path] = (stamp, key)
+  return key
 
 
 def generate_keys(key_size=2048):
@@ -21,8 +53,7 @@ def encrypt_file(file_path, public_key_path="public.pem"):
   with open(file_path, "rb") as file:
     data = file.read()
 
-  with open(public_key_path, "rb") as pub_file:
-    public_key = RSA.import_key(pub_file.read())
+  public_key = load_key(public_key_path)
 
   cipher = PKCS1_OAEP.new(public_key)
   encrypted_data = cipher.encrypt(data)
@@ -33,12 +64,168 @@ def encrypt_file(file_path, public_key_path="public.pem"):
   print(f"Файл {file_path} зашифрован!")
 
 
+def _read_full(file, size):
+  """ Читает ровно size байт, меньше - только в конце файла """
+  data = file.read(size)
+  while len(data) < size:
+    more = file.read(size - len(data))
+    if not more:
+      break
+    data += more
+  return data
+
+
+def _chunk_cipher(session_key, prefix, index, final):
+  cipher = AES.new(session_key, AES.MODE_GCM, nonce=prefix + struct.pack(">I", index))
+  cipher.update(b"\x01" if final else b"\x00")
+  return cipher
+
+
+def encrypt_file_hybrid(file_path, public_key_path="public.pem", chunk_size=CHUNK_SIZE, verbose=True):
+  """ Гибридное шифрование: память постоянна (одна порция), RSA тратится только на сеансовый ключ """
+  if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+    raise ValueError(f"Размер порции должен быть от 1 до {MAX_CHUNK_SIZE} байт")
+  public_key = load_key(public_key_path)
+
+  session_key = get_random_bytes(SESSION_KEY_SIZE)
+  prefix = get_random_bytes(8)
+  wrapped_key = PKCS1_OAEP.new(public_key).encrypt(session_key)
+  encrypted_path = f"{file_path}.enc"
+
+  with open(file_path, "rb") as file, open(encrypted_path, "wb") as enc_file:
+    enc_file.write(HYBRID_HEADER.pack(HYBRID_MAGIC, len(wrapped_key), chunk_size, prefix))
+    enc_file.write(wrapped_key)
+    index = 0
+    while True:
+      chunk = _read_full(file, chunk_size)
+      final = len(chunk) < chunk_size
+      ciphertext, tag = _chunk_cipher(session_key, prefix, index, final).encrypt_and_digest(chunk)
+      enc_file.write(ciphertext)
+      enc_file.write(tag)
+      if final:
+        break
+      index += 1
+
+  if verbose:
+    print(f"Файл {file_path} зашифрован в {encrypted_path}!")
+  return encrypted_path
+
+
+def decrypt_file_hybrid(encrypted_path, private_key_path="private.pem", verbose=True):
+  """ Расшифрование гибридного файла; при ошибке проверки тега выходной файл удаляется """
+  private_key = load_key(private_key_path)
+
+  original_path = encrypted_path[:-len(".enc")] + ".dec" if encrypted_path.endswith(".enc") \
+    else encrypted_path + ".dec"
+  with open(encrypted_path, "rb") as enc_file:
+    header = _read_full(enc_file, HYBRID_HEADER.size)
+    if len(header) < HYBRID_HEADER.size:
+      raise ValueError(f"{encrypted_path}: файл обрезан")
+    magic, key_length, chunk_size, prefix = HYBRID_HEADER.unpack(header)
+    if magic != HYBRID_MAGIC:
+      raise ValueError(f"{encrypted_path}: не гибридный файл")
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+      raise ValueError(f"{encrypted_path}: недопустимый размер порции {chunk_size}")
+    session_key = PKCS1_OAEP.new(private_key).decrypt(_read_full(enc_file, key_length))
+
+    try:
+      with open(original_path, "wb") as dec_file:
+        index = 0
+        while True:
+          chunk = _read_full(enc_file, chunk_size + TAG_SIZE)
+          if len(chunk) < TAG_SIZE:
+            raise ValueError(f"{encrypted_path}: файл обрезан")
+          final = len(chunk) < chunk_size + TAG_SIZE
+          cipher = _chunk_cipher(session_key, prefix, index, final)
+          dec_file.write(cipher.decrypt_and_verify(chunk[:-TAG_SIZE], chunk[-TAG_SIZE:]))
+          if final:
+            break
+          index += 1
+        if enc_file.read(1):
+          raise ValueError(f"{encrypted_path}: данные после последней порции")
+    except ValueError:
+      os.remove(original_path)
+      raise
+
+  if verbose:
+    print(f"Файл {encrypted_path} расшифрован в {original_path}!")
+  return original_path
+
+
+def collect_files(paths, suffix="", skip=()):
+  """ Файлы из списка путей; каталоги обходятся рекурсивно, из них берутся файлы с окончанием suffix,
+  кроме файлов с окончаниями из skip """
+  files = []
+  for path in paths:
+    if os.path.isdir(path):
+      for root, _, names in os.walk(path):
+        files.extend(os.path.join(root, name) for name in sorted(names)
+                     if name.endswith(suffix) and not name.endswith(tuple(skip)))
+    else:
+      files.append(path)
+  return files
+
+
+def process_files(action, paths, key_path, workers=None):
+  """ Гибридное шифрование ("encrypt") или расшифрование ("decrypt") списка файлов и каталогов в пуле потоков.
+  Ключ разбирается один раз и берётся из кэша всеми потоками; AES-GCM и RSA из pycryptodome выполняются
+  в C, так что потоки работают параллельно. Возвращает (результаты по файлам, сводка) """
+  if action == "encrypt":
+    files = collect_files(paths, skip=(".enc", ".dec"))  # результаты прошлых запусков не шифруем повторно
+  else:
+    files = collect_files(paths, ".enc")
+  load_key(key_path)
+
+  def run(path):
+    size = 0
+    try:
+      size = os.path.getsize(path)
+      if action == "encrypt":
+        output = encrypt_file_hybrid(path, key_path, verbose=False)
+      else:
+        output = decrypt_file_hybrid(path, key_path, verbose=False)
+      return {"path": path, "output": output, "bytes": size, "error": None}
+    except (ValueError, OSError) as error:
+      return {"path": path, "output": None, "bytes": size, "error": str(error)}
+
+  start = time.perf_counter()
+  with ThreadPoolExecutor(workers) as executor:
+    results = list(executor.map(run, files))
+  seconds = time.perf_counter() - start
+
+  done = [r for r in results if r["error"] is None]
+  total = sum(r["bytes"] for r in done)
+  summary = {
+    "files": len(done), "failed": len(results) - len(done), "bytes": total, "seconds": seconds,
+    "mb_s": total / seconds / 2 ** 20 if seconds else 0.0, "files_s": len(done) / seconds if seconds else 0.0,
+  }
+  return results, summary
+
+
+def batch_main():
+  parser = argparse.ArgumentParser(description="Гибридное шифрование файлов и каталогов ключом RSA")
+  parser.add_argument("action", choices=["encrypt", "decrypt"])
+  parser.add_argument("paths", nargs="+", help="файлы и каталоги (при расшифровании из каталогов берутся *.enc)")
+  parser.add_argument("--key", help="PEM-ключ (по умолчанию public.pem / private.pem)")
+  parser.add_argument("--workers", type=int, help="потоков в пуле")
+  args = parser.parse_args()
+
+  key_path = args.key or ("public.pem" if args.action == "encrypt" else "private.pem")
+  results, summary = process_files(args.action, args.paths, key_path, args.workers)
+  for r in results:
+    if r["error"] is not None:
+      print(f"Ошибка: {r['path']}: {r['error']}")
+  print(f"Файлов: {summary['files']}, ошибок: {summary['failed']}, {summary['bytes']} байт за "
+        f"{summary['seconds']:.2f} с - {summary['mb_s']:.1f} МБ/с, {summary['files_s']:.1f} файлов/с")
+  if summary["failed"]:
+    raise SystemExit(1)
+
+
 def decrypt_file(encrypted_path, private_key_path="private.pem"):
   with open(encrypted_path, "rb") as enc_file:
     encrypted_data = enc_file.read()
 
-  with open(private_key_path, "rb") as priv_file:
-    private_key = RSA.import_key(priv_file.read())
+  private_key = load_key(private_key_path)
 
   cipher = PKCS1_OAEP.new(private_key)
   decrypted_data = cipher.decrypt(encrypted_data)
@@ -74,3 +261,6 @@ def decrypt_file(encrypted_path, private_key_path="private.pem"):
 
 
 #main()
+
+if __name__ == "__main__":
+  batch_main()
@@ -1,8 +1,63 @@
+import os
+import json
+import mmap
+import multiprocessing
+import struct
 import random
 import base64
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
+LENGTH_SIZE = 8  # байт под длину сообщения в блочном режиме
+PACKED_MARK = "P"  # метка файла, зашифрованного блоками
 
-def is_prime(n, k=5):
+
+def _small_primes(limit):
+    """ Нечётные простые меньше limit (решето Эратосфена) """
+    sieve = bytearray([1]) * limit
+    sieve[:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(3, limit) if sieve[i]]
+
+
+SMALL_PRIMES = _small_primes(2000)
+SIEVE_WINDOW = 4096  # нечётных кандидатов в одном окне решета
+TASK_WINDOWS = 4  # окон решета на одну задачу пула
+KEY_POOL_DIR = "key_pool"  # каталог пула заранее сгенерированных ключей
+KEY_POOL_STALE_AGE = 600  # секунд: .tmp и забранные файлы старше этого остались от упавших процессов
+
+# Двоичный контейнер: сигнатура, версия, режим упаковки, размер ключа в битах,
+# ширина элемента в байтах, число элементов; затем элементы фиксированной ширины big-endian
+CONTAINER_MAGIC = b"RSAC"
+CONTAINER_VERSION = 1
+CONTAINER_HEADER = struct.Struct(">4sBBHHQ")
+MODE_CHARS = 0  # посимвольно по base64
+MODE_PACKED = 1  # блочная упаковка encrypt_bytes
+
+
+class PrimeStats:
+    """ Статистика поиска простых: просеяно чисел, проверено Миллером-Рабином, потрачено раундов """
+
+    def __init__(self):
+        self.sieved = 0
+        self.candidates = 0
+        self.rounds = 0
+
+    def add(self, other):
+        self.sieved += other.sieved
+        self.candidates += other.candidates
+        self.rounds += other.rounds
+
+    def __str__(self):
+        return (f"просеяно {self.sieved}, проверено Миллером-Рабином {self.candidates}, "
+                f"раундов {self.rounds}")
+
+
+def is_prime(n, k=5, stats=None, rng=random):
     """ Тест Миллера-Рабина для проверки простоты числа """
     if n <= 1:
         return False
@@ -27,21 +82,124 @@ def is_prime(n, k=5):
         return False
 
     for _ in range(k):
-        a = random.randint(2, n - 2)
+        if stats is not None:
+            stats.rounds += 1
+        a = rng.randint(2, n - 2)
         if not check(a, d, n, r):
             return False
     return True
 
 
-def generate_prime(bits):
+def _sieve_window(start):
+    """ Отметки составных среди start, start + 2, ..., start + 2 * (SIEVE_WINDOW - 1) по таблице малых простых """
+    composite = bytearray(SIEVE_WINDOW)
+    ones = b"\x01" * SIEVE_WINDOW
+    for p in SMALL_PRIMES:
+        # первое i, при котором p делит start + 2i: i = -start / 2 (mod p)
+        i = -start * ((p + 1) // 2) % p
+        composite[i::p] = ones[:len(range(i, SIEVE_WINDOW, p))]
+    return composite
+
+
+def _search_prime(bits, stats, rng, max_windows=None, stop=None):
+    """ От одной случайной точки идём окнами нечётных чисел: решето по малым простым отбрасывает
+    кандидатов с маленькими делителями, Миллер-Рабин запускается только для оставшихся.
+    Возвращает None, если за max_windows окон простое не нашлось или перед очередным окном выставлен stop """
+    start = rng.getrandbits(bits)
+    start |= (1 << bits - 1) | 1  # Устанавливаем первый и последний биты (делает число нечётным и достаточной длины)
+    windows = 0
+    while start.bit_length() == bits and (max_windows is None or windows < max_windows):
+        if stop is not None and stop.is_set():
+            return None
+        composite = _sieve_window(start)
+        for i in range(SIEVE_WINDOW):
+            num = start + 2 * i
+            if num.bit_length() != bits:
+                break
+            stats.sieved += 1
+            if composite[i]:
+                continue
+            stats.candidates += 1
+            if is_prime(num, stats=stats, rng=rng):
+                return num
+        start += 2 * SIEVE_WINDOW
+        windows += 1
+    return None
+
+
+def generate_prime(bits, stats=None, rng=random):
     """ Генерация случайного простого числа заданной битности """
+    if stats is None:
+        stats = PrimeStats()
+    if bits <= SMALL_PRIMES[-1].bit_length() + 1:
+        while True:
+            num = rng.getrandbits(bits)
+            num |= (1 << bits - 1) | 1  # Устанавливаем первый и последний биты (делает число нечётным и достаточной длины)
+            stats.sieved += 1
+            stats.candidates += 1
+            if is_prime(num, stats=stats, rng=rng):
+                return num
+
     while True:
-        num = random.getrandbits(bits)
-        num |= (1 << bits - 1) | 1  # Устанавливаем первый и последний биты (делает число нечётным и достаточной длины)
-        if is_prime(num):
+        num = _search_prime(bits, stats, rng)
+        if num is not None:
             return num
 
 
+_prime_stop = None  # в процессе пула: событие "простых набралось достаточно"
+
+
+def _init_prime_worker(stop):
+    global _prime_stop
+    _prime_stop = stop
+
+
+def _prime_task(bits, seed):
+    """ Задача пула: поиск простого из своей случайной точки на TASK_WINDOWS окон.
+    У каждой задачи собственный генератор со своим зерном, так что потоки случайных чисел независимы """
+    stats = PrimeStats()
+    return _search_prime(bits, stats, random.Random(seed), TASK_WINDOWS, _prime_stop), stats
+
+
+def generate_primes_parallel(bits, count=2, workers=None, stats=None):
+    """ count различных простых, которые ищут все процессы пула одновременно.
+    Как только простых набралось достаточно, невыполненные задачи отменяются, а запущенные
+    видят общее событие и бросают поиск перед следующим окном; функция дожидается
+    завершения процессов пула, так что после возврата они не занимают ядра """
+    if stats is None:
+        stats = PrimeStats()
+    if bits <= SMALL_PRIMES[-1].bit_length() + 1:
+        primes = []
+        while len(primes) < count:
+            num = generate_prime(bits, stats)
+            if num not in primes:
+                primes.append(num)
+        return primes
+
+    workers = workers or os.cpu_count()
+    stop = multiprocessing.Event()
+    executor = ProcessPoolExecutor(workers, initializer=_init_prime_worker, initargs=(stop,))
+
+    def submit():
+        return executor.submit(_prime_task, bits, int.from_bytes(os.urandom(16), "big"))
+
+    primes = []
+    try:
+        pending = {submit() for _ in range(workers)}
+        while len(primes) < count:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                num, task_stats = future.result()
+                stats.add(task_stats)
+                if num is not None and num not in primes:
+                    primes.append(num)
+            pending |= {submit() for _ in done}
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+    return primes[:count]
+
+
 def gcd(a, b):
     """ Нахождение наибольшего общего делителя (НОД) """
     while b:
@@ -59,13 +217,56 @@ def mod_inverse(e, phi):
         return a % phi
 
 
-def generate_keys(key_size):
-    """ Генерация открытого и закрытого ключей """
-    print(f"Генерация {key_size}-битного ключа...")
+class PrivateKey:
+    """ Закрытый ключ с компонентами для китайской теоремы об остатках (КТО):
+    dp = d mod (p - 1), dq = d mod (q - 1), qinv = q^-1 mod p.
+    Распаковывается как прежний кортеж: d, n = private_key """
+
+    def __init__(self, d, n, p, q):
+        self.d = d
+        self.n = n
+        self.p = p
+        self.q = q
+        self.dp = d % (p - 1)
+        self.dq = d % (q - 1)
+        self.qinv = mod_inverse(q, p)
+
+    def __iter__(self):
+        return iter((self.d, self.n))
+
+    def __repr__(self):
+        return f"PrivateKey(d={self.d}, n={self.n})"
+
+    def decrypt_int(self, c):
+        """ c^d mod n через два возведения в степень половинного размера и сборку по Гарнеру """
+        m1 = pow(c, self.dp, self.p)
+        m2 = pow(c, self.dq, self.q)
+        h = self.qinv * (m1 - m2) % self.p
+        return m2 + h * self.q
+
+
+def private_op(private_key):
+    """ Функция c -> c^d mod n: через КТО для PrivateKey, обычным pow для кортежа (d, n) """
+    if isinstance(private_key, PrivateKey):
+        return private_key.decrypt_int
+    d, n = private_key
+    return lambda c: pow(c, d, n)
+
+
+def generate_keys(key_size, workers=1, verbose=True):
+    """ Генерация открытого и закрытого ключей; workers > 1 (или None - по числу ядер) ищет p и q в пуле процессов """
+    if verbose:
+        print(f"Генерация {key_size}-битного ключа...")
 
     bit_length = key_size // 2
-    p = generate_prime(bit_length)
-    q = generate_prime(bit_length)
+    stats = PrimeStats()
+    if workers == 1:
+        p = generate_prime(bit_length, stats)
+        q = generate_prime(bit_length, stats)
+    else:
+        p, q = generate_primes_parallel(bit_length, 2, workers, stats)
+    if verbose:
+        print(f"Поиск простых: {stats}")
 
     n = p * q
     phi = (p - 1) * (q - 1)
@@ -77,11 +278,160 @@ def generate_keys(key_size):
     d = mod_inverse(e, phi)
 
     public_key = (e, n)
-    private_key = (d, n)
+    private_key = PrivateKey(d, n, p, q)
 
     return public_key, private_key
 
 
+class KeyPool:
+    """ Пул заранее сгенерированных пар ключей по размерам, хранящийся на диске (по файлу JSON на пару).
+    Фоновый поток заполняет пул до size пар каждого размера и дозаполняет его, когда пар становится
+    меньше low_water. get() берёт файл из очереди за O(1) и забирает его переименованием, чтобы ключ
+    не выдавался дважды, даже если каталог пула общий у нескольких процессов.
+    Файлы содержат закрытые ключи, поэтому каталоги создаются с правами 0o700, а файлы - 0o600.
+    Если фоновый поток упал (например, диск заполнен), get() не ждёт его, а сообщает об ошибке """
+
+    def __init__(self, directory=KEY_POOL_DIR, key_sizes=(1024,), size=4, low_water=2, workers=1):
+        self.directory = directory
+        self.size = size
+        self.low_water = low_water
+        self.workers = workers
+        self._keys = {}  # размер -> очередь путей к файлам ключей
+        self._filling = set()  # размеры, которые фоновый поток дозаполняет до size
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._error = None  # исключение, на котором остановился фоновый поток
+        for key_size in key_sizes:
+            self._load(key_size)
+
+    def _path(self, key_size):
+        return os.path.join(self.directory, str(key_size))
+
+    def _load(self, key_size):
+        queue = self._keys[key_size] = deque()
+        path = self._path(key_size)
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                file_path = os.path.join(path, name)
+                if name.endswith(".json"):
+                    queue.append(file_path)
+                elif ".json." in name:  # .json.tmp или .json.<pid>
+                    self._remove_stale(file_path)
+        if len(queue) < self.size:
+            self._filling.add(key_size)
+        return queue
+
+    def _store(self, key_size, keys):
+        (e, n), private_key = keys
+        path = self._path(key_size)
+        os.makedirs(self.directory, 0o700, exist_ok=True)
+        os.makedirs(path, 0o700, exist_ok=True)
+        file_path = os.path.join(path, f"{os.urandom(8).hex()}.json")
+        fd = os.open(file_path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as file:
+            json.dump({"e": e, "n": n, "d": private_key.d, "p": private_key.p, "q": private_key.q}, file)
+        os.replace(file_path + ".tmp", file_path)  # в пуле не бывает недописанных файлов
+        return file_path
+
+    @staticmethod
+    def _remove_stale(file_path):
+        """ Удаляет недописанный (.tmp) или забранный (.json.<pid>) файл, брошенный упавшим процессом.
+        Живой процесс держит такой файл доли секунды, поэтому свежие файлы не трогаются """
+        try:
+            if time.time() - os.path.getmtime(file_path) > KEY_POOL_STALE_AGE:
+                os.remove(file_path)
+        except FileNotFoundError:
+            pass  # его успел убрать другой процесс
+
+    @staticmethod
+    def _claim(file_path):
+        """ Забирает ключ атомарным переименованием в имя этого процесса; None, если его уже забрали """
+        claimed = f"{file_path}.{os.getpid()}"
+        try:
+            os.rename(file_path, claimed)
+        except FileNotFoundError:
+            return None
+        try:
+            with open(claimed) as file:
+                data = json.load(file)
+        finally:
+            os.remove(claimed)
+        return (data["e"], data["n"]), PrivateKey(data["d"], data["n"], data["p"], data["q"])
+
+    def start(self):
+        """ Запускает фоновое заполнение; не блокирует """
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def count(self, key_size):
+        with self._cond:
+            return len(self._keys.get(key_size, ()))
+
+    def get(self, key_size):
+        """ Пара (public_key, private_key) из пула; если пул пуст - ждём фоновый поток
+        (или генерируем сразу, если он не запущен) """
+        while True:
+            with self._cond:
+                queue = self._keys.get(key_size)
+                if queue is None:
+                    queue = self._load(key_size)
+                while not queue and self._thread is not None and not self._stopped and self._error is None:
+                    self._filling.add(key_size)
+                    self._cond.notify_all()
+                    self._cond.wait()
+                if not queue and self._error is not None:
+                    raise RuntimeError("Фоновое заполнение пула ключей остановилось с ошибкой") from self._error
+                file_path = queue.popleft() if queue else None
+                if len(queue) < self.low_water:
+                    self._filling.add(key_size)
+                    self._cond.notify_all()
+            if file_path is None:
+                return generate_keys(key_size, self.workers, verbose=False)
+            keys = self._claim(file_path)
+            if keys is not None:
+                return keys
+            # файл забрал другой процесс с тем же каталогом - берём следующий
+
+    def _next_size(self):
+        """ Размер для дозаполнения: из запрошенных - тот, где пар меньше всего """
+        for key_size in list(self._filling):
+            if len(self._keys[key_size]) >= self.size:
+                self._filling.discard(key_size)
+        if not self._filling:
+            return None
+        return min(self._filling, key=lambda k: len(self._keys[k]))
+
+    def _fill(self):
+        try:
+            self._fill_loop()
+        except Exception as exc:
+            with self._cond:
+                self._error = exc
+                self._cond.notify_all()  # ждущие get() не должны висеть
+
+    def _fill_loop(self):
+        while True:
+            with self._cond:
+                key_size = self._next_size()
+                while key_size is None and not self._stopped:
+                    self._cond.wait()
+                    key_size = self._next_size()
+                if self._stopped:
+                    return
+            keys = generate_keys(key_size, self.workers, verbose=False)
+            file_path = self._store(key_size, keys)
+            with self._cond:
+                self._keys[key_size].append(file_path)
+                self._cond.notify_all()
+
+
 def encrypt(message, public_key):
     """ Шифрование сообщения с помощью открытого ключа """
     e, n = public_key
@@ -91,36 +441,125 @@ def encrypt(message, public_key):
 
 def decrypt(cipher_text, private_key):
     """ Дешифрование сообщения с помощью закрытого ключа """
-    d, n = private_key
-    message = ''.join(chr(pow(char, d, n)) for char in cipher_text)
+    power = private_op(private_key)
+    message = ''.join(chr(power(char)) for char in cipher_text)
     return message
 
 
-def encrypt_file(file_path, public_key):
+def block_size(n):
+    """ Сколько байт гарантированно помещается в число меньше n """
+    return (n.bit_length() - 1) // 8
+
+
+def encrypt_bytes(data, public_key):
+    """ Шифрование байтов блоками: в каждое число RSA упаковывается столько байт, сколько помещается ниже n.
+    Перед данными записывается их длина (8 байт), чтобы при расшифровании отрезать дополнение последнего блока """
+    e, n = public_key
+    size = block_size(n)
+    framed = len(data).to_bytes(LENGTH_SIZE, "big") + data
+    framed += bytes(-len(framed) % size)
+    return [pow(int.from_bytes(framed[i:i + size], "big"), e, n) for i in range(0, len(framed), size)]
+
+
+def decrypt_bytes(cipher_blocks, private_key):
+    """ Дешифрование блоков, зашифрованных encrypt_bytes """
+    d, n = private_key
+    size = block_size(n)
+    power = private_op(private_key)
+    framed = b"".join(power(c).to_bytes(size, "big") for c in cipher_blocks)
+    length = int.from_bytes(framed[:LENGTH_SIZE], "big")
+    return framed[LENGTH_SIZE:LENGTH_SIZE + length]
+
+
+def write_container(path, blocks, n, mode):
+    """ Записывает зашифрованные числа в двоичный контейнер """
+    width = (n.bit_length() + 7) // 8
+    with open(path, "wb") as file:
+        file.write(CONTAINER_HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, mode, n.bit_length(), width, len(blocks)))
+        file.write(b"".join(c.to_bytes(width, "big") for c in blocks))
+
+
+def read_container(path, n=None):
+    """ Заголовок (режим, размер ключа в битах, число элементов) и итератор чисел контейнера.
+    Файл отображается в память, числа читаются по смещениям без разбора текста.
+    Если передан модуль n, контейнер другого размера ключа отвергается: иначе чужой ключ молча дал бы мусор """
+    with open(path, "rb") as file:
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mm) < CONTAINER_HEADER.size:
+        mm.close()
+        raise ValueError(f"{path}: контейнер обрезан")
+    magic, version, mode, key_bits, width, count = CONTAINER_HEADER.unpack_from(mm)
+    if magic != CONTAINER_MAGIC or version != CONTAINER_VERSION:
+        mm.close()
+        raise ValueError(f"{path}: не контейнер RSA или неизвестная версия")
+    if len(mm) < CONTAINER_HEADER.size + width * count:
+        mm.close()
+        raise ValueError(f"{path}: контейнер обрезан")
+    if n is not None and key_bits != n.bit_length():
+        mm.close()
+        raise ValueError(f"{path}: зашифрован ключом {key_bits} бит, а ключ для расшифрования - {n.bit_length()} бит")
+
+    def blocks():
+        try:
+            for offset in range(CONTAINER_HEADER.size, CONTAINER_HEADER.size + width * count, width):
+                yield int.from_bytes(mm[offset:offset + width], "big")
+        finally:
+            mm.close()
+
+    return (mode, key_bits, count), blocks()
+
+
+def is_container(path):
+    with open(path, "rb") as file:
+        return file.read(len(CONTAINER_MAGIC)) == CONTAINER_MAGIC
+
+
+def encrypt_file(file_path, public_key, packed=True, binary=True):
+    """ packed=True - блочная упаковка, иначе посимвольно по base64.
+    binary=True - двоичный контейнер, иначе числа текстом через пробел (упакованный файл начинается с метки P) """
     with open(file_path, "rb") as file:
         data = file.read()
+    if packed:
+        encrypted_data = encrypt_bytes(data, public_key)
+    else:
         data_str = base64.b64encode(data).decode()
         encrypted_data = encrypt(data_str, public_key)
 
-    with open(f"e_{file_path}", "w") as enc_file:
-        enc_file.write(" ".join(map(str, encrypted_data)))
+    if binary:
+        write_container(f"e_{file_path}", encrypted_data, public_key[1], MODE_PACKED if packed else MODE_CHARS)
+    else:
+        if packed:
+            encrypted_data = [PACKED_MARK] + encrypted_data
+        with open(f"e_{file_path}", "w") as enc_file:
+            enc_file.write(" ".join(map(str, encrypted_data)))
 
     print(f"Файл e_{file_path} зашифрован!")
 
 
 def decrypt_file(file_path, private_key):
-    with open(f"{file_path}", "r") as file:
-        encrypted_data = list(map(int, file.read().split()))
-
-    decrypted_str = decrypt(encrypted_data, private_key)  # Дешифруем строку
-    original_data = base64.b64decode(decrypted_str).decode()  # Декодируем из base64 в байты
+    if is_container(file_path):
+        _, n = private_key
+        (mode, _, _), blocks = read_container(file_path, n)
+        packed = mode == MODE_PACKED
+    else:
+        with open(f"{file_path}", "r") as file:
+            tokens = file.read().split()
+        packed = bool(tokens) and tokens[0] == PACKED_MARK
+        blocks = map(int, tokens[1:] if packed else tokens)
+
+    if packed:
+        original_data = decrypt_bytes(blocks, private_key).decode()
+    else:
+        decrypted_str = decrypt(blocks, private_key)  # Дешифруем строку
+        original_data = base64.b64decode(decrypted_str).decode()  # Декодируем из base64 в байты
 
     print(f"{original_data}")
 
 
 def main():
     key_size = 1024
-    public_key, private_key = generate_keys(key_size)
+    pool = KeyPool(key_sizes=(key_size,)).start()  # ключи готовятся в фоне, меню появляется сразу
+    public_key = private_key = None
 
     while True:
         print("\n1. Сгенерировать ключи")
@@ -131,14 +570,21 @@ def main():
 
         if choice == "1":
             key_size = int(input("Введите размер ключа (1024, 2048, 4096): "))
+            public_key, private_key = pool.get(key_size)
+            print(f"Ключ {key_size} бит готов, в пуле осталось {pool.count(key_size)}")
         elif choice == "2":
             file_path = input("Введите путь к файлу: ")
             print(f"{file_path}")
+            if public_key is None:
+                public_key, private_key = pool.get(key_size)
             encrypt_file(file_path, public_key)
         elif choice == "3":
             file_path = input("Введите путь к зашифрованному файлу: ")
+            if private_key is None:
+                public_key, private_key = pool.get(key_size)
             decrypt_file(file_path, private_key)
         elif choice == "4":
+            pool.stop()
             break
         else:
             print("Неверный ввод!")
@@ -0,0 +1,73 @@
+"""Гибридный формат demo.py (RSA-OAEP + AES-GCM порциями); нужен pycryptodome"""
+import os
+import struct
+
+import pytest
+
+pytest.importorskip("Crypto")
+import demo  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def key_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("keys")
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        demo.generate_keys(1024)
+    finally:
+        os.chdir(cwd)
+    return directory
+
+
+def _encrypt(tmp_path, key_dir, data, chunk_size=100):
+    path = tmp_path / "file.bin"
+    path.write_bytes(data)
+    return demo.encrypt_file_hybrid(str(path), str(key_dir / "public.pem"), chunk_size)
+
+
+@pytest.mark.parametrize("size", [0, 1, 99, 100, 101, 1000])
+def test_round_trip(tmp_path, key_dir, size):
+    data = os.urandom(size)
+    encrypted = _encrypt(tmp_path, key_dir, data)
+    decrypted = demo.decrypt_file_hybrid(encrypted, str(key_dir / "private.pem"))
+    with open(decrypted, "rb") as file:
+        assert file.read() == data
+
+
+def _rejected(path, key_dir):
+    with pytest.raises(ValueError):
+        demo.decrypt_file_hybrid(path, str(key_dir / "private.pem"))
+    assert not os.path.exists(path[:-len(".enc")] + ".dec")
+
+
+def test_rejects_tampering_truncation_and_trailing_data(tmp_path, key_dir):
+    encrypted = _encrypt(tmp_path, key_dir, os.urandom(350))
+    with open(encrypted, "rb") as file:
+        blob = file.read()
+    variants = [
+        blob[:-1],  # обрезан последний тег
+        blob[:len(blob) - (350 - 300) - demo.TAG_SIZE],  # отрезана последняя порция целиком
+        blob + b"junk",
+        blob[:-5] + bytes([blob[-5] ^ 1]) + blob[-4:],
+        blob[:demo.HYBRID_HEADER.size - 3],  # обрезан заголовок
+    ]
+    header = bytearray(blob)
+    struct.pack_into(">I", header, 6, demo.MAX_CHUNK_SIZE + 1)
+    variants.append(bytes(header))
+    for data in variants:
+        with open(encrypted, "wb") as file:
+            file.write(data)
+        _rejected(encrypted, key_dir)
+
+
+def test_batch_reports_failures(tmp_path, key_dir):
+    (tmp_path / "a.bin").write_bytes(os.urandom(500))
+    (tmp_path / "b.bin").write_bytes(b"")
+    _, summary = demo.process_files("encrypt", [str(tmp_path)], str(key_dir / "public.pem"), workers=2)
+    assert summary["files"] == 2 and summary["failed"] == 0
+    (tmp_path / "garbage.enc").write_bytes(b"xx")
+    results, summary = demo.process_files("decrypt", [str(tmp_path), str(tmp_path / "missing.enc")],
+                                          str(key_dir / "private.pem"), workers=2)
+    assert summary["files"] == 2 and summary["failed"] == 2
+    assert (tmp_path / "a.bin.dec").read_bytes() == (tmp_path / "a.bin").read_bytes()
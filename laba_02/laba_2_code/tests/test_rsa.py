@@ -0,0 +1,148 @@
+"""RSA из main.py: простые числа, ключи с КТО, блочная упаковка, двоичный контейнер, пул ключей"""
+import os
+import random
+import stat
+import time
+
+import pytest
+
+import main
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return main.generate_keys(512)
+
+
+def test_is_prime():
+    primes = [2, 3, 5, 7919, 2 ** 61 - 1, 2 ** 127 - 1]
+    composites = [0, 1, 4, 561, 1105, 7917, (2 ** 61 - 1) * 7919]  # 561 и 1105 - числа Кармайкла
+    assert all(main.is_prime(p) for p in primes)
+    assert not any(main.is_prime(c) for c in composites)
+
+
+@pytest.mark.parametrize("bits", [8, 16, 256])
+def test_generate_prime(bits):
+    random.seed(bits)
+    stats = main.PrimeStats()
+    p = main.generate_prime(bits, stats)
+    assert p.bit_length() == bits and main.is_prime(p, 20)
+    assert stats.candidates >= 1 and stats.sieved >= stats.candidates
+
+
+def test_generate_primes_parallel():
+    primes = main.generate_primes_parallel(256, 2, workers=2)
+    assert len(set(primes)) == 2
+    assert all(p.bit_length() == 256 and main.is_prime(p, 20) for p in primes)
+
+
+def test_crt_matches_plain_pow(keys):
+    (e, n), private_key = keys
+    d, _ = private_key
+    for m in (0, 1, 2, 12345, n - 1):
+        c = pow(m, e, n)
+        assert private_key.decrypt_int(c) == pow(c, d, n) == m
+    assert main.private_op((d, n))(pow(42, e, n)) == 42
+
+
+@pytest.mark.parametrize("size", [0, 1, 55, 56, 57, 1000])
+def test_bytes_round_trip(keys, size):
+    public_key, private_key = keys
+    data = os.urandom(size)
+    blocks = main.encrypt_bytes(data, public_key)
+    assert main.decrypt_bytes(blocks, private_key) == data
+    assert main.decrypt_bytes(blocks, tuple(private_key)) == data
+
+
+def test_chars_round_trip(keys):
+    public_key, private_key = keys
+    assert main.decrypt(main.encrypt("Hello, RSA!", public_key), private_key) == "Hello, RSA!"
+
+
+@pytest.mark.parametrize("packed", [True, False])
+@pytest.mark.parametrize("binary", [True, False])
+def test_file_round_trip(tmp_path, monkeypatch, capsys, keys, packed, binary):
+    public_key, private_key = keys
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "msg.txt").write_text("Привет, контейнер!\n" * 20, encoding="utf-8")
+    main.encrypt_file("msg.txt", public_key, packed, binary)
+    assert main.is_container("e_msg.txt") == binary
+    capsys.readouterr()
+    main.decrypt_file("e_msg.txt", private_key)
+    assert capsys.readouterr().out == "Привет, контейнер!\n" * 20 + "\n"
+
+
+def test_decrypt_file_rejects_other_key_size(tmp_path, monkeypatch, keys):
+    public_key, _ = keys
+    _, other_private_key = main.generate_keys(384, verbose=False)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "msg.txt").write_text("секрет", encoding="utf-8")
+    main.encrypt_file("msg.txt", public_key)
+    with pytest.raises(ValueError):
+        main.decrypt_file("e_msg.txt", other_private_key)
+
+
+def test_container(tmp_path, keys):
+    (_, n), _ = keys
+    blocks = [0, 1, n - 1, 123456789]
+    path = tmp_path / "c.bin"
+    main.write_container(path, blocks, n, main.MODE_PACKED)
+    (mode, key_bits, count), items = main.read_container(path)
+    assert (mode, key_bits, count) == (main.MODE_PACKED, n.bit_length(), len(blocks))
+    assert list(items) == blocks
+
+    assert list(main.read_container(path, n)[1]) == blocks
+    with pytest.raises(ValueError):
+        main.read_container(path, n >> 8)  # ключ другого размера
+
+    data = path.read_bytes()
+    for broken in (data[:5], data[:-1], b"XXXX" + data[4:]):
+        path.write_bytes(broken)
+        with pytest.raises(ValueError):
+            main.read_container(path)
+
+
+def test_key_pool(tmp_path):
+    directory = tmp_path / "pool"
+    pool = main.KeyPool(str(directory), key_sizes=(512,), size=2, low_water=0)
+    pool._store(512, main.generate_keys(512, verbose=False))
+    pool._store(512, main.generate_keys(512, verbose=False))
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(directory / "512").st_mode) == 0o700
+    assert {stat.S_IMODE(os.stat(p).st_mode) for p in (directory / "512").iterdir()} == {0o600}
+
+    pool = main.KeyPool(str(directory), key_sizes=(512,), size=0, low_water=0)
+    other = main.KeyPool(str(directory), key_sizes=(512,), size=0, low_water=0)
+    assert pool.count(512) == other.count(512) == 2
+    first = pool.get(512)
+    second = other.get(512)  # файл первого ключа уже забран - берётся следующий
+    assert first[0] != second[0]
+    assert not list((directory / "512").iterdir())
+    (e, n), private_key = first
+    assert private_key.decrypt_int(pow(7, e, n)) == 7
+
+
+def test_key_pool_removes_stale_files(tmp_path):
+    directory = tmp_path / "512"
+    directory.mkdir()
+    stale = [directory / "a.json.tmp", directory / "b.json.4242"]
+    fresh = directory / "c.json.tmp"
+    for path in stale + [fresh]:
+        path.write_text("{}")
+    old = time.time() - main.KEY_POOL_STALE_AGE - 60
+    for path in stale:
+        os.utime(path, (old, old))
+    pool = main.KeyPool(str(tmp_path), key_sizes=(512,), size=0, low_water=0)
+    assert pool.count(512) == 0
+    assert sorted(directory.iterdir()) == [fresh]
+
+
+def test_key_pool_reports_fill_errors(tmp_path):
+    blocker = tmp_path / "pool"
+    blocker.write_text("не каталог")  # _store не сможет создать каталог пула
+    pool = main.KeyPool(str(blocker), key_sizes=(512,), size=1, low_water=0).start()
+    try:
+        with pytest.raises(RuntimeError):
+            pool.get(512)
+    finally:
+        pool.stop()